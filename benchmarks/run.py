@@ -0,0 +1,159 @@
+"""
+Run the performance benchmark suite and check it against a baseline.
+
+Usage:
+
+    python benchmarks/run.py [--quick] [--filter household/]
+        [--output results.json] [--compare benchmarks/baseline.json]
+        [--threshold 0.25]
+
+Each case (see ``benchmarks/suite.py``) is timed over several repetitions,
+each after a garbage collection so that it does not pay for the garbage of
+the last, then run once more under ``tracemalloc`` to record the peak memory
+it allocates. Results are printed and, with ``--output``, saved as JSON; save
+them as ``benchmarks/baseline.json`` to update the stored baseline.
+
+With ``--compare``, cases whose fastest time (the least noisy measure of
+their cost) or peak memory exceed the baseline's by more than the threshold
+(and by more than a small absolute margin, below which differences are
+noise) are reported as regressions, and the runner exits with status 1.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from suite import QUICK_SIZES, SIZES, cases  # noqa: E402
+
+
+# Smaller absolute differences are never reported as regressions.
+NOISE_MS = 1.0
+NOISE_MB = 1.0
+
+
+def measure(case) -> dict:
+    times = []
+    for _ in range(case.repeat):
+        state = case.setup()
+        gc.collect()
+        start = time.perf_counter()
+        case.run(state)
+        times.append(time.perf_counter() - start)
+    state = case.setup()
+    tracemalloc.start()
+    try:
+        case.run(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "median_ms": round(1_000 * statistics.median(times), 3),
+        "min_ms": round(1_000 * min(times), 3),
+        "peak_memory_mb": round(peak / 2**20, 3),
+    }
+
+
+def metadata() -> dict:
+    from importlib.metadata import version
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    max_rss /= 2**20 if sys.platform == "darwin" else 2**10
+    max_rss = round(max_rss, 1)
+    return {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        **{
+            package: version(package)
+            for package in ("numpy", "policyengine-core", "policyengine-nz")
+        },
+        "max_rss_mb": max_rss,
+    }
+
+
+def regressions(results: dict, baseline: dict, threshold: float) -> list:
+    found = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]
+        for key, noise in (("min_ms", NOISE_MS), ("peak_memory_mb", NOISE_MB)):
+            if (
+                result[key] > before[key] * (1 + threshold)
+                and result[key] - before[key] > noise
+            ):
+                found.append(
+                    f"{name}: {key} {before[key]:.1f} -> {result[key]:.1f} "
+                    f"({result[key] / before[key] - 1:+.0%})"
+                )
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help=f"Scale up to {QUICK_SIZES[-1]:,} people rather than {SIZES[-1]:,}.",
+    )
+    parser.add_argument("--filter", default="", help="Run cases containing this.")
+    parser.add_argument("--output", type=Path, help="Save results as JSON here.")
+    parser.add_argument("--compare", type=Path, help="A baseline results file.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Relative slowdown or memory growth reported as a regression.",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for case in cases(QUICK_SIZES if args.quick else SIZES):
+        if args.filter not in case.name:
+            continue
+        results[case.name] = result = measure(case)
+        print(
+            f"{case.name:<40}{result['median_ms']:10.2f} ms"
+            f"{result['peak_memory_mb']:10.1f} MB peak"
+        )
+
+    report = {"metadata": metadata(), "results": results}
+    print(f"\nMaximum resident memory: {report['metadata']['max_rss_mb']:.0f} MB")
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        found = regressions(results, baseline["results"], args.threshold)
+        commit = baseline["metadata"].get("commit") or "baseline"
+        if found:
+            print(f"\nRegressions against {commit}:")
+            print("\n".join(f"  {line}" for line in found))
+            sys.exit(1)
+        print(f"\nNo regressions against {commit}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Load-test the household calculation service.
+
+Usage:
+
+    python benchmarks/serve_load.py [--rate 300] [--duration 10]
+        [--clients 32] [--url http://127.0.0.1:8080] [--p99-ms 100]
+
+Starts ``python -m policyengine_nz.serve`` on a free port with its result
+cache off, so that every request is calculated (unless ``--url`` points at a
+running server), then sends requests for varied households at a
+fixed rate from persistent connections. Each request's latency is measured
+from when it was scheduled to be sent, so a server falling behind shows up
+as latency rather than as a lower request rate. Reports throughput and
+latency percentiles, and exits with status 1 if the 99th percentile exceeds
+``--p99-ms``.
+
+On one CPU shared with this script, three runs at the default 300 requests
+per second had medians of 12 to 13 ms and 99th percentiles of 25, 33 and
+64 ms; the 99th percentile is set by the occasional garbage collection or
+scheduling pause, so the default target of 100 ms leaves room for them.
+"""
+
+import argparse
+import http.client
+import json
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+
+VARIABLES = ["income_tax", "household_benefits", "household_net_income"]
+
+
+def situation(rng: random.Random) -> dict:
+    income = rng.choice([0, 15_000, 30_000, 50_000, 80_000, 150_000])
+    people = {"adult": {"age": rng.randint(20, 70), "employment_income": income}}
+    children = rng.choice([0, 0, 1, 2, 3])
+    for index in range(children):
+        people[f"child{index}"] = {"age": rng.randint(0, 17)}
+    return {
+        "people": people,
+        "families": {
+            "family": {
+                "parents": ["adult"],
+                "children": [name for name in people if name != "adult"],
+            }
+        },
+        "households": {
+            "household": {"members": list(people), "rent": rng.choice([0, 20_000])}
+        },
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "policyengine_nz.serve",
+            "--port",
+            str(port),
+            "--cache-entries",
+            "0",
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.perf_counter() + 120
+    while time.perf_counter() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("The server did not start.")
+
+
+def client(host, port, schedule, bodies, latencies, errors):
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    for scheduled, body in zip(schedule, bodies):
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            connection.request(
+                "POST",
+                "/calculate",
+                body,
+                {"Content-Type": "application/json"},
+            )
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except OSError as error:
+            errors.append(str(error))
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - scheduled)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rate", type=float, default=300, help="Requests/second.")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds.")
+    parser.add_argument("--clients", type=int, default=32, help="Connections.")
+    parser.add_argument("--url", help="A running server, rather than starting one.")
+    parser.add_argument("--p99-ms", type=float, default=100, help="Latency target.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        host, port = "127.0.0.1", free_port()
+        server = start_server(port)
+
+    try:
+        rng = random.Random(args.seed)
+        total = int(args.rate * args.duration)
+        bodies = [
+            json.dumps({"situation": situation(rng), "variables": VARIABLES})
+            for _ in range(total)
+        ]
+        start = time.perf_counter() + 0.5
+        times = [start + index / args.rate for index in range(total)]
+        latencies, errors = [], []
+        threads = [
+            threading.Thread(
+                target=client,
+                args=(
+                    host,
+                    port,
+                    times[number :: args.clients],
+                    bodies[number :: args.clients],
+                    latencies,
+                    errors,
+                ),
+            )
+            for number in range(args.clients)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    milliseconds = [1_000 * latency for latency in latencies]
+    print(f"Requests:   {len(latencies):,} ok, {len(errors):,} failed")
+    print(f"Throughput: {len(latencies) / elapsed:,.0f} requests/second")
+    for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+        print(f"{name}:        {percentile(milliseconds, fraction):.2f} ms")
+    print(f"Mean:       {statistics.mean(milliseconds):.2f} ms")
+    print(f"Max:        {max(milliseconds):.2f} ms")
+    if errors or percentile(milliseconds, 0.99) > args.p99_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
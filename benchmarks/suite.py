@@ -0,0 +1,95 @@
+"""
+The performance benchmark cases run by ``benchmarks/run.py``.
+
+Each case has an untimed ``setup``, run before every repetition, and a timed
+``run`` taking the setup's result. Cases are grouped by name prefix:
+
+- ``system/``: constructing the tax-benefit system, with and without a
+  reform.
+- ``household/<variable>``: calculating one variable, and everything it
+  depends on, for a single family.
+- ``scaling/<variable>/<people>``: calculating a variable over a synthetic
+  population (see ``policyengine_nz.data.synthetic``) of a given size.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Sequence
+
+
+HOUSEHOLD_VARIABLES = (
+    "income_tax",
+    "acc_earners_levy",
+    "family_tax_credit",
+    "in_work_tax_credit",
+    "best_start",
+    "jobseeker_support",
+    "nz_superannuation",
+    "household_net_income",
+)
+
+SCALING_VARIABLES = ("income_tax", "family_tax_credit", "best_start")
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+QUICK_SIZES = (1_000, 10_000)
+
+REFORM = {
+    "gov.ird.income_tax.rates.rates.bracket_5": {"2025-01-01": 0.45},
+    "gov.ird.acc.earners_levy_rate": {"2025-01-01": 0.02},
+}
+
+FAMILY = {
+    "people": {
+        "parent_1": {"age": 35, "employment_income": 55_000},
+        "parent_2": {"age": 33, "employment_income": 20_000},
+        "child_1": {"age": 4},
+        "child_2": {"age": 9},
+    },
+    "families": {
+        "family": {
+            "parents": ["parent_1", "parent_2"],
+            "children": ["child_1", "child_2"],
+        }
+    },
+}
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[Any], Any]
+    setup: Callable[[], Any] = lambda: None
+    repeat: int = 5
+
+
+def cases(sizes: Sequence[int] = SIZES) -> Iterator[Case]:
+    from policyengine_nz import Microsimulation, NewZealandTaxBenefitSystem, Simulation
+    from policyengine_nz.data import generate_population
+
+    yield Case("system/construct", lambda _: NewZealandTaxBenefitSystem())
+    yield Case(
+        "system/construct_with_reform",
+        lambda _: NewZealandTaxBenefitSystem(reform=REFORM),
+    )
+
+    system = NewZealandTaxBenefitSystem()
+    for variable in HOUSEHOLD_VARIABLES:
+        yield Case(
+            f"household/{variable}",
+            lambda simulation, variable=variable: simulation.calculate(variable, 2025),
+            setup=lambda: Simulation(situation=FAMILY, tax_benefit_system=system),
+            repeat=20,
+        )
+
+    for size in sizes:
+        dataset = generate_population(size, tax_benefit_system=system)
+        for variable in SCALING_VARIABLES:
+            yield Case(
+                f"scaling/{variable}/{size}",
+                lambda simulation, variable=variable: simulation.calculate(
+                    variable, 2025
+                ),
+                setup=lambda dataset=dataset: Microsimulation(
+                    dataset=dataset, tax_benefit_system=system
+                ),
+                repeat=3 if size >= 100_000 else 5,
+            )
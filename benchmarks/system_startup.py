@@ -0,0 +1,97 @@
+"""
+Time constructing the tax-benefit system from source and from an artifact.
+
+Usage:
+
+    python benchmarks/system_startup.py [--repeat 20] [--processes 5]
+
+Reports the median time to construct a system in a running process, and the
+median time a fresh process takes to import the package and then construct
+its first system (the cold start of a worker).
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+COLD_START = """
+import time
+start = time.perf_counter()
+import policyengine_nz
+imported = time.perf_counter()
+{construct}
+print(imported - start, time.perf_counter() - imported)
+"""
+
+CONSTRUCT = {
+    "source": "policyengine_nz.NewZealandTaxBenefitSystem()",
+    "artifact": "policyengine_nz.load_system()",
+}
+
+
+def median_ms(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return 1_000 * statistics.median(times)
+
+
+def cold_start_ms(construct, processes, env):
+    import_times, construct_times = [], []
+    for _ in range(processes):
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_START.format(construct=construct)],
+            check=True,
+            capture_output=True,
+            text=True,
+            env=env,
+        ).stdout.split()
+        import_times.append(float(output[-2]))
+        construct_times.append(float(output[-1]))
+    return (
+        1_000 * statistics.median(import_times),
+        1_000 * statistics.median(construct_times),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--processes", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, POLICYENGINE_NZ_CACHE_DIR=cache_dir)
+        os.environ.update(env)
+
+        import policyengine_nz
+        from policyengine_nz.artifact import build_artifact, save_artifact
+
+        print(f"Building the artifact: {median_ms(build_artifact, 1):.1f} ms")
+        save_artifact(build_artifact())
+
+        print(f"\nIn-process construction (median of {args.repeat}):")
+        for name, function in (
+            ("source", policyengine_nz.NewZealandTaxBenefitSystem),
+            ("artifact", policyengine_nz.load_system),
+        ):
+            print(f"  {name:<10}{median_ms(function, args.repeat):8.1f} ms")
+
+        print(f"\nCold start in a new process (median of {args.processes}):")
+        for name, construct in CONSTRUCT.items():
+            import_ms, construct_ms = cold_start_ms(construct, args.processes, env)
+            print(
+                f"  {name:<10}{construct_ms:8.1f} ms to construct, "
+                f"after {import_ms:.0f} ms to import the package"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,19 @@ __version__ = "0.1.0"
 
 from .entities import entities
 from .model_api import *
-from .system import NewZealandTaxBenefitSystem
+from .system import NewZealandTaxBenefitSystem, Simulation, Microsimulation
+from .data import NewZealandDataset
+from .artifact import load_system
+from .incremental import reform_simulation
+from .streaming import StreamingMicrosimulation
 
-__all__ = ["NewZealandTaxBenefitSystem", "entities"]
+__all__ = [
+    "NewZealandTaxBenefitSystem",
+    "Simulation",
+    "Microsimulation",
+    "NewZealandDataset",
+    "load_system",
+    "reform_simulation",
+    "StreamingMicrosimulation",
+    "entities",
+]
@@ -0,0 +1,7 @@
+"""Analysis tools built on PolicyEngine New Zealand simulations."""
+
+from .marginal_rates import marginal_tax_rates
+from .budget_constraint import budget_constraint
+from .reform_scoring import score_reforms
+from .distributional import distributional_impact
+from .inequality import poverty_and_inequality, poverty_and_inequality_impact
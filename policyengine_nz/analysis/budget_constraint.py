@@ -0,0 +1,82 @@
+"""
+Budget constraints in the style of Treasury's Income Explorer.
+
+A budget constraint shows how a family's taxes, tax credits, benefits and
+net income change as one person's earnings vary. The base situation is
+repeated once per point on the earnings axis in a single simulation, so
+thousands of points cost one vectorised calculation rather than one
+simulation each.
+"""
+
+from typing import Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from policyengine_nz.batch import SituationBatch
+
+
+BUDGET_CONSTRAINT_VARIABLES = (
+    "income_tax",
+    "acc_earners_levy",
+    "family_tax_credit",
+    "in_work_tax_credit",
+    "best_start",
+    "jobseeker_support",
+    "household_net_income",
+)
+
+
+def budget_constraint(
+    situation: dict,
+    earnings: Sequence[float],
+    person: str = None,
+    income_variable: str = "employment_income",
+    variables: Sequence[str] = BUDGET_CONSTRAINT_VARIABLES,
+    period: Union[str, int] = None,
+    tax_benefit_system=None,
+    reform=None,
+) -> pd.DataFrame:
+    """
+    Evaluate a situation over a grid of earnings.
+
+    Args:
+        situation: The base situation.
+        earnings: Values of ``income_variable`` to evaluate.
+        person: The person whose income varies. Defaults to the first person.
+        income_variable: The person-level income that varies.
+        variables: Variables to report, summed over the situation's entities.
+        period: The year to evaluate.
+        tax_benefit_system: System to calculate with.
+        reform: Reform to apply if no system is given.
+
+    Returns:
+        pd.DataFrame: One row per point, with the varied income, each
+        variable and the effective marginal tax rate between neighbouring
+        points (based on ``household_net_income``).
+    """
+    earnings = np.asarray(earnings, dtype=float)
+    people = list(situation["people"])
+    person = people[0] if person is None else person
+    if person not in people:
+        raise ValueError(f"{person} is not a person in the situation.")
+
+    batch = SituationBatch(
+        [situation],
+        period=period,
+        tax_benefit_system=tax_benefit_system,
+        reform=reform,
+        copies=len(earnings),
+    )
+    simulation = batch.simulation
+    income = np.asarray(simulation.calculate(income_variable, batch.period))
+    income[people.index(person) :: len(people)] = earnings
+    simulation.set_input(income_variable, batch.period, income)
+
+    result = pd.DataFrame({income_variable: earnings})
+    for variable in variables:
+        result[variable] = batch.calculate_totals(variable, batch.period)
+    net_income = batch.calculate_totals("household_net_income", batch.period)
+    if len(earnings) > 1:
+        result["marginal_tax_rate"] = 1 - np.gradient(net_income, earnings)
+    return result
@@ -0,0 +1,165 @@
+"""
+Distributional impact of a reform across households.
+
+``distributional_impact`` compares a baseline and a reformed microsimulation
+of the same households. People are ranked into deciles of their household's
+equivalised net income with one weighted sort, and every table (by decile,
+by household type and overall) is built from weighted ``bincount`` sums over
+the households, so the whole analysis is a single O(N log N) pass however
+many households there are.
+"""
+
+from dataclasses import dataclass
+from typing import Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from policyengine_nz.analysis.households import (
+    DECILES,
+    household_values,
+    weighted_quantile_groups,
+)
+
+
+# The taxes and transfers making up the change in household net income.
+COMPONENTS = (
+    "income_tax",
+    "acc_earners_levy",
+    "family_tax_credit",
+    "in_work_tax_credit",
+    "best_start",
+    "jobseeker_support",
+    "nz_superannuation",
+    "accommodation_supplement",
+)
+
+# Changes in household net income within this many dollars are not counted
+# as gains or losses.
+CHANGE_THRESHOLD = 1.0
+
+
+@dataclass
+class DistributionalImpact:
+    """
+    Tables of a reform's impact on household net income.
+
+    Each table has the weighted number of households and people, the mean
+    baseline household net income, the mean change per household, the
+    change relative to baseline income, and the shares of people in
+    households gaining and losing.
+
+    Attributes:
+        deciles: One row per equivalised income decile (1 is the lowest).
+        household_types: One row per household type.
+        components: The mean change per household in each tax and transfer
+            (positive when more is paid or received), by decile.
+        summary: The overall impact, including the total change.
+    """
+
+    deciles: pd.DataFrame
+    household_types: pd.DataFrame
+    components: pd.DataFrame
+    summary: pd.Series
+
+
+def _table(
+    group: np.ndarray,
+    size: int,
+    households: np.ndarray,
+    people: np.ndarray,
+    income: np.ndarray,
+    change: np.ndarray,
+) -> pd.DataFrame:
+    def total(values):
+        return np.bincount(group, weights=values, minlength=size)
+
+    count, persons = total(households), total(people)
+    baseline, changed = total(households * income), total(households * change)
+    winners = total(people * (change > CHANGE_THRESHOLD))
+    losers = total(people * (change < -CHANGE_THRESHOLD))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return pd.DataFrame(
+            {
+                "households": count,
+                "people": persons,
+                "baseline_income": baseline / count,
+                "mean_change": changed / count,
+                "relative_change": changed / baseline,
+                "winner_share": winners / persons,
+                "loser_share": losers / persons,
+            }
+        )
+
+
+def distributional_impact(
+    baseline,
+    reformed,
+    period: Union[str, int] = 2025,
+    rank_by: str = "equivalised_household_net_income",
+    components: Sequence[str] = COMPONENTS,
+) -> DistributionalImpact:
+    """
+    Tabulate the change in household net income between two simulations.
+
+    Args:
+        baseline: The baseline microsimulation.
+        reformed: A microsimulation of the reform over the same households
+            (e.g. from ``reform_simulation``).
+        period: The year to compare.
+        rank_by: The household variable people are ranked by into deciles,
+            in the baseline.
+        components: Variables whose changes are tabulated by decile.
+
+    Returns:
+        DistributionalImpact: The impact by decile, household type and
+        component, and overall.
+    """
+    period = str(period)
+    households = household_values(baseline, "household_weight", period)
+    people = households * baseline.populations["household"].nb_persons()
+    income = household_values(baseline, "household_net_income", period)
+    change = household_values(reformed, "household_net_income", period) - income
+
+    decile = weighted_quantile_groups(
+        household_values(baseline, rank_by, period), people, DECILES
+    )
+    # Group 0 is unused, so that rows are numbered by decile.
+    deciles = _table(decile, DECILES + 1, households, people, income, change)[1:]
+    deciles.index.name = "decile"
+
+    household_type = baseline.calculate(
+        "household_type", period, use_weights=False, decode_enums=False
+    )
+    types = household_type.possible_values
+    household_types = _table(
+        np.asarray(household_type), len(types), households, people, income, change
+    )
+    household_types.index = pd.Index(
+        [value.name for value in types], name="household_type"
+    )
+
+    component_changes = {}
+    for variable in components:
+        difference = household_values(reformed, variable, period) - (
+            household_values(baseline, variable, period)
+        )
+        component_changes[variable] = np.bincount(
+            decile, weights=households * difference, minlength=DECILES + 1
+        )[1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        component_table = pd.DataFrame(component_changes, index=deciles.index).div(
+            deciles["households"], axis=0
+        )
+
+    summary = _table(
+        np.zeros(len(income), dtype=int), 1, households, people, income, change
+    ).iloc[0]
+    summary.name = None
+    summary["total_change"] = float(np.dot(households, change))
+    return DistributionalImpact(
+        deciles=deciles,
+        household_types=household_types,
+        components=component_table,
+        summary=summary,
+    )
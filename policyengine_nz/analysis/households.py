@@ -0,0 +1,58 @@
+"""
+Household arrays and income ranks shared by the analysis modules.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+
+DECILES = 10
+
+
+def household_values(simulation, variable: str, period) -> np.ndarray:
+    """
+    A variable's unweighted value for each household.
+
+    Args:
+        simulation: The simulation.
+        variable: The variable, of any entity; values of other entities are
+            summed over each household.
+        period: The period to calculate.
+
+    Returns:
+        np.ndarray: One float per household.
+    """
+    return np.asarray(
+        simulation.calculate(variable, period, map_to="household", use_weights=False),
+        dtype=np.float64,
+    )
+
+
+def weighted_quantile_groups(
+    values: Sequence[float], weights: Sequence[float], groups: int = DECILES
+) -> np.ndarray:
+    """
+    Assign values to weighted quantile groups with a single sort.
+
+    Args:
+        values: The value ranking each record.
+        weights: The weight of each record.
+        groups: The number of groups (10 for deciles).
+
+    Returns:
+        np.ndarray: Each record's group, from 1 (the lowest values) to
+        ``groups``, each group holding as nearly as the weights allow an
+        equal share of the total weight. Records are placed by the weight
+        below the middle of their own.
+    """
+    values = np.asarray(values)
+    weights = np.asarray(weights, dtype=np.float64)
+    order = np.argsort(values, kind="stable")
+    sorted_weights = weights[order]
+    below = np.cumsum(sorted_weights) - sorted_weights / 2
+    total = below[-1] + sorted_weights[-1] / 2 if len(below) else 0.0
+    result = np.ones(len(values), dtype=int)
+    if total > 0:
+        result[order] = np.minimum(groups * below // total, groups - 1) + 1
+    return result
@@ -0,0 +1,284 @@
+"""
+Poverty and inequality metrics in the style of New Zealand's child poverty
+statistics.
+
+People are given their household's equivalised net income, before and after
+housing costs. For each income concept, households are sorted by income
+once; every metric, for everyone and for children, is then read from
+cumulative sums of weights and incomes along that order. Bootstrap
+replicates are rows of a weight matrix over the same order, so confidence
+intervals are the same few vectorised passes, in batches of replicates to
+bound memory.
+"""
+
+from typing import Dict, Iterator, Union
+
+import numpy as np
+import pandas as pd
+
+from policyengine_nz.analysis.households import household_values
+
+
+# Income concept: the household variable giving each person's income.
+INCOME_CONCEPTS = {
+    "bhc": "equivalised_household_net_income",
+    "ahc": "equivalised_household_net_income_ahc",
+}
+
+POPULATIONS = ("all", "children")
+
+# Relative poverty lines, as fractions of median income.
+POVERTY_LINES = (0.5, 0.6)
+
+# Income shares of the bottom (positive) or top (negative) fractions of
+# people.
+INCOME_SHARES = {
+    "bottom_40_share": 0.4,
+    "top_10_share": -0.1,
+    "top_1_share": -0.01,
+}
+
+METRICS = (
+    "median",
+    "gini",
+    *INCOME_SHARES,
+    *(f"poverty_rate_{round(100 * line)}" for line in POVERTY_LINES),
+)
+
+# Elements of each replicate weight matrix; replicates are processed in
+# batches of at most this size.
+BATCH_SIZE = 10_000_000
+
+
+def _at(cumulative: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """Cumulative values before each row's ``index``-th element."""
+    padded = np.pad(cumulative, ((0, 0), (1, 0)))
+    return np.take_along_axis(padded, index[:, None], axis=1)[:, 0]
+
+
+def _bottom_share(
+    incomes: np.ndarray, weight: np.ndarray, income: np.ndarray, fraction: float
+) -> np.ndarray:
+    # Interpolate within the person straddling the boundary.
+    total = weight[:, -1]
+    target = fraction * total
+    index = np.minimum((weight < target[:, None]).sum(axis=1), weight.shape[1] - 1)
+    below = _at(income, index) + (target - _at(weight, index)) * incomes[index]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return below / income[:, -1]
+
+
+def _metrics(incomes: np.ndarray, weights: Dict[str, np.ndarray]) -> dict:
+    """
+    Metrics of sorted incomes for each population's replicate weights.
+
+    Args:
+        incomes: Incomes in ascending order.
+        weights: Each population's weight matrix, one replicate per row, in
+            the order of ``incomes``. Each population has its own median,
+            but the poverty lines of all follow the median of the first.
+
+    Returns:
+        dict: Arrays of one value per replicate, by population and metric.
+    """
+    results = {}
+    line_median = None
+    for population, weight in weights.items():
+        cumulative = np.cumsum(weight, axis=1)
+        income = np.cumsum(weight * incomes, axis=1)
+        total, total_income = cumulative[:, -1], income[:, -1]
+        median = incomes[
+            np.minimum((cumulative < total[:, None] / 2).sum(axis=1), len(incomes) - 1)
+        ]
+        if line_median is None:
+            line_median = median
+        metrics = {"median": median}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            metrics["gini"] = 1 - (weight * (2 * income - weight * incomes)).sum(
+                axis=1
+            ) / (total * total_income)
+            for name, fraction in INCOME_SHARES.items():
+                if fraction > 0:
+                    metrics[name] = _bottom_share(incomes, cumulative, income, fraction)
+                else:
+                    metrics[name] = 1 - _bottom_share(
+                        incomes, cumulative, income, 1 + fraction
+                    )
+            for line in POVERTY_LINES:
+                below = np.searchsorted(incomes, line * line_median, side="left")
+                metrics[f"poverty_rate_{round(100 * line)}"] = (
+                    _at(cumulative, below) / total
+                )
+        results[population] = metrics
+    return results
+
+
+def _populations(simulation, period) -> Dict[str, np.ndarray]:
+    weight = household_values(simulation, "household_weight", period)
+    return {
+        "all": weight * simulation.populations["household"].nb_persons(),
+        "children": weight * household_values(simulation, "is_child", period),
+    }
+
+
+def _replicates(bootstrap: int, households: int, seed: int) -> Iterator[np.ndarray]:
+    """Batches of Poisson bootstrap weight multipliers, one row each."""
+    rng = np.random.default_rng(seed)
+    batch = max(1, BATCH_SIZE // max(households, 1))
+    for start in range(0, bootstrap, batch):
+        size = min(batch, bootstrap - start)
+        yield rng.poisson(1.0, (size, households)).astype(np.float64)
+
+
+def _calculate(simulations, period, bootstrap: int, seed: int) -> list:
+    """
+    Point estimates and bootstrap replicates of every metric.
+
+    Every simulation's metrics use the same replicate households, so
+    differences between them are paired.
+
+    Returns:
+        list: For each simulation, a dict by (concept, population, metric)
+        of arrays whose first element is the point estimate and the rest the
+        replicates.
+    """
+    inputs = []
+    for simulation in simulations:
+        populations = _populations(simulation, period)
+        concepts = {}
+        for concept, variable in INCOME_CONCEPTS.items():
+            income = household_values(simulation, variable, period)
+            order = np.argsort(income, kind="stable")
+            concepts[concept] = order, income[order]
+        inputs.append((populations, concepts))
+
+    households = len(inputs[0][0]["all"])
+    batches = [np.ones((1, households))]
+    if bootstrap:
+        batches = [batches[0], *_replicates(bootstrap, households, seed)]
+
+    results = [{} for _ in simulations]
+    for multiplier in batches:
+        for result, (populations, concepts) in zip(results, inputs):
+            for concept, (order, incomes) in concepts.items():
+                sorted_multiplier = multiplier[:, order]
+                metrics = _metrics(
+                    incomes,
+                    {
+                        population: sorted_multiplier * weight[order]
+                        for population, weight in populations.items()
+                    },
+                )
+                for population, values in metrics.items():
+                    for metric, value in values.items():
+                        result.setdefault((concept, population, metric), []).append(
+                            value
+                        )
+    return [
+        {key: np.concatenate(values) for key, values in result.items()}
+        for result in results
+    ]
+
+
+def _table(columns: Dict[str, dict]) -> pd.DataFrame:
+    keys = [
+        (concept, population, metric)
+        for concept in INCOME_CONCEPTS
+        for population in POPULATIONS
+        for metric in METRICS
+    ]
+    index = pd.MultiIndex.from_tuples(keys, names=["concept", "population", "metric"])
+    return pd.DataFrame(
+        {name: [values[key] for key in keys] for name, values in columns.items()},
+        index=index,
+    ).sort_index()
+
+
+def _interval(replicates: dict, confidence: float) -> Dict[str, dict]:
+    tail = (1 - confidence) / 2
+    return {
+        "lower": {
+            key: float(np.nanquantile(values[1:], tail))
+            for key, values in replicates.items()
+        },
+        "upper": {
+            key: float(np.nanquantile(values[1:], 1 - tail))
+            for key, values in replicates.items()
+        },
+    }
+
+
+def poverty_and_inequality(
+    simulation,
+    period: Union[str, int] = 2025,
+    bootstrap: int = 0,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Poverty and inequality metrics of a microsimulation.
+
+    Incomes are household net incomes, equivalised on the modified OECD
+    scale, before (``bhc``) and after (``ahc``) housing costs. Metrics are
+    over people, each with their household's income, and over children
+    (``is_child``) alone. They are the median, the Gini coefficient, the
+    shares of income of the bottom 40% and the top 10% and 1%, and the
+    shares of people below 50% and 60% of the median income of everyone.
+
+    Args:
+        simulation: The microsimulation.
+        period: The year to measure.
+        bootstrap: The number of bootstrap replicates for confidence
+            intervals. Households are resampled by Poisson weighting.
+        confidence: The confidence level of the intervals.
+        seed: Seed of the bootstrap replicates.
+
+    Returns:
+        pd.DataFrame: The metrics, indexed by concept, population and metric,
+        with columns ``value`` and, when bootstrapping, ``lower`` and
+        ``upper``.
+    """
+    (result,) = _calculate([simulation], str(period), bootstrap, seed)
+    columns = {"value": {key: float(values[0]) for key, values in result.items()}}
+    if bootstrap:
+        columns.update(_interval(result, confidence))
+    return _table(columns)
+
+
+def poverty_and_inequality_impact(
+    baseline,
+    reformed,
+    period: Union[str, int] = 2025,
+    bootstrap: int = 0,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    The change in poverty and inequality metrics under a reform.
+
+    Args:
+        baseline: The baseline microsimulation.
+        reformed: A microsimulation of the reform over the same households.
+        period: The year to measure.
+        bootstrap: The number of bootstrap replicates for confidence
+            intervals of the changes. Both simulations use the same
+            replicates.
+        confidence: The confidence level of the intervals.
+        seed: Seed of the bootstrap replicates.
+
+    Returns:
+        pd.DataFrame: The metrics (see ``poverty_and_inequality``), with
+        columns ``baseline``, ``reform`` and ``change`` and, when
+        bootstrapping, ``lower`` and ``upper`` bounds of the change. Poverty
+        lines are relative to each simulation's own median.
+    """
+    before, after = _calculate([baseline, reformed], str(period), bootstrap, seed)
+    change = {key: after[key] - before[key] for key in before}
+    columns = {
+        "baseline": {key: float(values[0]) for key, values in before.items()},
+        "reform": {key: float(values[0]) for key, values in after.items()},
+        "change": {key: float(values[0]) for key, values in change.items()},
+    }
+    if bootstrap:
+        columns.update(_interval(change, confidence))
+    return _table(columns)
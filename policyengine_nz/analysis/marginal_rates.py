@@ -0,0 +1,88 @@
+"""
+Effective marginal tax rates.
+
+The effective marginal tax rate (EMTR) of a person is the share of an extra
+dollar of income lost to tax, ACC levies and abatement of benefits and tax
+credits (e.g. Family Tax Credit and Best Start), measured on household net
+income.
+
+Rather than building a second simulation per person, the income of every
+person is raised at once in a branch of the simulation. Only the values
+that depend on that income are recalculated in the branch; everything else
+(ages, family composition, ...) is read from the original simulation. So
+that a household's change in net income can be attributed to one person,
+people are raised one household position at a time: the first member of
+every household in one branch, the second member in the next, and so on.
+"""
+
+from typing import Union
+
+import numpy as np
+from policyengine_core.periods import period as get_period
+
+
+INCOME_VARIABLES = (
+    "employment_income",
+    "self_employment_income",
+    "investment_income",
+)
+
+
+def marginal_tax_rates(
+    simulation,
+    period: Union[str, int] = None,
+    income_variable: str = "employment_income",
+    delta: float = None,
+    net_income_variable: str = "household_net_income",
+) -> np.ndarray:
+    """
+    Calculate each person's effective marginal tax rate.
+
+    Args:
+        simulation: The simulation to measure.
+        period: The year to measure. Defaults to the simulation's default
+            calculation period.
+        income_variable: The person-level income raised, e.g.
+            ``employment_income``, ``self_employment_income`` or
+            ``investment_income``.
+        delta: The increase in income. Defaults to the
+            ``gov.simulation.marginal_tax_rate_delta`` parameter.
+        net_income_variable: The household-level income whose change is
+            measured.
+
+    Returns:
+        np.ndarray: The effective marginal tax rate of each person.
+    """
+    if period is None:
+        period = simulation.default_calculation_period
+    period = get_period(period)
+    system = simulation.tax_benefit_system
+    variable = system.get_variable(income_variable, check_existence=True)
+    if not variable.entity.is_person:
+        raise ValueError(
+            f"{income_variable} is a {variable.entity.key} variable; "
+            "marginal rates are measured on person-level income."
+        )
+    if delta is None:
+        delta = system.parameters(period).gov.simulation.marginal_tax_rate_delta
+
+    household = simulation.populations["household"]
+    income = np.asarray(simulation.calculate(income_variable, period))
+    net_income = np.asarray(simulation.calculate(net_income_variable, period))
+    position = household.members_position
+
+    rates = np.empty(len(income))
+    for rank in range(position.max() + 1):
+        raised = position == rank
+        name = f"marginal_tax_rate_{income_variable}_{rank}"
+        branch = simulation.get_branch(name)
+        try:
+            branch.set_input(income_variable, period, income + delta * raised)
+            raised_net_income = np.asarray(
+                branch.calculate(net_income_variable, period)
+            )
+        finally:
+            del simulation.branches[name]
+        change = household.project(raised_net_income - net_income)
+        rates[raised] = 1 - change[raised] / delta
+    return rates
@@ -0,0 +1,192 @@
+"""
+Scoring many reforms against one population in parallel.
+
+``score_reforms`` loads the population and calculates the baseline once, in
+the calling process, then fans the reforms out across a process pool. Where
+processes can be forked, workers inherit the baseline simulation (its
+system, inputs and calculated results) copy-on-write, so nothing is loaded
+or calculated twice. Elsewhere, each worker loads the dataset and calculates
+the baseline once when it starts; save the dataset with ``format="npy"`` to
+have the workers memory-map one shared copy of its inputs.
+
+Each reform is simulated with ``reform_simulation``, so only the variables
+it can affect are recalculated, and summarised by ``reform_summary``.
+"""
+
+import multiprocessing
+import os
+from typing import Any, Dict, Union
+
+import numpy as np
+import pandas as pd
+
+from policyengine_nz.analysis.households import (
+    DECILES,
+    household_values,
+    weighted_quantile_groups,
+)
+from policyengine_nz.incremental import reform_simulation
+
+
+# Calculated in the baseline before reforms are simulated, so that every
+# reform simulation reuses whatever of them it does not affect.
+SUMMARY_VARIABLES = (
+    "household_tax",
+    "household_benefits",
+    "household_net_income",
+    "gst",
+)
+
+# The baseline simulation (and its decile of each household), set in the
+# process calling ``score_reforms`` and inherited or built by its workers.
+_baseline = None
+
+
+def _microsimulation(dataset, period):
+    from policyengine_nz.system import Microsimulation
+
+    return Microsimulation(dataset=dataset, default_input_period=str(period))
+
+
+def _prepare(simulation, period) -> tuple:
+    for variable in SUMMARY_VARIABLES:
+        simulation.calculate(variable, period)
+    deciles = weighted_quantile_groups(
+        household_values(simulation, "household_net_income", period),
+        household_values(simulation, "household_weight", period),
+        DECILES,
+    )
+    return simulation, deciles
+
+
+def _totals(simulation, period) -> Dict[str, np.ndarray]:
+    return {
+        variable: household_values(simulation, variable, period)
+        for variable in SUMMARY_VARIABLES
+    }
+
+
+def reform_summary(baseline, reformed, period, deciles=None) -> Dict[str, float]:
+    """
+    Summarise the budgetary and distributional impact of a reform.
+
+    Args:
+        baseline: The baseline microsimulation.
+        reformed: A microsimulation of the reform over the same households.
+        period: The year to summarise.
+        deciles: Each household's baseline net income decile (1 to 10).
+            Calculated from ``baseline`` if not given.
+
+    Returns:
+        Dict[str, float]: The weighted changes in direct tax revenue, GST
+        revenue, benefit spending and household net income, the net
+        budgetary impact (positive when the reform raises revenue), the
+        shares of people in households gaining and losing over $1, and the
+        mean change in household net income in each baseline income decile.
+    """
+    if deciles is None:
+        deciles = _prepare(baseline, period)[1]
+    weights = household_values(baseline, "household_weight", period)
+    people = weights * baseline.populations["household"].nb_persons()
+    before, after = _totals(baseline, period), _totals(reformed, period)
+    change = {
+        variable: after[variable] - before[variable] for variable in SUMMARY_VARIABLES
+    }
+    net_income = change["household_net_income"]
+    summary = {
+        "tax_revenue_change": float(np.dot(change["household_tax"], weights)),
+        "gst_revenue_change": float(np.dot(change["gst"], weights)),
+        "benefit_spending_change": float(np.dot(change["household_benefits"], weights)),
+        "net_income_change": float(np.dot(net_income, weights)),
+    }
+    summary["budgetary_impact"] = (
+        summary["tax_revenue_change"]
+        + summary["gst_revenue_change"]
+        - summary["benefit_spending_change"]
+    )
+    summary["winner_share"] = float(people[net_income > 1].sum() / people.sum())
+    summary["loser_share"] = float(people[net_income < -1].sum() / people.sum())
+    for decile in range(1, DECILES + 1):
+        in_decile = deciles == decile
+        total_weight = weights[in_decile].sum()
+        summary[f"decile_{decile}_change"] = (
+            float(np.dot(net_income[in_decile], weights[in_decile]) / total_weight)
+            if total_weight > 0
+            else 0.0
+        )
+    return summary
+
+
+def _initialize_worker(dataset, period) -> None:
+    global _baseline
+    _baseline = _prepare(_microsimulation(dataset, period), period)
+
+
+def _score(item: tuple) -> tuple:
+    name, reform, period = item
+    baseline, deciles = _baseline
+    reformed = reform_simulation(baseline, reform)
+    return name, reform_summary(baseline, reformed, period, deciles)
+
+
+def score_reforms(
+    reforms: Dict[str, Any],
+    dataset=None,
+    period: Union[str, int] = 2025,
+    processes: int = None,
+    baseline=None,
+) -> pd.DataFrame:
+    """
+    Score reforms against one population, in parallel.
+
+    Args:
+        reforms: Reforms by name. Each is anything
+            ``NewZealandTaxBenefitSystem`` accepts as ``reform`` (e.g. a
+            parameter dict), and must be picklable.
+        dataset: The population: a ``NewZealandDataset`` or a path to one.
+        period: The year to score.
+        processes: Number of worker processes. Defaults to the number of
+            CPUs, capped at the number of reforms. With one, reforms are
+            scored in this process.
+        baseline: A baseline ``Microsimulation`` to score against, instead of
+            a dataset. Its calculated results are reused by every reform.
+
+    Returns:
+        pd.DataFrame: One row per reform, in the order given, with the
+        columns of ``reform_summary``.
+    """
+    global _baseline
+    if (dataset is None) == (baseline is None):
+        raise ValueError("Pass exactly one of dataset and baseline.")
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(reforms)))
+    items = [(name, reform, str(period)) for name, reform in reforms.items()]
+    fork = "fork" in multiprocessing.get_all_start_methods()
+    if baseline is not None and processes > 1 and not fork:
+        raise ValueError(
+            "Scoring against a baseline simulation in parallel requires "
+            "forked processes. Pass a dataset instead."
+        )
+
+    previous = _baseline
+    try:
+        if processes == 1 or fork:
+            if baseline is None:
+                baseline = _microsimulation(dataset, period)
+            _baseline = _prepare(baseline, str(period))
+        if processes == 1:
+            results = list(map(_score, items))
+        elif fork:
+            with multiprocessing.get_context("fork").Pool(processes) as pool:
+                results = pool.map(_score, items, chunksize=1)
+        else:
+            with multiprocessing.get_context().Pool(
+                processes,
+                initializer=_initialize_worker,
+                initargs=(dataset, str(period)),
+            ) as pool:
+                results = pool.map(_score, items, chunksize=1)
+    finally:
+        _baseline = previous
+    return pd.DataFrame.from_dict(dict(results), orient="index")
@@ -0,0 +1,301 @@
+"""
+Prebuilt tax-benefit system artifacts.
+
+Constructing ``NewZealandTaxBenefitSystem`` parses every parameter YAML file
+and compiles every variable module. An artifact stores the result of both
+steps on disk: the loaded parameter tree, and the compiled code of each
+variable module in loading order. Systems built from an artifact skip the
+parsing and compilation; reforms and core's parameter processing are applied
+as usual.
+
+An artifact is keyed by the package version, the Python bytecode version, the
+installed policyengine-core and a hash of the parameter files and every
+Python module of the package outside its tests. The key holds no absolute
+paths, so installations at different paths share artifacts. ``load_system``
+only uses an artifact whose key matches the current sources, and rebuilds it
+otherwise. The key is computed once per process, so source edits take effect
+in new processes.
+"""
+
+import functools
+import glob
+import hashlib
+import importlib.util
+import logging
+import marshal
+import os
+import pickle
+import sys
+import tempfile
+import types
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import policyengine_core
+from policyengine_core.parameters import ParameterNode
+from policyengine_core.variables import Variable
+
+from policyengine_nz import __version__
+
+
+COUNTRY_DIR = Path(__file__).parent
+PARAMETER_DIR = "parameters"
+CORE_DIR = Path(policyengine_core.__file__).parent
+CORE_SOURCE_DIRS = ("parameters", "taxbenefitsystems", "variables")
+# Package directories that do not affect the system.
+EXCLUDED_DIRS = ("tests", "__pycache__")
+
+CACHE_DIR_VARIABLE = "POLICYENGINE_NZ_CACHE_DIR"
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "policyengine-nz"
+ARTIFACT_SUFFIX = ".pkl"
+
+# Artifacts read in this process, by path.
+_artifacts: Dict[Path, "SystemArtifact"] = {}
+
+
+@dataclass
+class SystemArtifact:
+    """
+    The loaded form of the New Zealand tax-benefit system.
+
+    Attributes:
+        key: The ``artifact_key`` of the sources the artifact was built from.
+        parameters: The pickled parameter tree, before any reform or
+            processing. Each system unpickles its own copy.
+        variable_modules: The file path, relative to the variables
+            directory, and marshalled code of each variable module, in the
+            order the system loads them.
+        variable_module_metadata: Labels and descriptions of variable modules
+            and folders, as in ``TaxBenefitSystem.variable_module_metadata``.
+    """
+
+    key: str
+    parameters: bytes
+    variable_modules: List[Tuple[str, bytes]]
+    variable_module_metadata: Dict[str, dict]
+
+    def load_parameters(self) -> ParameterNode:
+        return pickle.loads(self.parameters)
+
+
+def _source_files(country_dir: Path) -> List[str]:
+    # Parameter files and Python modules, relative to the package directory.
+    sources = []
+    for directory, subdirectories, file_names in os.walk(country_dir):
+        subdirectories[:] = [
+            name for name in subdirectories if name not in EXCLUDED_DIRS
+        ]
+        relative_dir = os.path.relpath(directory, country_dir)
+        is_parameter_dir = Path(relative_dir).parts[:1] == (PARAMETER_DIR,)
+        for file_name in file_names:
+            if is_parameter_dir or file_name.endswith(".py"):
+                sources.append(os.path.normpath(os.path.join(relative_dir, file_name)))
+    return sorted(sources)
+
+
+@functools.lru_cache(maxsize=None)
+def _source_key(country_dir: Path) -> str:
+    digest = hashlib.sha256()
+    for part in (__version__, importlib.util.MAGIC_NUMBER.hex()):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    # Core files are only stat-ed: a reinstall of core changes their sizes or
+    # modification times, and reading them all would cost as much as loading.
+    for directory in CORE_SOURCE_DIRS:
+        for file_path in sorted((CORE_DIR / directory).glob("*.py")):
+            stat = file_path.stat()
+            name = file_path.relative_to(CORE_DIR)
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}\0".encode())
+    for source in _source_files(country_dir):
+        digest.update(source.encode())
+        digest.update(b"\0")
+        digest.update((country_dir / source).read_bytes())
+    return digest.hexdigest()
+
+
+def artifact_key() -> str:
+    """
+    Compute the key of an artifact built from the current sources.
+
+    The key is computed once per process.
+
+    Returns:
+        str: A hex digest of the package version, the Python bytecode version,
+        the policyengine-core installation and the contents of every parameter
+        file and Python module of the package outside ``tests`` (formulas call
+        helpers and entities outside ``variables``).
+    """
+    return _source_key(COUNTRY_DIR)
+
+
+def default_artifact_path() -> Path:
+    """
+    The artifact path used when none is given.
+
+    This is ``system-<version>.pkl`` in the ``POLICYENGINE_NZ_CACHE_DIR``
+    directory, or in ``~/.cache/policyengine-nz`` if that is not set.
+    """
+    cache_dir = os.environ.get(CACHE_DIR_VARIABLE)
+    cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+    return cache_dir / f"system-{__version__}{ARTIFACT_SUFFIX}"
+
+
+def _variable_files(directory: str) -> List[str]:
+    # The order of TaxBenefitSystem.add_variables_from_directory.
+    py_files = glob.glob(os.path.join(directory, "*.py"))
+    init_module = os.path.join(directory, "__init__.py")
+    if init_module in py_files:
+        py_files.remove(init_module)
+    for subdirectory in glob.glob(os.path.join(directory, "*/")):
+        py_files += _variable_files(subdirectory)
+    return py_files
+
+
+def build_artifact() -> SystemArtifact:
+    """
+    Build an artifact from the current parameter and variable sources.
+
+    Returns:
+        SystemArtifact: The artifact. Use ``save_artifact`` to write it.
+    """
+    from policyengine_nz.system import NewZealandTaxBenefitSystem
+
+    key = artifact_key()
+    system = NewZealandTaxBenefitSystem()
+    parameters = ParameterNode("", directory_path=system.parameters_dir)
+    variable_modules = []
+    for file_path in _variable_files(str(system.variables_dir)):
+        with open(file_path, "rb") as f:
+            code = compile(f.read(), file_path, "exec", dont_inherit=True)
+        relative_path = os.path.relpath(file_path, system.variables_dir)
+        variable_modules.append((relative_path, marshal.dumps(code)))
+    return SystemArtifact(
+        key=key,
+        parameters=pickle.dumps(parameters, protocol=pickle.HIGHEST_PROTOCOL),
+        variable_modules=variable_modules,
+        variable_module_metadata=dict(system.variable_module_metadata),
+    )
+
+
+def save_artifact(
+    artifact: SystemArtifact, path: Union[str, Path, None] = None
+) -> Path:
+    """
+    Write an artifact to disk.
+
+    The file is replaced atomically, so processes reading the artifact never
+    see a partly written one.
+
+    Args:
+        artifact: The artifact to write.
+        path: The file to write. Defaults to ``default_artifact_path()``.
+
+    Returns:
+        Path: The path written.
+    """
+    path = Path(path) if path is not None else default_artifact_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        dir=path.parent, suffix=ARTIFACT_SUFFIX
+    )
+    try:
+        with os.fdopen(file_descriptor, "wb") as f:
+            pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+    _artifacts[path] = artifact
+    return path
+
+
+def load_artifact(path: Union[str, Path, None] = None) -> Optional[SystemArtifact]:
+    """
+    Read an artifact, if it matches the current sources.
+
+    Args:
+        path: The file to read. Defaults to ``default_artifact_path()``.
+
+    Returns:
+        Optional[SystemArtifact]: The artifact, or None if the file is
+        missing, unreadable or was built from different sources.
+    """
+    path = Path(path) if path is not None else default_artifact_path()
+    key = artifact_key()
+    artifact = _artifacts.get(path)
+    if artifact is not None and artifact.key == key:
+        return artifact
+    try:
+        with open(path, "rb") as f:
+            artifact = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable system artifact {path}: {e}")
+        return None
+    if not isinstance(artifact, SystemArtifact) or artifact.key != key:
+        return None
+    _artifacts[path] = artifact
+    return artifact
+
+
+def load_system(reform=None, path: Union[str, Path, None] = None):
+    """
+    Construct the New Zealand tax-benefit system from a prebuilt artifact.
+
+    The artifact is built and saved first if it is missing or out of date.
+    If it cannot be saved, the system is still built from it, with a warning.
+
+    Args:
+        reform: Optional reform to apply to the baseline system.
+        path: The artifact file. Defaults to ``default_artifact_path()``.
+
+    Returns:
+        NewZealandTaxBenefitSystem: The system.
+    """
+    from policyengine_nz.system import NewZealandTaxBenefitSystem
+
+    artifact = load_artifact(path)
+    if artifact is None:
+        artifact = build_artifact()
+        try:
+            save_artifact(artifact, path)
+        except OSError as e:
+            logging.warning(f"Could not save the system artifact: {e}")
+    return NewZealandTaxBenefitSystem(reform=reform, artifact=artifact)
+
+
+def add_variables_from_artifact(system, artifact: SystemArtifact) -> None:
+    """
+    Add the variables of an artifact to a system.
+
+    This follows ``TaxBenefitSystem.add_variables_from_file``, executing each
+    module's compiled code instead of its source file.
+
+    Args:
+        system: The tax-benefit system.
+        artifact: The artifact.
+    """
+    system.variable_module_metadata.update(artifact.variable_module_metadata)
+    for relative_path, code in artifact.variable_modules:
+        file_path = os.path.join(system.variables_dir, relative_path)
+        file_name = os.path.splitext(os.path.basename(file_path))[0]
+        module_name = f"{id(system)}_{hash(os.path.abspath(file_path))}_{file_name}"
+        module = types.ModuleType(module_name)
+        module.__file__ = file_path
+        sys.modules[module_name] = module
+        exec(marshal.loads(code), module.__dict__)
+        relative_file_path = relative_path.replace("/", ".").replace(".py", "")
+        index = 0
+        for item, value in list(module.__dict__.items()):
+            if (
+                not item.startswith("__")
+                and isinstance(value, type)
+                and issubclass(value, Variable)
+                and value.__module__ == module_name
+            ):
+                value.module_name = relative_file_path
+                value.index_in_module = index
+                index += 1
+                system.add_variable(value)
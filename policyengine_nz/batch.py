@@ -0,0 +1,451 @@
+"""
+Batch household calculations.
+
+Household calculators usually score many small situations. Building a
+simulation for each one repeats the system and simulation setup and runs
+every formula on arrays of length one or two. ``SituationBatch`` instead
+packs all situations into a single simulation, giving each situation's
+entities their own block of IDs, so every variable is calculated once for
+the whole batch and then split back into per-situation results.
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from policyengine_core import periods
+from policyengine_core.enums import Enum
+
+from policyengine_nz.data.dataset import (
+    GROUP_ENTITIES,
+    PERSON,
+    NewZealandDataset,
+    build_populations,
+)
+from policyengine_nz.system import NewZealandTaxBenefitSystem, Simulation
+
+
+class SituationBatch:
+    """
+    Many household situations evaluated in one simulation.
+
+    An input is set for every entity of a simulation, so situations
+    overriding different formulas (see ``formula_inputs``) are packed into a
+    simulation per group. ``simulation`` and ``situation_index`` are then
+    None, and ``groups`` lists each group's situation numbers and batch.
+
+    Args:
+        situations: Situation dicts in the format ``Simulation`` accepts
+            (without axes), or a person-level DataFrame in the
+            ``NewZealandDataset`` person table format, in which case each
+            household is one situation.
+        period: Period for inputs given without one, and the default period
+            for calculations.
+        tax_benefit_system: System to calculate with. Defaults to a new
+            baseline system, or one with ``reform`` applied.
+        reform: Reform to apply if no system is given.
+        copies: Number of times to repeat the situation dicts, e.g. to vary
+            one input across the copies. Copy ``c`` of situation ``i`` is
+            situation ``c * len(situations) + i`` of the batch.
+    """
+
+    def __init__(
+        self,
+        situations: Union[Sequence[dict], pd.DataFrame],
+        period: Union[str, int] = None,
+        tax_benefit_system: NewZealandTaxBenefitSystem = None,
+        reform=None,
+        copies: int = 1,
+    ):
+        if tax_benefit_system is None:
+            tax_benefit_system = NewZealandTaxBenefitSystem(reform=reform)
+        self.tax_benefit_system = tax_benefit_system
+        self.period = str(period or Simulation.default_input_period)
+        self.groups = []
+
+        if isinstance(situations, pd.DataFrame):
+            self.simulation = Simulation(
+                tax_benefit_system=tax_benefit_system,
+                dataset=NewZealandDataset(
+                    {PERSON: situations}, time_period=self.period, name="batch"
+                ),
+            )
+            self.situation_index = self._household_situations()
+            self.count = self.simulation.populations["household"].count
+        else:
+            situations = list(situations)
+            self.count = len(situations) * copies
+            groups = defaultdict(list)
+            for number, situation in enumerate(situations):
+                overrides = formula_inputs(tax_benefit_system, situation, self.period)
+                groups[overrides].append(number)
+            if len(groups) > 1:
+                self.simulation = self.situation_index = None
+                for numbers in groups.values():
+                    numbers = np.array(numbers)
+                    batch = SituationBatch(
+                        [situations[number] for number in numbers],
+                        period=self.period,
+                        tax_benefit_system=tax_benefit_system,
+                        copies=copies,
+                    )
+                    # Copy c of the group's situation j is copy c of its
+                    # situation numbers[j] here.
+                    positions = np.arange(copies)[:, None] * len(situations)
+                    self.groups.append(((positions + numbers).ravel(), batch))
+            else:
+                structure, inputs, self.situation_index = _pack(
+                    tax_benefit_system, situations, self.period
+                )
+                if copies > 1:
+                    structure, inputs, self.situation_index = _tile(
+                        structure, inputs, self.situation_index, copies
+                    )
+                self.simulation = Simulation(
+                    tax_benefit_system=tax_benefit_system,
+                    populations=build_populations(tax_benefit_system, structure),
+                    default_calculation_period=self.period,
+                )
+                _set_inputs(self.simulation, inputs)
+        self._splits = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def calculate(
+        self, variable_name: str, period: Union[str, int] = None
+    ) -> List[np.ndarray]:
+        """
+        Calculate a variable for every situation.
+
+        Args:
+            variable_name: Variable to calculate.
+            period: Period to calculate for. Defaults to the batch period.
+
+        Returns:
+            List[np.ndarray]: One array per situation, with one value per
+            entity of the variable's type in the order the situation
+            defines them.
+        """
+        if self.groups:
+            results = [None] * self.count
+            for positions, batch in self.groups:
+                for position, values in zip(
+                    positions, batch.calculate(variable_name, period or self.period)
+                ):
+                    results[position] = values
+            return results
+        values = self.simulation.calculate(variable_name, period or self.period)
+        entity_key = self.tax_benefit_system.get_variable(variable_name).entity.key
+        order, boundaries = self._split(entity_key)
+        return np.split(np.asarray(values)[order], boundaries)
+
+    def calculate_totals(
+        self, variable_name: str, period: Union[str, int] = None
+    ) -> np.ndarray:
+        """
+        Calculate a variable summed over each situation's entities.
+
+        Args:
+            variable_name: Variable to calculate.
+            period: Period to calculate for. Defaults to the batch period.
+
+        Returns:
+            np.ndarray: One total per situation.
+        """
+        if self.groups:
+            totals = np.zeros(self.count)
+            for positions, batch in self.groups:
+                totals[positions] = batch.calculate_totals(
+                    variable_name, period or self.period
+                )
+            return totals
+        values = self.simulation.calculate(variable_name, period or self.period)
+        entity_key = self.tax_benefit_system.get_variable(variable_name).entity.key
+        return np.bincount(
+            self.situation_index[entity_key],
+            weights=np.asarray(values, dtype=float),
+            minlength=self.count,
+        )
+
+    def calculate_situations(
+        self, variables: Sequence[str], period: Union[str, int] = None
+    ) -> List[Dict[str, np.ndarray]]:
+        """
+        Calculate several variables, grouped by situation.
+
+        Args:
+            variables: Variables to calculate.
+            period: Period to calculate for. Defaults to the batch period.
+
+        Returns:
+            List[Dict[str, np.ndarray]]: For each situation, the values of
+            each variable as ``calculate`` returns them.
+        """
+        results = {variable: self.calculate(variable, period) for variable in variables}
+        return [
+            {variable: results[variable][index] for variable in variables}
+            for index in range(self.count)
+        ]
+
+    def _split(self, entity_key: str):
+        if entity_key not in self._splits:
+            situation_index = self.situation_index[entity_key]
+            order = np.argsort(situation_index, kind="stable")
+            counts = np.bincount(situation_index, minlength=self.count)
+            self._splits[entity_key] = order, np.cumsum(counts)[:-1]
+        return self._splits[entity_key]
+
+    def _household_situations(self) -> Dict[str, np.ndarray]:
+        households = self.simulation.populations["household"]
+        person_situation = households.members_entity_id
+        situation_index = {PERSON: person_situation}
+        for key in GROUP_ENTITIES:
+            situation_index[key] = (
+                np.arange(households.count)
+                if key == "household"
+                else self.simulation.populations[key].value_from_first_person(
+                    person_situation
+                )
+            )
+        return situation_index
+
+
+def calculate_situations(
+    situations: Union[Sequence[dict], pd.DataFrame],
+    variables: Sequence[str],
+    period: Union[str, int] = None,
+    **kwargs,
+) -> List[Dict[str, np.ndarray]]:
+    """
+    Calculate variables for many situations in a single simulation.
+
+    Args:
+        situations: Situations as accepted by ``SituationBatch``.
+        variables: Variables to calculate.
+        period: Input and calculation period.
+        **kwargs: Passed to ``SituationBatch``.
+
+    Returns:
+        List[Dict[str, np.ndarray]]: Per-situation values of each variable.
+    """
+    batch = SituationBatch(situations, period=period, **kwargs)
+    return batch.calculate_situations(variables, period)
+
+
+def formula_inputs(system, situation: dict, period: Union[str, int]) -> frozenset:
+    """
+    The inputs of a situation that override formulas.
+
+    An input set in one situation of a simulation is set for every entity of
+    it, so ``SituationBatch`` only packs situations overriding the same
+    formulas in the same periods together.
+
+    Args:
+        system: The system the situation is calculated with.
+        situation: A situation dict.
+        period: The period of inputs given without one.
+
+    Returns:
+        frozenset: (variable, period) pairs.
+    """
+    inputs = set()
+    for instances in situation.values():
+        if not isinstance(instances, dict):
+            continue
+        for instance in instances.values():
+            for name, value in (instance or {}).items():
+                variable = system.get_variable(name)
+                if variable is None or variable.is_input_variable():
+                    continue
+                periods = value if isinstance(value, dict) else {period: value}
+                inputs.update((name, str(key)) for key in periods)
+    return frozenset(inputs)
+
+
+def _pack(system, situations: List[dict], default_period: str):
+    """Lay out situations' entities one after another and gather inputs."""
+    person_entity = system.person_entity
+    group_entities = {entity.key: entity for entity in system.group_entities}
+    counts = defaultdict(int)
+    situation_index = defaultdict(list)
+    memberships = defaultdict(list)
+    roles = defaultdict(list)
+    # variable -> period -> (indices, values)
+    inputs = defaultdict(lambda: defaultdict(lambda: ([], [])))
+
+    def add_inputs(entity, index: int, variables: dict, path: str):
+        for variable_name, values in variables.items():
+            variable = system.get_variable(variable_name)
+            if variable is None:
+                raise ValueError(f"{path}: unknown variable {variable_name}.")
+            if variable.entity.key != entity.key:
+                raise ValueError(
+                    f"{path}: {variable_name} is a {variable.entity.key} "
+                    f"variable, not a {entity.key} variable."
+                )
+            if not isinstance(values, dict):
+                values = {default_period: values}
+            for period, value in values.items():
+                if value is None:
+                    continue
+                indices, period_values = inputs[variable_name][str(period)]
+                indices.append(index)
+                period_values.append(value)
+
+    for number, situation in enumerate(situations):
+        if "axes" in situation:
+            raise ValueError(
+                f"Situation {number} has axes, which batches do not support."
+            )
+        people = situation.get(person_entity.plural)
+        if not people:
+            raise ValueError(f"Situation {number} has no {person_entity.plural}.")
+        unknown = (
+            set(situation)
+            - {person_entity.plural}
+            - {entity.plural for entity in group_entities.values()}
+        )
+        if unknown:
+            raise ValueError(
+                f"Situation {number} has unknown entities: {', '.join(sorted(unknown))}."
+            )
+
+        person_offset = counts[PERSON]
+        person_positions = {
+            str(name): person_offset + position for position, name in enumerate(people)
+        }
+        for name, variables in people.items():
+            add_inputs(
+                person_entity,
+                person_positions[str(name)],
+                variables,
+                f"Situation {number}, {person_entity.key} {name}",
+            )
+        counts[PERSON] += len(people)
+        situation_index[PERSON] += [number] * len(people)
+
+        for key, entity in group_entities.items():
+            person_group = [None] * len(people)
+            person_role = [None] * len(people)
+            instances = situation.get(entity.plural)
+            if instances is None:
+                # As in core, people in no group form one group together.
+                instances = {entity.key: {}}
+                default_members = list(people)
+            else:
+                default_members = []
+            role_names = {role.plural or role.key: role for role in entity.roles}
+            for instance_name, instance in instances.items():
+                group_index = counts[key]
+                counts[key] += 1
+                situation_index[key].append(number)
+                variables = dict(instance)
+                members = {
+                    role_plural: variables.pop(role_plural, [])
+                    for role_plural in role_names
+                }
+                if default_members:
+                    members[entity.roles[0].plural or entity.roles[0].key] = (
+                        default_members
+                    )
+                for role_plural, names in members.items():
+                    role = role_names[role_plural]
+                    if isinstance(names, str):
+                        names = [names]
+                    if (
+                        not default_members
+                        and role.max is not None
+                        and len(names) > role.max
+                    ):
+                        raise ValueError(
+                            f"Situation {number}: there can be at most "
+                            f"{role.max} {role_plural} in a {key}."
+                        )
+                    for position, name in enumerate(names):
+                        person = person_positions.get(str(name))
+                        if person is None:
+                            raise ValueError(
+                                f"Situation {number}: {key} {instance_name} "
+                                f"refers to unknown person {name}."
+                            )
+                        local = person - person_offset
+                        if person_group[local] is not None:
+                            raise ValueError(
+                                f"Situation {number}: {name} is in more than one {key}."
+                            )
+                        person_group[local] = group_index
+                        person_role[local] = (
+                            role.subroles[position] if role.subroles else role
+                        ).key
+                add_inputs(
+                    entity,
+                    group_index,
+                    variables,
+                    f"Situation {number}, {key} {instance_name}",
+                )
+            # As in core, unallocated people each form a group of their own.
+            for local, group in enumerate(person_group):
+                if group is None:
+                    person_group[local] = counts[key]
+                    person_role[local] = entity.flattened_roles[0].key
+                    counts[key] += 1
+                    situation_index[key].append(number)
+            memberships[key] += person_group
+            roles[key] += person_role
+
+    structure = {"person_id": np.arange(counts[PERSON])}
+    for key in group_entities:
+        structure[f"{key}_id"] = np.arange(counts[key])
+        structure[f"person_{key}_id"] = np.array(memberships[key])
+        structure[f"person_{key}_role"] = np.array(roles[key])
+
+    arrays = {}
+    for variable_name, by_period in inputs.items():
+        variable = system.get_variable(variable_name)
+        count = counts[variable.entity.key]
+        for period, (indices, values) in by_period.items():
+            array = variable.default_array(count)
+            if variable.value_type in (Enum, str) or isinstance(values[0], str):
+                values = [variable.check_set_value(value) for value in values]
+            array[np.array(indices)] = values
+            arrays[variable_name, period] = array
+
+    return (
+        structure,
+        arrays,
+        {key: np.array(index, dtype=int) for key, index in situation_index.items()},
+    )
+
+
+def _tile(structure: dict, inputs: dict, situation_index: dict, copies: int):
+    """Repeat packed situations, offsetting each copy's entity IDs."""
+    situation_count = situation_index[PERSON].max() + 1
+    counts = {key: len(index) for key, index in situation_index.items()}
+    person_count = counts[PERSON]
+
+    def offsets(count, length):
+        return np.repeat(np.arange(copies) * count, length)
+
+    tiled = {"person_id": np.arange(person_count * copies)}
+    for key in GROUP_ENTITIES:
+        tiled[f"{key}_id"] = np.arange(counts[key] * copies)
+        tiled[f"person_{key}_id"] = np.tile(
+            structure[f"person_{key}_id"], copies
+        ) + offsets(counts[key], person_count)
+        tiled[f"person_{key}_role"] = np.tile(structure[f"person_{key}_role"], copies)
+    tiled_inputs = {key: np.tile(array, copies) for key, array in inputs.items()}
+    tiled_index = {
+        key: np.tile(index, copies) + offsets(situation_count, counts[key])
+        for key, index in situation_index.items()
+    }
+    return tiled, tiled_inputs, tiled_index
+
+
+def _set_inputs(simulation, inputs: Dict[tuple, np.ndarray]) -> None:
+    # Shorter periods first, so set_input can split longer ones around them.
+    for variable_name, period in sorted(
+        inputs, key=lambda key: periods.key_period_size(periods.period(key[1]))
+    ):
+        simulation.set_input(variable_name, period, inputs[variable_name, period])
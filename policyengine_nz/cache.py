@@ -0,0 +1,297 @@
+"""
+Content-addressed caching of household calculation results.
+
+Household calculator traffic repeats itself: the same family templates, with
+the same incomes, for the same period. ``ResultCache`` stores each result
+under a SHA-256 hash of the situation, period, requested variables and
+reform, together with the ``artifact_key`` of the installed package (its
+version and the contents of every parameter file and Python module). A
+change to any parameter or formula therefore changes every key, so stale
+results are never returned.
+
+Results are kept in an in-process LRU layer and, optionally, in a directory
+shared by processes. Disk entries sit in a subdirectory per
+``artifact_key``, so processes running different versions (as during a
+rolling deploy) can share a directory. A subdirectory for another key is
+removed when a cache opens only once none of its entries has been used for
+``STALE_AGE``. The least recently used entries are evicted once a
+subdirectory grows past its size limit. Disk entries are JSON, so results
+must be JSON-serialisable to be kept on disk, and reading a shared directory
+never runs code.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+from policyengine_nz.artifact import artifact_key
+
+
+# Results kept in memory.
+MAX_ENTRIES = 10_000
+
+# Size of the disk layer, in bytes.
+MAX_BYTES = 2**30
+
+# Seconds after which unused entries for other sources are removed.
+STALE_AGE = 7 * 24 * 60 * 60
+
+ENTRY_SUFFIX = ".json"
+
+
+def reform_identity(reform) -> str:
+    """
+    Identify a reform by its content.
+
+    Args:
+        reform: None for the baseline, a parameter dict (as
+            ``NewZealandTaxBenefitSystem`` accepts as ``reform``), or a string
+            the caller guarantees identifies the reform.
+
+    Returns:
+        str: The identity.
+    """
+    if reform is None:
+        return "baseline"
+    if isinstance(reform, str):
+        return f"name:{reform}"
+    if isinstance(reform, dict):
+        return "parameters:" + json.dumps(reform, sort_keys=True, default=str)
+    raise TypeError(
+        "Only parameter dict reforms can be identified by content; pass a "
+        "string identifying the reform instead."
+    )
+
+
+def _canonical_situation(situation: dict) -> list:
+    # The order of each entity's instances determines the order of results,
+    # so it is kept; the order of entities and of each instance's variables
+    # does not.
+    return [
+        [plural, [[str(name), instance] for name, instance in instances.items()]]
+        if isinstance(instances, dict)
+        else [plural, instances]
+        for plural, instances in sorted(situation.items())
+    ]
+
+
+def _remove_if_stale(directory: Path) -> None:
+    # Reading an entry updates its modification time, so a directory still
+    # used by processes running other sources has recent ones.
+    try:
+        last_used = max(
+            [directory.stat().st_mtime]
+            + [path.stat().st_mtime for path in directory.iterdir()]
+        )
+    except FileNotFoundError:
+        return
+    if time.time() - last_used > STALE_AGE:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class ResultCache:
+    """
+    An LRU cache of household results, with an optional disk layer.
+
+    Args:
+        max_entries: Results kept in memory. With 0, only the disk layer is
+            used.
+        directory: A directory to also keep results in, shared by processes.
+        max_bytes: Size of the disk layer. The least recently used entries
+            are removed beyond it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = MAX_ENTRIES,
+        directory: Union[str, Path, None] = None,
+        max_bytes: int = MAX_BYTES,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.source_key = artifact_key()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = self.disk_hits = self.misses = 0
+        self.directory = None
+        self._disk_bytes = 0
+        if directory is not None:
+            directory = Path(directory)
+            directory.mkdir(parents=True, exist_ok=True)
+            for path in directory.iterdir():
+                if path.is_dir() and path.name != self.source_key:
+                    _remove_if_stale(path)
+            self.directory = directory / self.source_key
+            self.directory.mkdir(exist_ok=True)
+            self._disk_bytes = sum(
+                path.stat().st_size for path in self.directory.glob(f"*{ENTRY_SUFFIX}")
+            )
+
+    def key(
+        self,
+        situation: dict,
+        variables: Sequence[str],
+        period: Union[str, int],
+        reform=None,
+    ) -> str:
+        """
+        The key of a calculation.
+
+        Args:
+            situation: The situation dict.
+            variables: The variables calculated.
+            period: The period calculated.
+            reform: The reform, as accepted by ``reform_identity``.
+
+        Returns:
+            str: A hex digest of the calculation and the package sources.
+        """
+        content = json.dumps(
+            [
+                self.source_key,
+                reform_identity(reform),
+                str(period),
+                sorted(variables),
+                _canonical_situation(situation),
+            ],
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[object]:
+        """
+        A cached result, or None if there is none.
+
+        Results are shared between callers, so should not be modified.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+        result = self._read(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.disk_hits += 1
+                self._remember(key, result)
+        return result
+
+    def put(self, key: str, result: object) -> None:
+        """
+        Cache a result in memory and, if there is one, on disk.
+
+        A result written to disk must be JSON-serialisable. A failed write,
+        such as to a full disk, is logged and leaves the entry in memory only.
+        """
+        with self._lock:
+            self._remember(key, result)
+        if self.directory is not None:
+            self._write(key, result)
+
+    def stats(self) -> dict:
+        """Hits (from memory and disk), misses, entries and bytes on disk."""
+        with self._lock:
+            return {
+                "hits": self.memory_hits + self.disk_hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def clear(self) -> None:
+        """Remove every entry, in memory and on disk."""
+        with self._lock:
+            self._memory.clear()
+            if self.directory is not None:
+                for path in self.directory.glob(f"*{ENTRY_SUFFIX}"):
+                    path.unlink(missing_ok=True)
+                self._disk_bytes = 0
+
+    def _remember(self, key: str, result: object) -> None:
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{ENTRY_SUFFIX}"
+
+    def _read(self, key: str) -> Optional[object]:
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                result = json.load(f)
+            # The modification time orders entries for eviction.
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+        return result
+
+    def _write(self, key: str, result: object) -> None:
+        path = self._path(key)
+        try:
+            file_descriptor, temporary_path = tempfile.mkstemp(
+                dir=self.directory, suffix=".tmp"
+            )
+        except OSError as e:
+            logging.warning(f"Could not write cache entry {path}: {e}")
+            return
+        try:
+            with os.fdopen(file_descriptor, "w") as f:
+                json.dump(result, f, separators=(",", ":"))
+            size = os.path.getsize(temporary_path)
+            try:
+                replaced = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(temporary_path, path)
+        except OSError as e:
+            Path(temporary_path).unlink(missing_ok=True)
+            logging.warning(f"Could not write cache entry {path}: {e}")
+            return
+        except BaseException:
+            Path(temporary_path).unlink(missing_ok=True)
+            raise
+        with self._lock:
+            self._disk_bytes += size - replaced
+            if self._disk_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Other processes may share the directory, so sizes are read afresh.
+        entries = []
+        for path in self.directory.glob(f"*{ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._disk_bytes = total
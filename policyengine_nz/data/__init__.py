@@ -0,0 +1,4 @@
+"""Microdata loading for PolicyEngine New Zealand."""
+
+from .dataset import NewZealandDataset, build_populations
+from .synthetic import generate_population, write_population
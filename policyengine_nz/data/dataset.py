@@ -0,0 +1,438 @@
+"""
+Weighted survey microdata for New Zealand microsimulation.
+
+A dataset is a set of entity tables: a ``person`` table with one row per
+person, and optional ``tax_unit``, ``benefit_unit``, ``family`` and
+``household`` tables with one row per group. Table columns are either
+structural (IDs, memberships and roles) or input variables, which are set
+for the dataset's time period.
+
+Structural columns:
+
+- ``person_id`` in the person table, and ``<entity>_id`` in each group table.
+- ``person_<entity>_id`` (or ``<entity>_id``) in the person table, giving the
+  group each person belongs to. People without one form a group of their own.
+- ``person_<entity>_role`` (optional) in the person table. Without it, people
+  aged under 18 take the child role of each group and everyone else the
+  adult role.
+
+Weights are read from the ``household_weight`` column of the household table.
+
+Datasets saved as ``.npy`` or Arrow files are memory-mapped when loaded:
+input columns stored in their variable's dtype are read from the files
+without being copied, and processes loading the same files share one
+physical copy of the data.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Union
+
+import h5py
+import numpy as np
+import pandas as pd
+
+from policyengine_nz.entities import entities
+
+
+PERSON = "person"
+GROUP_ENTITIES = [entity.key for entity in entities if not entity.is_person]
+ENTITY_KEYS = [PERSON] + GROUP_ENTITIES
+
+# Roles given to adults and children when the person table has no role column.
+DEFAULT_ROLES = {
+    "tax_unit": ("primary", "dependent"),
+    "benefit_unit": ("adult", "child"),
+    "family": ("parent", "child"),
+    "household": ("member", "member"),
+}
+
+CHILD_AGE_LIMIT = 18
+
+HDF5_SUFFIXES = (".h5", ".hdf5", ".hdf")
+PARQUET_SUFFIX = ".parquet"
+NPY_SUFFIX = ".npy"
+ARROW_SUFFIX = ".arrow"
+# Holds the time period of datasets saved as directories.
+METADATA_FILE = "metadata.json"
+FORMATS = ("h5", "parquet", "npy", "arrow")
+
+
+def _read_parquet(file_path: Path) -> pd.DataFrame:
+    try:
+        return pd.read_parquet(file_path)
+    except ImportError as e:
+        raise ImportError(
+            "Reading Parquet microdata requires pyarrow. "
+            "Install it with `pip install pyarrow`."
+        ) from e
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError as e:
+        raise ImportError(
+            "Arrow microdata requires pyarrow. Install it with `pip install pyarrow`."
+        ) from e
+    return pyarrow
+
+
+def _read_npy_table(directory: Path) -> pd.DataFrame:
+    # copy=False keeps each column backed by its memory-mapped file.
+    return pd.DataFrame(
+        {
+            column_path.stem: np.load(column_path, mmap_mode="r")
+            for column_path in sorted(directory.glob(f"*{NPY_SUFFIX}"))
+        },
+        copy=False,
+    )
+
+
+def _read_arrow_table(file_path: Path) -> pd.DataFrame:
+    pa = _import_pyarrow()
+    # The memory map stays open for as long as the columns read from it.
+    table = pa.ipc.open_file(pa.memory_map(str(file_path))).read_all()
+    return pd.DataFrame(
+        {column: table.column(column).to_numpy() for column in table.column_names},
+        copy=False,
+    )
+
+
+def _storage_arrays(key: str, table: pd.DataFrame, system) -> Dict[str, np.ndarray]:
+    """Table columns in the dtype they are stored in for memory mapping.
+
+    Input variables take their variable's dtype, so they can be used without
+    conversion. Text columns are stored as fixed-width strings.
+    """
+    arrays = {}
+    for column in table.columns:
+        values = table[column].to_numpy()
+        variable = system.variables.get(column)
+        if (
+            variable is not None
+            and variable.entity.key == key
+            and values.dtype.kind not in "OUT"
+        ):
+            values = values.astype(variable.dtype, copy=False)
+        elif values.dtype.kind in "OT":
+            values = values.astype(str)
+        arrays[column] = values
+    return arrays
+
+
+def _membership_column(person: pd.DataFrame, key: str) -> Union[str, None]:
+    """The person table column giving each person's group of an entity."""
+    return next(
+        (column for column in (f"person_{key}_id", f"{key}_id") if column in person),
+        None,
+    )
+
+
+def _decode(values: np.ndarray) -> np.ndarray:
+    # h5py returns strings as bytes.
+    if values.dtype.kind == "S":
+        return values.astype(str)
+    return values
+
+
+def build_populations(system, structure: Dict[str, np.ndarray]) -> dict:
+    """
+    Create a system's populations from entity IDs, memberships and roles.
+
+    Args:
+        system: The tax-benefit system to instantiate entities from.
+        structure: Arrays in the form returned by ``NewZealandDataset.structure``.
+
+    Returns:
+        dict: Populations by entity key, ready for ``build_from_populations``.
+    """
+    from policyengine_core.simulations.simulation_builder import (
+        SimulationBuilder,
+    )
+
+    builder = SimulationBuilder()
+    builder.create_entities(system)
+    builder.declare_person_entity(PERSON, structure["person_id"])
+    for key in GROUP_ENTITIES:
+        builder.declare_entity(key, structure[f"{key}_id"])
+        builder.join_with_persons(
+            builder.populations[key],
+            structure[f"person_{key}_id"],
+            structure[f"person_{key}_role"],
+        )
+    return builder.populations
+
+
+class NewZealandDataset:
+    """
+    Person and group tables of weighted microdata for one time period.
+
+    Args:
+        tables: Entity key to table (a DataFrame or mapping of column arrays).
+            A ``person`` table is required.
+        time_period: The period input variables are set for.
+        name: Name used in logs and error messages.
+    """
+
+    def __init__(
+        self,
+        tables: Dict[str, Union[pd.DataFrame, Dict[str, np.ndarray]]],
+        time_period: Union[str, int] = None,
+        name: str = "dataset",
+    ):
+        unknown_tables = set(tables) - set(ENTITY_KEYS)
+        if unknown_tables:
+            raise ValueError(
+                f"Unknown entity tables in {name}: {', '.join(sorted(unknown_tables))}. "
+                f"Expected some of: {', '.join(ENTITY_KEYS)}."
+            )
+        if PERSON not in tables:
+            raise ValueError(f"The {name} dataset has no person table.")
+        self.tables = {
+            key: table if isinstance(table, pd.DataFrame) else pd.DataFrame(table)
+            for key, table in tables.items()
+        }
+        self.time_period = None if time_period is None else str(time_period)
+        self.name = name
+
+    def __repr__(self) -> str:
+        return (
+            f"<NewZealandDataset {self.name} ({self.time_period}): "
+            f"{len(self.tables[PERSON]):,} people>"
+        )
+
+    @classmethod
+    def from_file(
+        cls, file_path: Union[str, Path], time_period: Union[str, int] = None
+    ) -> "NewZealandDataset":
+        """
+        Load a dataset from disk.
+
+        These layouts are supported:
+
+        - An HDF5 file with one group per entity and one array per column.
+        - A directory holding ``<entity>.parquet`` files.
+        - A directory holding ``<entity>/<column>.npy`` files (memory-mapped).
+        - A directory holding ``<entity>.arrow`` files in the Arrow IPC file
+          format (memory-mapped).
+        - A single Parquet file holding the person table.
+
+        Args:
+            file_path: Path to the file or directory.
+            time_period: The period input variables are set for. Defaults to
+                the time period saved with the dataset.
+
+        Returns:
+            NewZealandDataset: The loaded dataset.
+        """
+        file_path = Path(file_path)
+        if not file_path.exists():
+            raise FileNotFoundError(f"No dataset found at {file_path}.")
+        tables = {}
+        if file_path.is_dir():
+            for key in ENTITY_KEYS:
+                if (file_path / key).is_dir():
+                    tables[key] = _read_npy_table(file_path / key)
+                elif (file_path / f"{key}{ARROW_SUFFIX}").exists():
+                    tables[key] = _read_arrow_table(file_path / f"{key}{ARROW_SUFFIX}")
+                elif (file_path / f"{key}{PARQUET_SUFFIX}").exists():
+                    tables[key] = _read_parquet(file_path / f"{key}{PARQUET_SUFFIX}")
+            metadata_path = file_path / METADATA_FILE
+            if time_period is None and metadata_path.exists():
+                time_period = json.loads(metadata_path.read_text()).get("time_period")
+        elif file_path.suffix in HDF5_SUFFIXES:
+            with h5py.File(file_path, "r") as f:
+                for key in ENTITY_KEYS:
+                    if key in f:
+                        tables[key] = pd.DataFrame(
+                            {
+                                column: _decode(np.array(values))
+                                for column, values in f[key].items()
+                            }
+                        )
+                if time_period is None:
+                    time_period = f.attrs.get("time_period")
+        elif file_path.suffix == PARQUET_SUFFIX:
+            tables[PERSON] = _read_parquet(file_path)
+        else:
+            raise ValueError(
+                f"Unsupported dataset file {file_path}. Use an HDF5 file, a "
+                "Parquet file or a directory of Parquet files."
+            )
+        return cls(tables, time_period=time_period, name=file_path.stem)
+
+    def save(
+        self,
+        file_path: Union[str, Path],
+        format: str = None,
+        tax_benefit_system=None,
+    ) -> None:
+        """
+        Write the dataset to disk in a layout ``from_file`` reads.
+
+        Args:
+            file_path: Path to write to.
+            format: ``"h5"`` for a single HDF5 file, or ``"parquet"``,
+                ``"npy"`` or ``"arrow"`` for a directory of files in that
+                format. Defaults to ``"h5"`` for paths with an HDF5 suffix and
+                ``"parquet"`` otherwise. The ``npy`` and ``arrow`` layouts are
+                memory-mapped when loaded, and store input variables in their
+                variables' dtypes so they are read without copying.
+            tax_benefit_system: The system whose variables' dtypes the
+                ``npy`` and ``arrow`` layouts store inputs in. Defaults to a
+                new baseline system.
+        """
+        file_path = Path(file_path)
+        if format is None:
+            format = "h5" if file_path.suffix in HDF5_SUFFIXES else "parquet"
+        if format not in FORMATS:
+            raise ValueError(
+                f"Unknown dataset format {format!r}. Use one of: {', '.join(FORMATS)}."
+            )
+        if format == "h5":
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            with h5py.File(file_path, "w") as f:
+                for key, table in self.tables.items():
+                    group = f.create_group(key)
+                    for column in table.columns:
+                        values = table[column].to_numpy()
+                        if values.dtype.kind in "OUT":
+                            values = values.astype("S")
+                        group.create_dataset(column, data=values)
+                if self.time_period is not None:
+                    f.attrs["time_period"] = self.time_period
+            return
+
+        file_path.mkdir(parents=True, exist_ok=True)
+        if format == "parquet":
+            for key, table in self.tables.items():
+                try:
+                    table.to_parquet(file_path / f"{key}{PARQUET_SUFFIX}", index=False)
+                except ImportError as e:
+                    raise ImportError(
+                        "Writing Parquet microdata requires pyarrow. "
+                        "Install it with `pip install pyarrow`."
+                    ) from e
+        else:
+            if tax_benefit_system is None:
+                from policyengine_nz.system import NewZealandTaxBenefitSystem
+
+                tax_benefit_system = NewZealandTaxBenefitSystem()
+            for key, table in self.tables.items():
+                arrays = _storage_arrays(key, table, tax_benefit_system)
+                if format == "npy":
+                    (file_path / key).mkdir(exist_ok=True)
+                    for column, values in arrays.items():
+                        np.save(file_path / key / f"{column}{NPY_SUFFIX}", values)
+                else:
+                    pa = _import_pyarrow()
+                    arrow_table = pa.table(arrays)
+                    with pa.ipc.new_file(
+                        str(file_path / f"{key}{ARROW_SUFFIX}"), arrow_table.schema
+                    ) as writer:
+                        writer.write_table(arrow_table)
+        (file_path / METADATA_FILE).write_text(
+            json.dumps({"time_period": self.time_period})
+        )
+
+    def structure(self) -> Dict[str, np.ndarray]:
+        """
+        Entity IDs, memberships and roles implied by the tables.
+
+        Returns:
+            Dict[str, np.ndarray]: ``person_id``, and for each group entity
+            ``<entity>_id``, ``person_<entity>_id`` and ``person_<entity>_role``.
+        """
+        person = self.tables[PERSON]
+        count = len(person)
+        person_ids = (
+            person["person_id"].to_numpy()
+            if "person_id" in person
+            else np.arange(count)
+        )
+        if "age" in person:
+            is_child = person["age"].to_numpy() < CHILD_AGE_LIMIT
+        else:
+            is_child = np.zeros(count, dtype=bool)
+
+        structure = {"person_id": person_ids}
+        for key in GROUP_ENTITIES:
+            membership_column = _membership_column(person, key)
+            memberships = (
+                person[membership_column].to_numpy()
+                if membership_column is not None
+                else person_ids
+            )
+            table = self.tables.get(key)
+            if table is not None and f"{key}_id" in table:
+                ids = table[f"{key}_id"].to_numpy()
+                missing = np.setdiff1d(memberships, ids)
+                if len(missing) > 0:
+                    raise ValueError(
+                        f"{len(missing):,} {key} IDs in the person table of "
+                        f"{self.name} are missing from the {key} table, "
+                        f"e.g. {missing[0]}."
+                    )
+            else:
+                ids = np.unique(memberships)
+
+            role_column = f"person_{key}_role"
+            if role_column in person:
+                roles = person[role_column].to_numpy().astype(str)
+            else:
+                adult_role, child_role = DEFAULT_ROLES[key]
+                roles = np.where(is_child, child_role, adult_role)
+
+            structure[f"{key}_id"] = ids
+            structure[f"person_{key}_id"] = memberships
+            structure[role_column] = roles
+        return structure
+
+    def build_populations(self, simulation) -> None:
+        """
+        Build a simulation's populations and inputs from the tables.
+
+        Args:
+            simulation: The simulation to populate.
+        """
+        system = simulation.tax_benefit_system
+        structure = self.structure()
+        simulation.build_from_populations(build_populations(system, structure))
+
+        unknown_columns = []
+        for table_key, table in self.tables.items():
+            for column in table.columns:
+                if column in structure or column.endswith("_role"):
+                    continue
+                variable = system.get_variable(column)
+                if variable is None:
+                    unknown_columns.append(f"{table_key}.{column}")
+                    continue
+                values = self._to_entity(
+                    simulation, table[column].to_numpy(), table_key, variable
+                )
+                simulation.set_input(column, self.time_period, values)
+
+        if unknown_columns:
+            logging.warning(
+                f"The {self.name} dataset contains {len(unknown_columns)} "
+                "column(s) that do not match any variable and were ignored: "
+                + ", ".join(sorted(unknown_columns)[:10])
+            )
+
+    @staticmethod
+    def _to_entity(simulation, values, table_key: str, variable) -> np.ndarray:
+        target_key = variable.entity.key
+        if target_key == table_key:
+            return values
+        if table_key == PERSON:
+            return simulation.populations[target_key].value_from_first_person(values)
+        if target_key == PERSON:
+            return simulation.populations[table_key].project(values)
+        raise ValueError(
+            f"{variable.name} is a {target_key} variable, but was given in the "
+            f"{table_key} table."
+        )
@@ -0,0 +1,372 @@
+"""
+Synthetic New Zealand populations.
+
+``generate_population`` builds a population of a given size from a seed,
+without survey data: households of single adults, couples, families with
+children, sole parents, flatmates and adult children living at home, with
+ages, earnings, hours, investment and rental income, benefit receipt,
+regions and housing costs drawn from rough national distributions. Each
+household's members share a region and housing costs, and each family (the
+adults and their children) forms its own family, benefit unit and tax unit.
+
+It is meant for scaling and load tests, not for estimates: the distributions
+are broad approximations, and draws are independent beyond the household
+structure.
+
+Populations are generated in chunks of ``CHUNK_SIZE`` people, each from its
+own random stream, so a population is the same whether built in memory or
+written to Parquet chunk by chunk with ``write_population``.
+"""
+
+from pathlib import Path
+from typing import Iterator, Union
+
+import numpy as np
+import pandas as pd
+
+from policyengine_nz.data.dataset import PERSON, NewZealandDataset
+
+
+CHUNK_SIZE = 1_000_000
+
+NZ_POPULATION = 5_300_000
+
+# Household types: (share of households, heads, minimum and maximum head
+# age, whether it has children, independent adults besides the heads).
+HOUSEHOLD_TYPES = {
+    "single": (0.14, 1, 18, 64, False, 0),
+    "single_older": (0.09, 1, 65, 95, False, 0),
+    "couple": (0.15, 2, 20, 64, False, 0),
+    "couple_older": (0.10, 2, 65, 95, False, 0),
+    "couple_with_children": (0.27, 2, 25, 55, True, 0),
+    "sole_parent": (0.10, 1, 20, 55, True, 0),
+    "flatmates": (0.08, 1, 18, 40, False, 3),
+    "adult_child_at_home": (0.07, 2, 40, 60, True, 1),
+}
+
+# Probability of one, two, three and four children in families with any.
+CHILDREN = [0.40, 0.38, 0.15, 0.07]
+
+# Share of the population and median weekly rent of each region.
+REGIONS = {
+    "NORTHLAND": (0.039, 480),
+    "AUCKLAND": (0.334, 620),
+    "WAIKATO": (0.103, 530),
+    "BAY_OF_PLENTY": (0.067, 570),
+    "GISBORNE": (0.010, 470),
+    "HAWKES_BAY": (0.035, 520),
+    "TARANAKI": (0.025, 480),
+    "MANAWATU_WHANGANUI": (0.050, 450),
+    "WELLINGTON": (0.103, 580),
+    "TASMAN": (0.011, 540),
+    "NELSON": (0.011, 540),
+    "MARLBOROUGH": (0.010, 500),
+    "WEST_COAST": (0.006, 370),
+    "CANTERBURY": (0.132, 500),
+    "OTAGO": (0.048, 500),
+    "SOUTHLAND": (0.020, 400),
+}
+
+# Shares of households renting and paying a mortgage; the rest own outright.
+RENTING = 0.35
+MORTGAGED = 0.35
+
+WEEKS_IN_YEAR = 52
+SUPERANNUATION_AGE = 65
+
+
+def _choice(rng, options: dict, size: int, column: int = 0) -> np.ndarray:
+    """Draw indices of ``options`` by the (normalised) shares in ``column``."""
+    shares = np.array([values[column] for values in options.values()])
+    return rng.choice(len(options), size=size, p=shares / shares.sum())
+
+
+def _households(rng, people: int) -> dict:
+    """Draw household types and sizes adding up to exactly ``people``."""
+    types = list(HOUSEHOLD_TYPES.values())
+    kind = _choice(rng, HOUSEHOLD_TYPES, people)
+    heads = np.array([t[1] for t in types])[kind]
+    has_children = np.array([t[4] for t in types])[kind]
+    max_others = np.array([t[5] for t in types])[kind]
+    children = np.where(
+        has_children, 1 + rng.choice(len(CHILDREN), size=people, p=CHILDREN), 0
+    )
+    # Flatmates share with one to three others; an adult child lives with
+    # their parents and their siblings, if any.
+    others = np.where(max_others > 1, rng.integers(1, 4, people), max_others)
+    children = np.where(max_others == 1, children - 1, children)
+    size = heads + children + others
+
+    # Keep the households that fit, then fill the rest with single adults.
+    fits = np.cumsum(size) <= people
+    kind, heads, children, others = (
+        array[fits] for array in (kind, heads, children, others)
+    )
+    remainder = people - size[fits].sum()
+    single = list(HOUSEHOLD_TYPES).index("single")
+    return {
+        "kind": np.concatenate([kind, np.full(remainder, single)]),
+        "heads": np.concatenate([heads, np.ones(remainder, int)]),
+        "children": np.concatenate([children, np.zeros(remainder, int)]),
+        "others": np.concatenate([others, np.zeros(remainder, int)]),
+    }
+
+
+def _earnings(rng, age: np.ndarray, is_student: np.ndarray) -> tuple:
+    """Draw weekly hours and annual employment income."""
+    size = len(age)
+    working_age = (age >= 18) & (age < SUPERANNUATION_AGE)
+    employment_rate = np.select(
+        [is_student, working_age, age >= SUPERANNUATION_AGE, age >= 15],
+        [0.45, 0.80, 0.25, 0.30],
+        0.0,
+    )
+    employed = rng.random(size) < employment_rate
+    full_time = rng.random(size) < np.where(is_student | (age < 18), 0.1, 0.78)
+    hours = np.where(
+        full_time,
+        rng.normal(41, 5, size).clip(30, 70),
+        rng.uniform(5, 30, size),
+    )
+    hours = np.where(employed, hours.round(), 0.0)
+    # Hourly wages rise to a peak in the mid-40s.
+    age_profile = 1 - 0.0009 * (age.clip(16, 70) - 45) ** 2
+    wage = rng.lognormal(np.log(32), 0.45, size) * age_profile.clip(0.45)
+    income = np.where(employed, wage * hours * WEEKS_IN_YEAR, 0.0)
+    return hours, income.round(2)
+
+
+def _generate_chunk(
+    rng, people: int, first_person: int, first_household: int, first_family: int
+):
+    households = _households(rng, people)
+    kind = households["kind"]
+    heads, children, others = (
+        households["heads"],
+        households["children"],
+        households["others"],
+    )
+    household_count = len(kind)
+    size = heads + children + others
+    families = 1 + others
+
+    # Members are ordered heads, then children, then independent adults.
+    household = np.repeat(np.arange(household_count), size)
+    member = np.arange(people) - np.repeat(np.cumsum(size) - size, size)
+    is_head = member < heads[household]
+    is_child = ~is_head & (member < (heads + children)[household])
+    other = member - (heads + children)[household]
+    family = np.repeat(np.cumsum(families) - families, size) + np.where(
+        is_head | is_child, 0, 1 + other
+    )
+
+    # Ages: the first head's is drawn from the household type's range, a
+    # partner's is close to it, and children are born to heads aged 18+.
+    types = list(HOUSEHOLD_TYPES.values())
+    low = np.array([t[2] for t in types])[kind]
+    high = np.array([t[3] for t in types])[kind]
+    head_age = rng.integers(low, high + 1)
+    partner_gap = rng.normal(0, 3, household_count).round().astype(int)
+    oldest_child = np.minimum(17, head_age - 18)
+    age = np.select(
+        [member == 0, is_head, is_child],
+        [
+            head_age[household],
+            (head_age + partner_gap)[household].clip(18, 100),
+            (rng.random(people) * (oldest_child[household] + 1)).astype(int),
+        ],
+        # Flatmates are 18-40, adult children at home 18-24.
+        np.where(
+            kind[household] == list(HOUSEHOLD_TYPES).index("flatmates"),
+            rng.integers(18, 41, people),
+            rng.integers(18, 25, people),
+        ),
+    )
+
+    adult = age >= 18
+    is_student = (age >= 18) & (age < 25) & (rng.random(people) < 0.35)
+    hours, employment_income = _earnings(rng, age, is_student)
+    working_age = adult & (age < SUPERANNUATION_AGE)
+    self_employed = working_age & (rng.random(people) < 0.10)
+    self_employment_income = np.where(
+        self_employed, rng.lognormal(np.log(40_000), 0.9, people), 0.0
+    ).round(2)
+    investment_income = np.where(
+        adult & (rng.random(people) < 0.6),
+        rng.exponential(500 + 40 * (age - 18).clip(0), people),
+        0.0,
+    ).round(2)
+    rental_income = np.where(
+        adult & (age >= 30) & (rng.random(people) < 0.08),
+        rng.lognormal(np.log(20_000), 0.6, people),
+        0.0,
+    ).round(2)
+    receiving_nz_super = (age >= SUPERANNUATION_AGE) & (rng.random(people) < 0.98)
+    receiving_jobseeker_support = (
+        working_age
+        & (employment_income == 0)
+        & (self_employment_income == 0)
+        & ~is_student
+        & (rng.random(people) < 0.30)
+    )
+    is_disabled = adult & (rng.random(people) < 0.06 + 0.002 * (age - 18).clip(0))
+    is_carer = adult & ~is_disabled & (rng.random(people) < 0.04)
+    benefit_income = np.where(
+        receiving_jobseeker_support, rng.uniform(0, 500, people), 0.0
+    ).round(2)
+
+    has_partner = is_head & (heads[household] == 2)
+    is_sole_parent = is_head & (heads[household] == 1) & (children[household] > 0)
+    tax_unit_role = np.where(
+        is_child, "dependent", np.where(is_head & (member == 1), "spouse", "primary")
+    )
+
+    # Housing costs are shared by the household.
+    region_names = np.array(list(REGIONS))
+    region = _choice(rng, REGIONS, household_count)
+    median_rent = np.array([values[1] for values in REGIONS.values()])[region]
+    tenure = rng.random(household_count)
+    renting = tenure < RENTING
+    mortgaged = ~renting & (tenure < RENTING + MORTGAGED)
+    weekly_cost = median_rent * rng.lognormal(0, 0.25, household_count)
+    rent = np.where(renting, weekly_cost * WEEKS_IN_YEAR, 0.0).round(2)
+    accommodation_costs = np.where(
+        renting | mortgaged, weekly_cost * WEEKS_IN_YEAR, 0.0
+    ).round(2)
+
+    return pd.DataFrame(
+        {
+            "person_id": first_person + np.arange(people),
+            "household_id": first_household + household,
+            "family_id": first_family + family,
+            "benefit_unit_id": first_family + family,
+            "tax_unit_id": first_family + family,
+            "person_tax_unit_role": tax_unit_role,
+            "age": age,
+            "employment_income": employment_income,
+            "self_employment_income": self_employment_income,
+            "investment_income": investment_income,
+            "rental_income": rental_income,
+            "benefit_income": benefit_income,
+            "work_hours_per_week": hours,
+            "is_student": is_student,
+            "is_disabled": is_disabled,
+            "is_carer": is_carer,
+            "has_partner": has_partner,
+            "is_sole_parent": is_sole_parent,
+            "living_alone": size[household] == 1,
+            "receiving_nz_super": receiving_nz_super,
+            "receiving_jobseeker_support": receiving_jobseeker_support,
+            "region": region_names[region][household],
+            "rent": rent[household],
+            "accommodation_costs": accommodation_costs[household],
+        }
+    )
+
+
+def generate_people(
+    people: int,
+    seed: int = 0,
+    tax_benefit_system=None,
+    population: float = NZ_POPULATION,
+) -> Iterator[pd.DataFrame]:
+    """
+    Generate a synthetic population's person table in chunks.
+
+    Args:
+        people: The number of people.
+        seed: The random seed.
+        tax_benefit_system: Only columns naming its variables (and the IDs
+            and roles) are kept. Defaults to the New Zealand system.
+        population: The population the weights sum to.
+
+    Yields:
+        pd.DataFrame: Person tables of up to ``CHUNK_SIZE`` people, with
+        household variables on each member's row.
+    """
+    if tax_benefit_system is None:
+        from policyengine_nz.system import NewZealandTaxBenefitSystem
+
+        tax_benefit_system = NewZealandTaxBenefitSystem()
+    weight = population / people
+    first_person = first_household = first_family = 0
+    for chunk, start in enumerate(range(0, people, CHUNK_SIZE)):
+        rng = np.random.default_rng([seed, chunk])
+        size = min(CHUNK_SIZE, people - start)
+        table = _generate_chunk(rng, size, first_person, first_household, first_family)
+        table["household_weight"] = weight
+        yield table[
+            [
+                column
+                for column in table.columns
+                if column.endswith("_id")
+                or column.endswith("_role")
+                or column in tax_benefit_system.variables
+            ]
+        ]
+        first_person += size
+        first_household = int(table.household_id.iloc[-1]) + 1
+        first_family = int(table.family_id.iloc[-1]) + 1
+
+
+def generate_population(
+    people: int,
+    seed: int = 0,
+    time_period: Union[str, int] = 2025,
+    tax_benefit_system=None,
+    population: float = NZ_POPULATION,
+) -> NewZealandDataset:
+    """
+    Generate a synthetic population.
+
+    Args:
+        people: The number of people.
+        seed: The random seed.
+        time_period: The period of the dataset's inputs.
+        tax_benefit_system: Only columns naming its variables are kept.
+        population: The population the weights sum to.
+
+    Returns:
+        NewZealandDataset: A dataset with a person table, holding household
+        variables on each member's row.
+    """
+    tables = list(generate_people(people, seed, tax_benefit_system, population))
+    person = tables[0] if len(tables) == 1 else pd.concat(tables, ignore_index=True)
+    return NewZealandDataset(
+        {PERSON: person}, time_period=time_period, name=f"synthetic_{people}"
+    )
+
+
+def write_population(
+    file_path: Union[str, Path],
+    people: int,
+    seed: int = 0,
+    tax_benefit_system=None,
+    population: float = NZ_POPULATION,
+) -> None:
+    """
+    Write a synthetic population's person table to Parquet, a chunk at a
+    time, for ``StreamingMicrosimulation`` or ``Microsimulation``.
+
+    Args:
+        file_path: The Parquet file to write.
+        people: The number of people.
+        seed: The random seed.
+        tax_benefit_system: Only columns naming its variables are kept.
+        population: The population the weights sum to.
+    """
+    from policyengine_nz.data.dataset import _import_pyarrow
+
+    pa = _import_pyarrow()
+    import pyarrow.parquet
+
+    writer = None
+    try:
+        for table in generate_people(people, seed, tax_benefit_system, population):
+            batch = pa.Table.from_pandas(table, preserve_index=False)
+            if writer is None:
+                writer = pa.parquet.ParquetWriter(file_path, batch.schema)
+            writer.write_table(batch)
+    finally:
+        if writer is not None:
+            writer.close()
@@ -0,0 +1,528 @@
+"""
+Dependencies of variables on other variables and on parameters.
+
+Variables do not declare what they read: formulas call
+``person("taxable_income", period)`` or ``family.members("age", period)``
+and walk ``parameters(period).gov.ird...``. The dependencies here are found by
+reading the source of each formula:
+
+- Every string in a formula that names a variable is a variable dependency,
+  as are the variables in ``adds``, ``subtracts`` and ``defined_for``.
+- Every attribute path read from ``parameters(period)``, directly or through
+  a local name (``p = parameters(period).gov.ird.acc``), is a parameter
+  dependency. A formula depends on every parameter under that path.
+
+This over-approximates: a string that happens to name a variable counts.
+Formulas it cannot follow (ones that read ``.simulation``, pass their entity
+to a helper, or whose source is unavailable) are marked opaque and taken to
+depend on everything.
+
+``dependency_graph(system)`` builds the graph of every variable's
+dependencies once per system and answers queries over it: what a variable is
+calculated from (``upstream``, ``upstream_parameters``), what is calculated
+from it (``downstream``), and what a change to variables or parameters may
+affect (``affected_by``). With ``trace=True`` the graph also includes what a
+traced calculation of a sample household reads, which sees through opaque
+formulas.
+"""
+
+import ast
+import inspect
+import textwrap
+import weakref
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from policyengine_core.parameters import Parameter
+
+# Core helpers that take an entity and read only the variables named in their
+# arguments.
+ENTITY_HELPERS = ("add", "aggr")
+
+BASELINE = "baseline"
+
+# The situation and period calculated by ``DependencyGraph.from_trace``: a
+# couple with a baby and a teenager, one of them working.
+TRACE_PERIOD = "2025"
+TRACE_SITUATION = {
+    "people": {
+        "parent_1": {
+            "age": {TRACE_PERIOD: 35},
+            "employment_income": {TRACE_PERIOD: 55_000},
+        },
+        "parent_2": {"age": {TRACE_PERIOD: 33}},
+        "child_1": {"age": {TRACE_PERIOD: 1}},
+        "child_2": {"age": {TRACE_PERIOD: 16}},
+    },
+    "families": {
+        "family": {
+            "parents": ["parent_1", "parent_2"],
+            "children": ["child_1", "child_2"],
+        }
+    },
+    "households": {
+        "household": {"members": ["parent_1", "parent_2", "child_1", "child_2"]}
+    },
+}
+
+
+@dataclass(frozen=True)
+class VariableDependencies:
+    """
+    What one variable's values are calculated from.
+
+    Attributes:
+        variables: Names of the variables it reads.
+        parameters: Paths of the parameter nodes it reads. It depends on every
+            parameter at or under each path; ``""`` is the whole tree.
+        opaque: Whether its formula could not be followed, so that it may
+            depend on any variable or parameter.
+    """
+
+    variables: FrozenSet[str]
+    parameters: FrozenSet[str]
+    opaque: bool = False
+
+
+class _FormulaReader(ast.NodeVisitor):
+    def __init__(self, entity_name, parameters_name, variable_names):
+        self.entity_name = entity_name
+        self.aliases = {} if parameters_name is None else {parameters_name: None}
+        self.variable_names = variable_names
+        self.variables = set()
+        self.parameters = set()
+        self.opaque = False
+
+    def parameter_path(self, node) -> Optional[str]:
+        """The parameter path ``node`` evaluates to, if it is one."""
+        if isinstance(node, ast.Name):
+            path = self.aliases.get(node.id, False)
+            return None if path is None or path is False else path
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if self.aliases.get(node.func.id, False) is None:
+                return ""
+            return None
+        if isinstance(node, ast.Attribute):
+            key = node.attr
+        elif isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Constant):
+            key = str(node.slice.value)
+        else:
+            return None
+        path = self.parameter_path(node.value)
+        if path is None:
+            return None
+        return f"{path}.{key}" if path else key
+
+    def visit_Assign(self, node):
+        path = self.parameter_path(node.value)
+        if path is None:
+            self.visit(node.value)
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                if path is not None:
+                    # Only a new name for a node: its uses are what is read.
+                    self.aliases[target.id] = path
+                elif self.aliases.get(target.id, False) is not False:
+                    del self.aliases[target.id]
+            else:
+                self.visit(target)
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Attribute):
+            # A method of a parameter node (``scale.calc(income)``) reads the
+            # node it is called on.
+            path = self.parameter_path(func.value)
+            if path is not None:
+                self.parameters.add(path)
+            else:
+                self.visit(func)
+        elif isinstance(func, ast.Name) and self.aliases.get(func.id, False) is None:
+            # ``parameters(period)`` other than at the start of a path.
+            self.parameters.add("")
+        else:
+            self.visit(func)
+        arguments = node.args + [keyword.value for keyword in node.keywords]
+        if not (isinstance(func, ast.Name) and func.id in ENTITY_HELPERS):
+            # Anything else given the entity may read variables through it.
+            for argument in arguments:
+                if isinstance(argument, ast.Name) and argument.id == self.entity_name:
+                    self.opaque = True
+        for argument in arguments:
+            self.visit(argument)
+
+    def _visit_path(self, node):
+        path = self.parameter_path(node)
+        if path is None:
+            self.generic_visit(node)
+            return
+        self.parameters.add(path)
+        # Indices that are not constants (``p.rates[region]``) are still read.
+        while isinstance(node, (ast.Attribute, ast.Subscript)):
+            if isinstance(node, ast.Subscript):
+                self.visit(node.slice)
+            node = node.value
+
+    def visit_Attribute(self, node):
+        if node.attr == "simulation":
+            self.opaque = True
+        self._visit_path(node)
+
+    def visit_Subscript(self, node):
+        self._visit_path(node)
+
+    def visit_Name(self, node):
+        path = self.aliases.get(node.id, False)
+        if path is None:
+            # The parameters function itself, passed on or stored.
+            self.parameters.add("")
+        elif path is not False:
+            self.parameters.add(path)
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, str) and node.value in self.variable_names:
+            self.variables.add(node.value)
+
+
+def _read_formula(formula, variable_names) -> Optional[VariableDependencies]:
+    try:
+        source = textwrap.dedent(inspect.getsource(formula))
+        tree = ast.parse(source)
+    except (OSError, TypeError, SyntaxError):
+        return None
+    function = tree.body[0]
+    if not isinstance(function, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return None
+    arguments = [argument.arg for argument in function.args.args]
+    reader = _FormulaReader(
+        entity_name=arguments[0] if arguments else None,
+        parameters_name=arguments[2] if len(arguments) > 2 else None,
+        variable_names=variable_names,
+    )
+    for statement in function.body:
+        reader.visit(statement)
+    return VariableDependencies(
+        variables=frozenset(reader.variables),
+        parameters=frozenset(reader.parameters),
+        opaque=reader.opaque,
+    )
+
+
+def variable_dependencies(
+    variable, variable_names: Iterable[str]
+) -> VariableDependencies:
+    """
+    Find what a variable is calculated from.
+
+    Args:
+        variable: The variable (as held by a tax-benefit system).
+        variable_names: Names of every variable in the system.
+
+    Returns:
+        VariableDependencies: Its variable and parameter dependencies.
+    """
+    variable_names = set(variable_names)
+    variables = set()
+    parameters = set()
+    opaque = False
+    for attribute in ("adds", "subtracts"):
+        components = getattr(variable, attribute, None)
+        if isinstance(components, str):
+            # A parameter listing the variables to add.
+            parameters.add(components)
+            opaque = True
+        elif components:
+            variables.update(components)
+    if isinstance(getattr(variable, "defined_for", None), str):
+        variables.add(variable.defined_for)
+    if isinstance(getattr(variable, "uprating", None), str):
+        parameters.add(variable.uprating)
+    for formula in variable.formulas.values():
+        dependencies = _read_formula(formula, variable_names)
+        if dependencies is None:
+            opaque = True
+            continue
+        variables |= dependencies.variables
+        parameters |= dependencies.parameters
+        opaque = opaque or dependencies.opaque
+    variables.discard(variable.name)
+    return VariableDependencies(frozenset(variables), frozenset(parameters), opaque)
+
+
+def parameter_paths_overlap(path: str, other: str) -> bool:
+    """Whether one parameter path is the other or is under it."""
+    if not path or not other or path == other:
+        return True
+    shorter, longer = sorted((path, other), key=len)
+    return longer.startswith(shorter) and longer[len(shorter)] in ".["
+
+
+def system_parameters(system) -> Iterator[Parameter]:
+    """
+    Iterate over the parameters (leaves of the parameter tree) of a system.
+
+    The copy of the tree a reformed system keeps as ``baseline`` is skipped:
+    its parameters have the same names as the originals.
+    """
+    for key, node in system.parameters.children.items():
+        if key == BASELINE:
+            continue
+        if isinstance(node, Parameter):
+            yield node
+            continue
+        for parameter in node.get_descendants():
+            if isinstance(parameter, Parameter):
+                yield parameter
+
+
+def _closure(start: Iterable[str], edges: Dict[str, Set[str]]) -> Set[str]:
+    reached = set()
+    queue = list(start)
+    while queue:
+        for name in edges.get(queue.pop(), ()):
+            if name not in reached:
+                reached.add(name)
+                queue.append(name)
+    return reached
+
+
+class DependencyGraph:
+    """
+    The variable and parameter dependencies of every variable in a system.
+
+    Build it with ``dependency_graph(system)``, which reads each formula once
+    per system (and, with ``trace=True``, also runs a traced calculation).
+
+    Args:
+        dependencies: Each variable's dependencies.
+        parameters: Names of every parameter in the system. Parameter paths
+            read by formulas are resolved to the parameters under them.
+    """
+
+    def __init__(
+        self,
+        dependencies: Dict[str, VariableDependencies],
+        parameters: Iterable[str],
+    ):
+        self.dependencies = dependencies
+        self.parameter_names = sorted(parameters)
+        self._variables: Dict[str, Set[str]] = {}
+        self._dependents: Dict[str, Set[str]] = {}
+        self._parameters: Dict[str, Set[str]] = {}
+        for name, dependency in dependencies.items():
+            self._variables[name] = set(dependency.variables)
+            for dependency_name in dependency.variables:
+                self._dependents.setdefault(dependency_name, set()).add(name)
+            self._parameters[name] = {
+                parameter
+                for parameter in self.parameter_names
+                if any(
+                    parameter_paths_overlap(path, parameter)
+                    for path in dependency.parameters
+                )
+            }
+
+    @classmethod
+    def from_system(cls, system) -> "DependencyGraph":
+        """Read the dependencies of every variable from its formulas."""
+        names = set(system.variables)
+        return cls(
+            {
+                name: variable_dependencies(variable, names)
+                for name, variable in system.variables.items()
+            },
+            (parameter.name for parameter in system_parameters(system)),
+        )
+
+    @classmethod
+    def from_trace(
+        cls, system, situation: dict = None, period: str = None
+    ) -> "DependencyGraph":
+        """
+        Record the dependencies of every variable in a traced calculation.
+
+        Every variable with a formula is calculated for one situation, and
+        each variable and parameter a calculation reads is a dependency. This
+        sees through formulas static reading cannot follow, but only finds
+        what the situation exercises; nothing is marked opaque.
+
+        Args:
+            system: The tax-benefit system.
+            situation: The situation to calculate. Defaults to
+                ``TRACE_SITUATION``.
+            period: The period to calculate. Defaults to ``TRACE_PERIOD``.
+        """
+        from policyengine_nz.system import Simulation
+
+        simulation = Simulation(
+            situation=situation or TRACE_SITUATION,
+            tax_benefit_system=system,
+            trace=True,
+        )
+        for name, variable in system.variables.items():
+            if variable.formulas or variable.adds or variable.subtracts:
+                simulation.calculate(name, period or TRACE_PERIOD)
+        variables: Dict[str, Set[str]] = {name: set() for name in system.variables}
+        parameters: Dict[str, Set[str]] = {name: set() for name in system.variables}
+        nodes = list(simulation.tracer.trees)
+        while nodes:
+            node = nodes.pop()
+            variables[node.name].update(
+                child.name for child in node.children if child.name != node.name
+            )
+            parameters[node.name].update(
+                parameter.name for parameter in node.parameters
+            )
+            nodes += node.children
+        return cls(
+            {
+                name: VariableDependencies(
+                    frozenset(variables[name]), frozenset(parameters[name])
+                )
+                for name in system.variables
+            },
+            (parameter.name for parameter in system_parameters(system)),
+        )
+
+    def union(self, other: "DependencyGraph") -> "DependencyGraph":
+        """Combine with another graph of the same system.
+
+        A variable is opaque in the result if it is in this graph.
+        """
+        dependencies = {}
+        for name, dependency in self.dependencies.items():
+            extra = other.dependencies.get(name)
+            if extra is not None:
+                dependency = VariableDependencies(
+                    dependency.variables | extra.variables,
+                    dependency.parameters | extra.parameters,
+                    dependency.opaque,
+                )
+            dependencies[name] = dependency
+        return DependencyGraph(
+            dependencies, set(self.parameter_names) | set(other.parameter_names)
+        )
+
+    @property
+    def opaque(self) -> Set[str]:
+        """Variables whose formulas may read any variable or parameter."""
+        return {
+            name for name, dependency in self.dependencies.items() if dependency.opaque
+        }
+
+    def edges(self) -> List[Tuple[str, str]]:
+        """Every (dependency, dependent) pair of variables."""
+        return sorted(
+            (dependency, name)
+            for name, variables in self._variables.items()
+            for dependency in variables
+        )
+
+    def variables(self, name: str) -> Set[str]:
+        """The variables a variable reads directly."""
+        return set(self._variables[name])
+
+    def parameters(self, name: str) -> Set[str]:
+        """The parameters a variable reads directly."""
+        return set(self._parameters[name])
+
+    def dependents(self, name: str) -> Set[str]:
+        """The variables reading a variable directly."""
+        return set(self._dependents.get(name, ()))
+
+    def upstream(self, name: str) -> Set[str]:
+        """Every variable a variable is calculated from, directly or not."""
+        return _closure([name], self._variables) - {name}
+
+    def upstream_parameters(self, name: str) -> Set[str]:
+        """Every parameter a variable is calculated from, directly or not."""
+        parameters = set()
+        for variable in self.upstream(name) | {name}:
+            parameters |= self._parameters.get(variable, set())
+        return parameters
+
+    def downstream(self, name: str) -> Set[str]:
+        """Every variable calculated from a variable, directly or not."""
+        return _closure([name], self._dependents) - {name}
+
+    def affected_by(
+        self, variables: Iterable[str] = (), parameters: Iterable[str] = ()
+    ) -> Set[str]:
+        """
+        Find the variables whose values may change with some variables and
+        parameters.
+
+        Opaque variables count as affected by any change.
+
+        Args:
+            variables: Names of variables whose values or formulas change.
+            parameters: Parameter paths (a parameter, or a node for every
+                parameter under it) whose values change.
+
+        Returns:
+            Set[str]: The given variables, and every variable depending on
+            them or on the parameters, directly or transitively.
+        """
+        variables = set(variables)
+        parameters = list(parameters)
+        affected = set(variables)
+        for name, dependency in self.dependencies.items():
+            if (dependency.opaque and (variables or parameters)) or any(
+                parameter_paths_overlap(path, parameter)
+                for path in dependency.parameters
+                for parameter in parameters
+            ):
+                affected.add(name)
+        return affected | _closure(affected, self._dependents)
+
+
+# Graphs by system, with the variables they were read from.
+_graphs = weakref.WeakKeyDictionary()
+
+
+def dependency_graph(system, trace: bool = False) -> DependencyGraph:
+    """
+    The dependency graph of a system, built once and then reused.
+
+    The graph is rebuilt if the system's variables have been replaced since
+    (for example by a structural reform).
+
+    Args:
+        system: The tax-benefit system.
+        trace: Whether to add the dependencies seen in a traced calculation
+            (see ``DependencyGraph.from_trace``) to those read from formulas.
+
+    Returns:
+        DependencyGraph: The graph.
+    """
+    key = tuple(map(id, system.variables.values()))
+    graphs = _graphs.setdefault(system, {})
+    cached = graphs.get(trace)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    graph = DependencyGraph.from_system(system)
+    if trace:
+        graph = graph.union(DependencyGraph.from_trace(system))
+    graphs[trace] = key, graph
+    return graph
+
+
+def dependent_variables(
+    system,
+    variables: Iterable[str] = (),
+    parameters: Iterable[str] = (),
+) -> Set[str]:
+    """
+    Find the variables whose values may change with some variables and
+    parameters (see ``DependencyGraph.affected_by``).
+
+    Args:
+        system: The tax-benefit system.
+        variables: Names of variables whose values or formulas change.
+        parameters: Paths of parameters whose values change.
+
+    Returns:
+        Set[str]: The given variables and every variable depending on them or
+        on the parameters, directly or transitively.
+    """
+    return dependency_graph(system).affected_by(variables, parameters)
@@ -0,0 +1,208 @@
+"""
+Reform simulations that reuse a baseline simulation's results.
+
+A reform usually changes a few parameters or formulas, and most variables do
+not depend on them. ``reform_simulation`` builds a simulation of a reform
+over the population of a baseline simulation, and gives it the baseline's
+values of every variable the reform cannot affect (see ``dependencies``):
+its inputs, and the results it has already calculated. Only the affected
+variables are calculated again.
+
+The arrays are shared with the baseline, not copied. So calculate in the
+baseline whatever the reform simulations will reuse before building them,
+and do not write into the baseline's arrays in place afterwards.
+"""
+
+from enum import Enum
+from typing import Set
+
+from policyengine_nz.dependencies import dependent_variables, system_parameters
+
+ABOLITIONS = "gov.abolitions."
+
+# Variable attributes that change how its values are calculated or stored.
+VARIABLE_ATTRIBUTES = (
+    "value_type",
+    "definition_period",
+    "default_value",
+    "is_neutralized",
+    "adds",
+    "subtracts",
+    "defined_for",
+)
+
+
+def _parameter_values(system) -> dict:
+    return {
+        parameter.name: [
+            (value.instant_str, value.value) for value in parameter.values_list
+        ]
+        for parameter in system_parameters(system)
+    }
+
+
+def changed_parameters(baseline_system, reform_system) -> Set[str]:
+    """
+    Find the parameters whose values differ between two systems.
+
+    Args:
+        baseline_system: The baseline tax-benefit system.
+        reform_system: The reformed tax-benefit system.
+
+    Returns:
+        Set[str]: Names of parameters changed, added or removed by the reform.
+    """
+    baseline = _parameter_values(baseline_system)
+    reform = _parameter_values(reform_system)
+    return {
+        name
+        for name in baseline.keys() | reform.keys()
+        if baseline.get(name) != reform.get(name)
+    }
+
+
+def _attribute(variable, attribute: str):
+    value = getattr(variable, attribute, None)
+    # Each system loads its own copy of an enum, so members are compared by
+    # name.
+    if isinstance(value, Enum):
+        return type(value).__name__, value.name
+    return value
+
+
+def _same_formulas(variable, other) -> bool:
+    if list(variable.formulas) != list(other.formulas):
+        return False
+    # Code objects compare equal when compiled from the same source, so the
+    # formulas of two systems loading the same modules are the same.
+    return all(
+        getattr(formula, "__code__", formula)
+        == getattr(other_formula, "__code__", other_formula)
+        for formula, other_formula in zip(
+            variable.formulas.values(), other.formulas.values()
+        )
+    )
+
+
+def changed_variables(baseline_system, reform_system) -> Set[str]:
+    """
+    Find the variables whose definitions differ between two systems.
+
+    Args:
+        baseline_system: The baseline tax-benefit system.
+        reform_system: The reformed tax-benefit system.
+
+    Returns:
+        Set[str]: Names of variables added, removed, neutralized or given new
+        formulas by the reform.
+    """
+    baseline = baseline_system.variables
+    reform = reform_system.variables
+    changed = baseline.keys() ^ reform.keys()
+    for name in baseline.keys() & reform.keys():
+        variable, other = baseline[name], reform[name]
+        if (
+            variable.entity.key != other.entity.key
+            or any(
+                _attribute(variable, attribute) != _attribute(other, attribute)
+                for attribute in VARIABLE_ATTRIBUTES
+            )
+            or not _same_formulas(variable, other)
+        ):
+            changed.add(name)
+    return changed
+
+
+def affected_variables(baseline_system, reform_system) -> Set[str]:
+    """
+    Find the variables whose values a reform may change.
+
+    Args:
+        baseline_system: The baseline tax-benefit system.
+        reform_system: The reformed tax-benefit system.
+
+    Returns:
+        Set[str]: Variables changed by the reform, and every variable of the
+        reformed system depending on them or on a changed parameter.
+    """
+    variables = changed_variables(baseline_system, reform_system)
+    parameters = changed_parameters(baseline_system, reform_system)
+    for name in parameters:
+        if name.startswith(ABOLITIONS):
+            variables.add(name[len(ABOLITIONS) :])
+    return dependent_variables(reform_system, variables, parameters)
+
+
+def _populations_like(simulation, system) -> dict:
+    """New populations of ``system``'s entities, with the simulation's members."""
+    populations = system.instantiate_entities()
+    persons = populations[system.person_entity.key]
+    persons.count = simulation.persons.count
+    persons.ids = simulation.persons.ids
+    for entity in system.group_entities:
+        source = simulation.populations[entity.key]
+        population = populations[entity.key]
+        population.count = source.count
+        population.ids = source.ids
+        population.members_entity_id = source.members_entity_id
+        population.members_role = source.members_role
+        population.members_position = source.members_position
+        populations[entity.key] = population
+    return populations
+
+
+def reform_simulation(baseline, reform=None, tax_benefit_system=None):
+    """
+    Simulate a reform over a baseline simulation's population, reusing the
+    baseline's values of every variable the reform does not affect.
+
+    Args:
+        baseline: The baseline simulation, with the values to reuse already
+            calculated.
+        reform: The reform to simulate (anything ``NewZealandTaxBenefitSystem``
+            accepts as ``reform``).
+        tax_benefit_system: The reformed tax-benefit system, instead of a
+            reform.
+
+    Returns:
+        Simulation: A simulation of the same class as ``baseline`` under the
+        reform, with ``baseline`` as its ``baseline``.
+    """
+    if (reform is None) == (tax_benefit_system is None):
+        raise ValueError("Pass exactly one of reform and tax_benefit_system.")
+    baseline_system = baseline.tax_benefit_system
+    if tax_benefit_system is None:
+        tax_benefit_system = type(baseline_system)(reform=reform)
+    affected = affected_variables(baseline_system, tax_benefit_system)
+
+    simulation = type(baseline)(
+        tax_benefit_system=tax_benefit_system,
+        populations=_populations_like(baseline, tax_benefit_system),
+        default_input_period=baseline.default_input_period,
+        default_calculation_period=baseline.default_calculation_period,
+    )
+    inputs, results = [], []
+    for population in baseline.populations.values():
+        for name, holder in population._holders.items():
+            variable = tax_benefit_system.variables.get(name)
+            if (
+                variable is None
+                or variable.entity.key != population.entity.key
+                or variable.definition_period != holder.variable.definition_period
+            ):
+                continue
+            for branch_name, period in holder.get_known_branch_periods():
+                if branch_name != baseline.branch_name:
+                    continue
+                value = holder.get_array(period, branch_name)
+                if not holder.is_derived(period, branch_name):
+                    inputs.append((name, period, value))
+                elif name not in affected:
+                    results.append((name, period, value))
+    # Inputs first: setting one drops the values calculated before it.
+    for name, period, value in inputs:
+        simulation.set_input(name, period, value)
+    for name, period, value in results:
+        simulation.get_holder(name).put_in_cache(value, period, derived=True)
+    simulation.baseline = baseline
+    return simulation
@@ -52,3 +52,6 @@ NZD = "currency-NZD"
 WEEKS_IN_YEAR = 52
 DAYS_IN_YEAR = 365
 MONTHS_IN_YEAR = 12
+
+# Schedule helpers
+from .utils.schedule import bracket_rate, bracket_schedule, marginal_rate_schedule
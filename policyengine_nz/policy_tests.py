@@ -0,0 +1,401 @@
+"""
+Batched, parallel running of YAML policy tests.
+
+Core's YAML test plugin builds a simulation for every test case.
+``BatchedYamlPlugin`` collects the same cases as the same test items, but
+groups them by period, reform and the formulas their inputs override, and
+packs each group into one ``SituationBatch``, giving each case's entities
+their own block of IDs, so each variable is calculated once for the whole
+group. Groups are calculated across a process pool while the main process
+checks each case's outputs with core's own comparisons, so every case still
+passes, fails and reports on its own. Cases a batch cannot hold (those with
+axes, or inputs not given by entity) run on their own, as core runs them.
+
+Where processes can be forked, workers inherit the baseline system;
+elsewhere, each builds its own with its first group.
+"""
+
+import multiprocessing
+import os
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import pytest
+from policyengine_core.enums import Enum, EnumArray
+from policyengine_core.reforms import Reform, set_parameter
+from policyengine_core.tools.test_runner import (
+    TEST_KEYWORDS,
+    OpenFiscaPlugin,
+    YamlFile,
+    YamlItem,
+    _get_tax_benefit_system,
+)
+
+from policyengine_nz.batch import SituationBatch, formula_inputs
+from policyengine_nz.system import NewZealandTaxBenefitSystem
+
+
+# The baseline system, set in the process collecting the tests and inherited
+# or built by its workers.
+_baseline = None
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _split_input(test: dict) -> Tuple[dict, list]:
+    """A case's inputs by entity, and its inline parameter changes."""
+    entities, parameters = {}, []
+    for key, value in (test.get("input") or {}).items():
+        if "." in key:
+            parameters.append((key, value))
+        else:
+            entities[key] = value
+    return entities, parameters
+
+
+def _reform_key(parameters: list) -> str:
+    return "=".join(f"{key}:{value}" for key, value in parameters)
+
+
+def case_system(baseline, test: dict):
+    """
+    The system a test case runs on, built and cached as core's runner does.
+
+    Args:
+        baseline: The baseline system.
+        test: The test case, as loaded from YAML.
+
+    Returns:
+        The baseline with the case's reforms, inline parameter changes and
+        extensions applied.
+    """
+    _, parameters = _split_input(test)
+    inline_reforms = []
+    if parameters:
+        modifiers = [
+            set_parameter(key, value, return_modifier=True, period="year:2000:40")
+            for key, value in parameters
+        ]
+
+        class inline_reform(Reform):
+            def apply(self):
+                for modifier in modifiers:
+                    self.parameters = modifier(self.parameters)
+
+        inline_reforms = [inline_reform]
+    return _get_tax_benefit_system(
+        baseline,
+        _as_list(test.get("reforms")) + inline_reforms,
+        test.get("extensions", []),
+        reform_key=_reform_key(parameters),
+    )
+
+
+def group_key(baseline, test: dict) -> Optional[tuple]:
+    """
+    The group a test case is batched in.
+
+    Args:
+        baseline: The baseline system.
+        test: The test case, as loaded from YAML.
+
+    Returns:
+        Optional[tuple]: The case's period, reforms, extensions, inline
+        parameter changes and inputs overriding formulas (so the group
+        packs into one simulation), or None if the case cannot be batched.
+    """
+    entities, parameters = _split_input(test)
+    plurals = {entity.plural for entity in baseline.entities}
+    if (
+        not test.get("output")
+        or test.get("period") is None
+        or not TEST_KEYWORDS.issuperset(test)
+        or not entities.get(baseline.person_entity.plural)
+        or not plurals.issuperset(entities)
+    ):
+        return None
+    return (
+        str(test["period"]),
+        tuple(_as_list(test.get("reforms"))),
+        tuple(_as_list(test.get("extensions"))),
+        _reform_key(parameters),
+        formula_inputs(baseline, entities, test["period"]),
+    )
+
+
+def _requests(system, test: dict) -> Optional[set]:
+    """The (variable, period) pairs a case's outputs check, if all are known."""
+    requests = set()
+    entities = {entity.key for entity in system.entities}
+    plurals = {entity.plural for entity in system.entities}
+
+    def add(variable, expected):
+        if system.get_variable(variable) is None:
+            raise KeyError(variable)
+        if isinstance(expected, dict):
+            requests.update((variable, str(period)) for period in expected)
+        else:
+            requests.add((variable, str(test["period"])))
+
+    try:
+        for key, expected in test["output"].items():
+            if system.get_variable(key) is not None:
+                add(key, expected)
+            elif key in entities:
+                for variable, value in expected.items():
+                    add(variable, value)
+            elif key in plurals:
+                for values in expected.values():
+                    for variable, value in values.items():
+                        add(variable, value)
+            else:
+                return None
+    except (AttributeError, KeyError):
+        return None
+    return requests
+
+
+def _calculate_batch(
+    system, tests: List[dict], cases: List[int], requests: list
+) -> Dict[int, dict]:
+    batch = SituationBatch(
+        [_split_input(tests[index])[0] for index in cases],
+        period=tests[cases[0]]["period"],
+        tax_benefit_system=system,
+    )
+    results = {index: {} for index in cases}
+    failed = set()
+    for variable, period in set().union(*(requests[index] for index in cases)):
+        positions = [
+            position
+            for position, index in enumerate(cases)
+            if (variable, period) in requests[index]
+        ]
+        try:
+            values = batch.calculate(variable, period)
+        except Exception:
+            failed.update(cases[position] for position in positions)
+            continue
+        for position in positions:
+            results[cases[position]][variable, period] = values[position]
+    return {index: values for index, values in results.items() if index not in failed}
+
+
+def _calculate_group(tests: List[dict]) -> List[Optional[dict]]:
+    """
+    Calculate the outputs of one group of test cases in a single batch.
+
+    Returns:
+        List[Optional[dict]]: For each case, its outputs by (variable,
+        period), in the order of its situation's entities, or None if it
+        must run on its own (e.g. because its calculation fails, so that
+        core reports the error).
+    """
+    global _baseline
+    if _baseline is None:
+        _baseline = NewZealandTaxBenefitSystem()
+    system = case_system(_baseline, tests[0])
+    requests = [_requests(system, test) for test in tests]
+    cases = [index for index, request in enumerate(requests) if request is not None]
+    values = {}
+    if cases:
+        try:
+            values = _calculate_batch(system, tests, cases, requests)
+        except Exception:
+            # One case's inputs can spoil the batch, so try each alone.
+            for index in cases:
+                try:
+                    values.update(_calculate_batch(system, tests, [index], requests))
+                except Exception:
+                    pass
+    return [values.get(index) for index in range(len(tests))]
+
+
+class _Instances:
+    def __init__(self, ids: List[str]):
+        self.ids = ids
+
+    def get_index(self, id) -> int:
+        return self.ids.index(str(id))
+
+
+class _CaseOutputs:
+    """A case's batched outputs, read as ``YamlItem`` reads a simulation."""
+
+    def __init__(self, system, entities: dict, values: dict):
+        self.tax_benefit_system = system
+        self.populations = {entity.key: entity for entity in system.entities}
+        self.instances = {
+            entity.plural: _Instances(
+                [str(name) for name in entities.get(entity.plural) or [entity.key]]
+            )
+            for entity in system.entities
+        }
+        self.values = values
+
+    def get_population(self, plural: str) -> Optional[_Instances]:
+        return self.instances.get(plural)
+
+    def calculate(self, variable_name: str, period) -> object:
+        values = self.values[variable_name, str(period)]
+        variable = self.tax_benefit_system.get_variable(variable_name)
+        if variable.value_type == Enum:
+            return EnumArray(values, variable.possible_values)
+        return values
+
+
+class BatchedYamlItem(YamlItem):
+    """A YAML test case, checked against its group's batched outputs."""
+
+    def __init__(self, *, plugin, **kwargs):
+        super().__init__(**kwargs)
+        self.plugin = plugin
+        self.position = None
+        self.group = group_key(self.baseline_tax_benefit_system, self.test)
+
+    def runtest(self):
+        values = self.plugin.outputs(self)
+        if values is None:
+            return super().runtest()
+        self.name = self.test.get("name", "")
+        self.tax_benefit_system = case_system(
+            self.baseline_tax_benefit_system, self.test
+        )
+        self.simulation = _CaseOutputs(
+            self.tax_benefit_system, _split_input(self.test)[0], values
+        )
+        self.check_output()
+
+
+class BatchedYamlFile(YamlFile):
+    def __init__(self, *, plugin, **kwargs):
+        super().__init__(**kwargs)
+        self.plugin = plugin
+
+    def collect(self):
+        for item in super().collect():
+            yield BatchedYamlItem.from_parent(
+                self,
+                name="",
+                baseline_tax_benefit_system=self.tax_benefit_system,
+                test=item.test,
+                options=self.options,
+                plugin=self.plugin,
+            )
+
+
+class BatchedYamlPlugin(OpenFiscaPlugin):
+    """
+    Pytest plugin running YAML policy tests in batches, in parallel.
+
+    Args:
+        tax_benefit_system: The baseline system.
+        options: Core's test options (e.g. ``only_variables``).
+        processes: Number of worker processes. Defaults to the number of
+            CPUs, capped at the number of groups. With one, groups are
+            calculated in this process as their first case runs.
+    """
+
+    def __init__(self, tax_benefit_system, options, processes: int = None):
+        super().__init__(tax_benefit_system, options)
+        self.processes = processes
+        self.groups: Dict[tuple, list] = {}
+        self._results = {}
+        self._pool = None
+        self._previous = None
+
+    def pytest_collect_file(self, parent, file_path):
+        if file_path.suffix in [".yaml", ".yml"]:
+            return BatchedYamlFile.from_parent(
+                parent,
+                path=file_path,
+                tax_benefit_system=self.tax_benefit_system,
+                options=self.options,
+                plugin=self,
+            )
+
+    def pytest_collection_finish(self, session):
+        global _baseline
+        self.groups, self._results = {}, {}
+        for item in session.items:
+            if getattr(item, "plugin", None) is self and item.group is not None:
+                members = self.groups.setdefault(item.group, [])
+                item.position = len(members)
+                members.append(item)
+
+        self._previous, _baseline = _baseline, self.tax_benefit_system
+        processes = self.processes
+        if processes is None:
+            processes = os.cpu_count() or 1
+        processes = min(processes, len(self.groups))
+        if processes > 1:
+            if "fork" in multiprocessing.get_all_start_methods():
+                self._pool = multiprocessing.get_context("fork").Pool(processes)
+            else:
+                self._pool = multiprocessing.get_context().Pool(processes)
+            for key, items in self.groups.items():
+                self._results[key] = self._pool.apply_async(
+                    _calculate_group, ([item.test for item in items],)
+                )
+
+    def pytest_sessionfinish(self, session):
+        global _baseline
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+        _baseline = self._previous
+
+    def outputs(self, item: BatchedYamlItem) -> Optional[dict]:
+        """A case's batched outputs, or None if it must run on its own."""
+        items = self.groups.get(item.group)
+        if items is None or getattr(item, "position", None) is None:
+            return None
+        result = self._results.get(item.group)
+        if result is None:
+            result = _calculate_group([member.test for member in items])
+        elif not isinstance(result, list):
+            try:
+                result = result.get()
+            except Exception:
+                result = [None] * len(items)
+        self._results[item.group] = result
+        return result[item.position]
+
+
+def run_tests(
+    paths: Union[str, Sequence[str]],
+    processes: int = None,
+    options: dict = None,
+) -> int:
+    """
+    Run YAML policy tests in batches, in parallel.
+
+    Args:
+        paths: Files or directories of YAML tests.
+        processes: Number of worker processes (see ``BatchedYamlPlugin``).
+        options: Core's test options.
+
+    Returns:
+        int: Pytest's exit code.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    plugin = BatchedYamlPlugin(NewZealandTaxBenefitSystem(), options or {}, processes)
+    return pytest.main(
+        ["--capture", "no", "--maxfail", "0", "--tb", "short", *paths],
+        plugins=[plugin],
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="YAML test files or directories")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes")
+    arguments = parser.parse_args()
+    sys.exit(run_tests(arguments.paths, arguments.processes))
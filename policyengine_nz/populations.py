@@ -0,0 +1,192 @@
+"""
+Group populations with a persistent index of their members.
+
+Core's group populations recompute how members map to groups on most
+reductions: each role filter compares every person's role object, and
+``max``, ``min``, ``all`` and ``value_nth_person`` loop over member
+positions, which core itself finds with a Python loop over people. A
+``NewZealandGroupPopulation`` builds a ``GroupIndex`` once, when first
+needed, and shares it with its clones and branches, so each reduction is a
+single vectorised pass over the people.
+"""
+
+from typing import Any, Callable, Dict
+
+import numpy as np
+from numpy.typing import ArrayLike
+from policyengine_core import projectors
+from policyengine_core.entities import Role
+from policyengine_core.enums import EnumArray
+from policyengine_core.populations import GroupPopulation
+
+
+class GroupIndex:
+    """
+    The members of each group, sorted by group.
+
+    Attributes:
+        entity_id: The group index of each person.
+        order: People sorted by group, in their order within each group.
+        counts: The number of members of each group.
+        starts: The position in ``order`` of each group's first member.
+        position: Each person's position within their group, in order of
+            appearance (as core numbers them).
+        is_sorted: Whether people are already sorted by group, so that
+            ``order`` is the identity.
+    """
+
+    def __init__(self, entity_id: ArrayLike, count: int):
+        self.entity_id = entity_id = np.asarray(entity_id)
+        self.is_sorted = bool(np.all(entity_id[1:] >= entity_id[:-1]))
+        if self.is_sorted:
+            self.order = np.arange(len(entity_id))
+        else:
+            self.order = np.argsort(entity_id, kind="stable")
+        self.counts = np.bincount(entity_id, minlength=count)
+        self.starts = np.cumsum(self.counts) - self.counts
+        self.position = np.empty_like(entity_id)
+        self.position[self.order] = np.arange(len(entity_id)) - np.repeat(
+            self.starts, self.counts
+        )
+        self.nonempty = self.counts > 0
+        self._role_masks: Dict[str, np.ndarray] = {}
+
+    def sorted_values(self, array: ArrayLike) -> np.ndarray:
+        """Members' values, sorted by group."""
+        return array if self.is_sorted else array[self.order]
+
+    def role_mask(self, roles: ArrayLike, role: Role) -> np.ndarray:
+        """Whether each person has ``role`` (or one of its subroles)."""
+        mask = self._role_masks.get(role.key)
+        if mask is None:
+            mask = self._role_masks[role.key] = np.logical_or.reduce(
+                [roles == subrole for subrole in role.subroles or [role]]
+            )
+        return mask
+
+
+class NewZealandGroupPopulation(GroupPopulation):
+    """A group population answering reductions from a ``GroupIndex``."""
+
+    def __init__(self, entity, members):
+        super().__init__(entity, members)
+        self._index = None
+
+    @property
+    def index(self) -> GroupIndex:
+        if self._index is None:
+            self._index = GroupIndex(self.members_entity_id, self.count)
+        return self._index
+
+    @property
+    def members_entity_id(self) -> ArrayLike:
+        return self._members_entity_id
+
+    @members_entity_id.setter
+    def members_entity_id(self, members_entity_id: ArrayLike) -> None:
+        self._members_entity_id = members_entity_id
+        self._index = None
+
+    @property
+    def members_role(self) -> ArrayLike:
+        return GroupPopulation.members_role.fget(self)
+
+    @members_role.setter
+    def members_role(self, members_role: ArrayLike) -> None:
+        GroupPopulation.members_role.fset(self, members_role)
+        self._index = None
+
+    @property
+    def members_position(self) -> ArrayLike:
+        if self._members_position is None and self.members_entity_id is not None:
+            return self.index.position
+        return self._members_position
+
+    @members_position.setter
+    def members_position(self, members_position: ArrayLike) -> None:
+        self._members_position = members_position
+
+    @property
+    def ordered_members_map(self) -> ArrayLike:
+        return self.index.order
+
+    def clone(self, simulation, members, share_arrays: bool = False):
+        result = super().clone(simulation, members, share_arrays=share_arrays)
+        result.__class__ = NewZealandGroupPopulation
+        result._index = self._index
+        return result
+
+    def _role_filter(self, role: Role) -> np.ndarray:
+        self.entity.check_role_validity(role)
+        return self.index.role_mask(self.members_role, role)
+
+    @projectors.projectable
+    def sum(self, array: ArrayLike, role: Role = None) -> ArrayLike:
+        self.members.check_array_compatible_with_entity(array)
+        if role is not None:
+            array = np.where(self._role_filter(role), array, 0)
+        return np.bincount(self.members_entity_id, weights=array, minlength=self.count)
+
+    @projectors.projectable
+    def reduce(
+        self,
+        array: ArrayLike,
+        reducer: Callable,
+        neutral_element: Any,
+        role: Role = None,
+    ) -> ArrayLike:
+        if not hasattr(reducer, "reduceat"):
+            return super().reduce(array, reducer, neutral_element, role=role)
+        self.members.check_array_compatible_with_entity(array)
+        if role is not None:
+            array = np.where(self._role_filter(role), array, neutral_element)
+        index = self.index
+        result = self.filled_array(neutral_element)
+        if len(array):
+            reduced = reducer.reduceat(
+                index.sorted_values(np.asarray(array)),
+                index.starts[index.nonempty],
+            )
+            result[index.nonempty] = reducer(result[index.nonempty], reduced)
+        return result
+
+    @projectors.projectable
+    def nb_persons(self, role: Role = None) -> ArrayLike:
+        if role:
+            return self.sum(self._role_filter(role))
+        return self.index.counts.copy()
+
+    @projectors.projectable
+    def value_from_person(
+        self, array: ArrayLike, role: Role, default: Any = 0
+    ) -> ArrayLike:
+        self.entity.check_role_validity(role)
+        if role.max != 1:
+            raise Exception(
+                f"You can only use value_from_person with a role that is unique "
+                f"in {self.key}. Role {role.key} is not unique."
+            )
+        self.members.check_array_compatible_with_entity(array)
+        result = self.filled_array(default, dtype=array.dtype)
+        mask = self._role_filter(role)
+        result[self.members_entity_id[mask]] = np.asarray(array)[mask]
+        if isinstance(array, EnumArray):
+            result = EnumArray(result, array.possible_values)
+        return result
+
+    @projectors.projectable
+    def value_nth_person(self, n: int, array: ArrayLike, default: Any = 0) -> ArrayLike:
+        self.members.check_array_compatible_with_entity(array)
+        index = self.index
+        result = self.filled_array(default, dtype=array.dtype)
+        has_nth = index.counts > n
+        result[has_nth] = np.asarray(array)[index.order[index.starts[has_nth] + n]]
+        if isinstance(array, EnumArray):
+            result = EnumArray(result, array.possible_values)
+        return result
+
+    def project(self, array: ArrayLike, role: Role = None) -> ArrayLike:
+        self.check_array_compatible_with_entity(array)
+        if role is None:
+            return array[self.members_entity_id]
+        return np.where(self._role_filter(role), array[self.members_entity_id], 0)
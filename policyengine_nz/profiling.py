@@ -0,0 +1,320 @@
+"""
+Per-variable profiling of simulations.
+
+``Simulation.profile()`` returns a ``Profiler``: while it is active, every
+calculation in the simulation (and the branches it creates) is timed, along
+with the entity projections formulas make (``family.sum(...)``,
+``person.family(...)``, ``household.max(...)``, ...). The profile can be
+read as a table, with one row per variable and period, or written as folded
+stacks for flame graph tools.
+
+Nothing is instrumented outside a profiler: a simulation keeps core's
+simple tracer, and projection methods are only wrapped while some profiler
+is active, so leaving profiling available costs nothing when it is off.
+While profiling, core's shortcut for values already calculated is skipped so
+that cache hits are counted, which makes repeated reads a little slower.
+"""
+
+import functools
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from policyengine_core.populations import GroupPopulation, Population
+from policyengine_core.tracers import SimpleTracer
+
+from policyengine_nz.populations import NewZealandGroupPopulation
+
+
+# Entity methods recorded as projections, by the population classes defining
+# them.
+PROJECTIONS = {
+    (GroupPopulation, NewZealandGroupPopulation): (
+        "sum",
+        "any",
+        "all",
+        "max",
+        "min",
+        "nb_persons",
+        "value_from_person",
+        "value_from_first_person",
+        "project",
+    ),
+    (Population,): ("value_from_partner", "get_rank"),
+}
+
+TABLE_COLUMNS = [
+    "variable",
+    "period",
+    "branch",
+    "kind",
+    "calls",
+    "cache_hits",
+    "total_ms",
+    "self_ms",
+    "size",
+    "bytes",
+]
+
+_lock = threading.Lock()
+_active_profilers = 0
+_original_methods = {}
+
+
+def _instrumented(function, name: str):
+    @functools.wraps(function)
+    def instrumented(population, *args, **kwargs):
+        simulation = population.__dict__.get("simulation")
+        tracer = getattr(simulation, "tracer", None)
+        if not isinstance(tracer, ProfilingTracer):
+            return function(population, *args, **kwargs)
+        tracer.record_projection_start(f"{population.entity.key}.{name}")
+        try:
+            result = function(population, *args, **kwargs)
+            tracer.record_calculation_result(result)
+            return result
+        finally:
+            tracer.record_projection_end()
+
+    return instrumented
+
+
+def _instrument_projections() -> None:
+    global _active_profilers
+    with _lock:
+        if _active_profilers == 0:
+            for classes, names in PROJECTIONS.items():
+                for cls in classes:
+                    for name in names:
+                        if name in cls.__dict__:
+                            function = cls.__dict__[name]
+                            _original_methods[cls, name] = function
+                            setattr(cls, name, _instrumented(function, name))
+        _active_profilers += 1
+
+
+def _restore_projections() -> None:
+    global _active_profilers
+    with _lock:
+        _active_profilers -= 1
+        if _active_profilers == 0:
+            for (cls, name), function in _original_methods.items():
+                setattr(cls, name, function)
+            _original_methods.clear()
+
+
+class _Stats:
+    __slots__ = ("kind", "calls", "cache_hits", "total", "self", "size", "bytes")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.calls = 0
+        self.cache_hits = 0
+        self.total = 0.0
+        self.self = 0.0
+        self.size = 0
+        self.bytes = 0
+
+
+class _Frame:
+    __slots__ = ("key", "label", "start", "children", "cache_hit", "size", "bytes")
+
+    def __init__(self, key: tuple, label: str, cache_hit: bool):
+        self.key = key
+        self.label = label
+        self.cache_hit = cache_hit
+        self.children = 0.0
+        self.size = 0
+        self.bytes = 0
+        self.start = time.perf_counter()
+
+
+class ProfilingTracer(SimpleTracer):
+    """A tracer timing each calculation and projection of a simulation."""
+
+    def __init__(self, simulation):
+        super().__init__()
+        self.simulation = simulation
+        self.stats: Dict[tuple, _Stats] = {}
+        # Self time of each stack of frame labels, for flame graphs.
+        self.stacks: Dict[Tuple[str, ...], float] = defaultdict(float)
+        self._frames = []
+        self._labels = []
+
+    def _simulation_for(self, branch_name: str):
+        simulation = self.simulation
+        if simulation.branch_name == branch_name:
+            return simulation
+        pending = list(simulation.branches.values())
+        while pending:
+            branch = pending.pop()
+            if branch.branch_name == branch_name:
+                return branch
+            pending.extend(branch.branches.values())
+        return None
+
+    def _start(self, key: tuple, label: str, cache_hit: bool) -> None:
+        self._labels.append(label)
+        self._frames.append(_Frame(key, label, cache_hit))
+
+    def _end(self, kind: str) -> None:
+        frame = self._frames.pop()
+        elapsed = time.perf_counter() - frame.start
+        if self._frames:
+            self._frames[-1].children += elapsed
+        stats = self.stats.get(frame.key)
+        if stats is None:
+            stats = self.stats[frame.key] = _Stats(kind)
+        stats.calls += 1
+        stats.cache_hits += frame.cache_hit
+        stats.total += elapsed
+        stats.self += elapsed - frame.children
+        stats.size = max(stats.size, frame.size)
+        if not frame.cache_hit:
+            stats.bytes += frame.bytes
+        self.stacks[tuple(self._labels)] += elapsed - frame.children
+        self._labels.pop()
+
+    def record_calculation_start(
+        self, variable: str, period, branch_name: str = "default"
+    ) -> None:
+        super().record_calculation_start(variable, period, branch_name)
+        simulation = self._simulation_for(branch_name)
+        cache_hit = (
+            simulation is not None
+            and simulation.get_holder(variable).get_array(period, branch_name)
+            is not None
+        )
+        label = variable
+        if branch_name != self.simulation.branch_name:
+            label = f"{variable} [{branch_name}]"
+        self._start((variable, str(period), branch_name), label, cache_hit)
+
+    def record_calculation_result(self, value) -> None:
+        if self._frames and isinstance(value, np.ndarray):
+            self._frames[-1].size = value.size
+            self._frames[-1].bytes = value.nbytes
+
+    def record_calculation_end(self) -> None:
+        super().record_calculation_end()
+        self._end("variable")
+
+    def record_projection_start(self, name: str) -> None:
+        branch_name = self.stack[-1]["branch_name"] if self.stack else ""
+        self._start((name, "", branch_name), name, False)
+
+    def record_projection_end(self) -> None:
+        self._end("projection")
+
+
+class Profiler:
+    """
+    Profiles a simulation's calculations while active.
+
+    Use as a context manager, e.g. ``with simulation.profile() as profiler:``,
+    or call ``start`` and ``stop``. Profiles accumulate over repeated use.
+
+    Args:
+        simulation: The simulation to profile.
+    """
+
+    def __init__(self, simulation):
+        self.simulation = simulation
+        self.tracer = ProfilingTracer(simulation)
+        self._previous = None
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """Start recording the simulation's calculations."""
+        if self._previous is not None:
+            raise RuntimeError("The profiler is already running.")
+        simulation = self.simulation
+        if simulation.tracer.stack:
+            raise RuntimeError("Cannot start profiling during a calculation.")
+        self._previous = simulation.tracer, simulation._trace
+        # ``_trace`` is set directly, as its setter replaces the tracer. It
+        # makes branches share this tracer and every read go through it.
+        simulation.tracer = self.tracer
+        simulation._trace = True
+        _instrument_projections()
+
+    def stop(self) -> None:
+        """Stop recording, restoring the simulation's previous tracer."""
+        if self._previous is None:
+            return
+        simulation = self.simulation
+        tracer, trace = self._previous
+        self._previous = None
+        _restore_projections()
+        simulation.tracer = tracer
+        simulation._trace = trace
+        pending = list(simulation.branches.values())
+        while pending:
+            branch = pending.pop()
+            if branch.tracer is self.tracer:
+                branch.tracer = tracer if trace else SimpleTracer()
+                branch._trace = trace
+            pending.extend(branch.branches.values())
+
+    def table(self) -> pd.DataFrame:
+        """
+        Summarise the profile, slowest first.
+
+        Returns:
+            pd.DataFrame: One row per variable (and period and branch) and
+            projection, with its number of calls, how many of them read a
+            value already calculated, its total time (including what it
+            called) and self time in milliseconds, the largest array it
+            returned, and the bytes of the arrays it calculated.
+        """
+        rows = [
+            (
+                name,
+                period,
+                branch,
+                stats.kind,
+                stats.calls,
+                stats.cache_hits,
+                1_000 * stats.total,
+                1_000 * stats.self,
+                stats.size,
+                stats.bytes,
+            )
+            for (name, period, branch), stats in self.tracer.stats.items()
+        ]
+        table = pd.DataFrame(rows, columns=TABLE_COLUMNS)
+        return table.sort_values("self_ms", ascending=False, ignore_index=True)
+
+    def folded_stacks(self) -> str:
+        """
+        The profile in the folded stack format of flame graph tools.
+
+        Returns:
+            str: One line per call stack, its frames separated by ``;`` and
+            followed by the stack's self time in microseconds.
+        """
+        return "".join(
+            f"{';'.join(stack)} {round(1e6 * seconds)}\n"
+            for stack, seconds in self.tracer.stacks.items()
+            if round(1e6 * seconds) > 0
+        )
+
+    def write_flamegraph(self, file_path: Union[str, Path]) -> None:
+        """
+        Write the profile as folded stacks, readable by ``flamegraph.pl``,
+        inferno and speedscope.
+
+        Args:
+            file_path: The file to write.
+        """
+        Path(file_path).write_text(self.folded_stacks())
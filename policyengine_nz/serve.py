@@ -0,0 +1,391 @@
+"""
+A local HTTP service for household calculations.
+
+Usage:
+
+    python -m policyengine_nz.serve [--host 127.0.0.1] [--port 8080]
+        [--reform name=reform.json ...] [--max-batch 64] [--max-delay-ms 5]
+        [--cache-entries 10000] [--cache-dir DIR] [--cache-max-mb 1024]
+
+The baseline system, and a system for each named reform (a JSON file of
+parameter changes, as ``NewZealandTaxBenefitSystem`` accepts as ``reform``),
+are built once at startup and kept warm. Each system has a batcher thread:
+requests waiting for it are packed into one ``SituationBatch`` and, while
+requests are arriving together, the batch waits up to ``max_delay`` after
+the first for others to join. Calculating a batch costs little more than
+calculating one situation, so throughput grows with load while a lone
+request is calculated at once. Only the standard library is used for HTTP.
+
+Endpoints:
+
+    GET /health
+        {"status": "ok", "reforms": [...], "requests": n, "batches": n,
+         "cache": {"hits": n, "misses": n, ...}}
+    POST /calculate
+        {"situation": {...}, "variables": [...], "period": 2025,
+         "reform": "baseline"}
+        -> {"period": "2025", "results": {variable: [one value per entity]}}
+
+Values are listed in the order the situation defines its entities; enums are
+given by name. Repeated requests are answered from a ``ResultCache`` (in
+memory by default, and optionally on disk) without calculating. Invalid
+requests get status 400, with {"error": message}; calculations not finished
+within ``TIMEOUT`` get 503, and any other failure 500.
+"""
+
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+from policyengine_core.enums import Enum
+
+from policyengine_nz.artifact import load_system
+from policyengine_nz.batch import SituationBatch, formula_inputs
+from policyengine_nz.cache import MAX_ENTRIES, ResultCache
+from policyengine_nz.system import Simulation
+
+
+BASELINE = "baseline"
+
+# Most requests packed into one batch.
+MAX_BATCH = 64
+
+# Longest a request waits, in seconds, for others to join its batch, once
+# requests are arriving together.
+MAX_DELAY = 0.005
+
+# Longest a request waits, in seconds, for its result.
+TIMEOUT = 30.0
+
+
+class _Batcher(threading.Thread):
+    """Packs the requests waiting for one system into batches."""
+
+    def __init__(self, system, max_batch: int, max_delay: float):
+        super().__init__(daemon=True)
+        self.system = system
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = queue.Queue()
+        self.requests = 0
+        self.batches = 0
+
+    def submit(self, situation: dict, variables: List[str], period: str) -> Future:
+        future = Future()
+        self.queue.put((situation, variables, period, future))
+        return future
+
+    def run(self):
+        batched = False
+        while True:
+            pending = [self.queue.get()]
+            # Wait for others only once requests are arriving together, so
+            # that a lone request is not delayed.
+            delay = self.max_delay if batched or not self.queue.empty() else 0
+            deadline = time.perf_counter() + delay
+            while len(pending) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                try:
+                    pending.append(
+                        self.queue.get(block=timeout > 0, timeout=max(timeout, 0))
+                    )
+                except queue.Empty:
+                    break
+            self.requests += len(pending)
+            batched = len(pending) > 1
+            groups = {}
+            for request in pending:
+                situation, _, period, future = request
+                try:
+                    key = period, formula_inputs(self.system, situation, period)
+                except Exception as error:
+                    future.set_exception(ValueError(str(error)))
+                    continue
+                groups.setdefault(key, []).append(request)
+            for (period, _), requests in groups.items():
+                self._calculate(period, requests)
+
+    def _calculate(self, period: str, requests: list) -> None:
+        try:
+            results = _calculate_batch(self.system, period, requests)
+        except Exception as error:
+            if len(requests) > 1:
+                # One situation can spoil the batch, so calculate each alone.
+                for request in requests:
+                    self._calculate(period, [request])
+            else:
+                requests[0][3].set_exception(ValueError(str(error)))
+            return
+        self.batches += 1
+        for request, result in zip(requests, results):
+            request[3].set_result(result)
+
+
+def _values(system, variable: str, values: np.ndarray) -> list:
+    variable = system.get_variable(variable)
+    if variable.value_type == Enum:
+        names = [item.name for item in variable.possible_values]
+        return [names[index] for index in values]
+    return values.tolist()
+
+
+def _calculate_batch(system, period: str, requests: list) -> List[dict]:
+    batch = SituationBatch(
+        [situation for situation, _, _, _ in requests],
+        period=period,
+        tax_benefit_system=system,
+    )
+    variables = {variable for _, names, _, _ in requests for variable in names}
+    values = {variable: batch.calculate(variable) for variable in variables}
+    return [
+        {
+            variable: _values(system, variable, values[variable][index])
+            for variable in names
+        }
+        for index, (_, names, _, _) in enumerate(requests)
+    ]
+
+
+class Calculator:
+    """
+    Warm systems calculating situations in micro-batches.
+
+    Args:
+        reforms: Reforms by name, each anything ``NewZealandTaxBenefitSystem``
+            accepts as ``reform``. The baseline is always available as
+            ``"baseline"``.
+        max_batch: Most requests packed into one batch.
+        max_delay: Longest a request waits, in seconds, for others to join
+            its batch.
+        cache: A cache of results, skipping the calculation of repeated
+            requests. Only the baseline and parameter dict reforms are
+            cached.
+    """
+
+    def __init__(
+        self,
+        reforms: Dict[str, object] = None,
+        max_batch: int = MAX_BATCH,
+        max_delay: float = MAX_DELAY,
+        cache: ResultCache = None,
+    ):
+        reforms = {BASELINE: None, **(reforms or {})}
+        self.cache = cache
+        # Reforms identified by content, whose results can be cached.
+        self.cacheable = {
+            name: reform
+            for name, reform in reforms.items()
+            if reform is None or isinstance(reform, dict)
+        }
+        self.batchers = {
+            name: _Batcher(load_system(reform=reform), max_batch, max_delay)
+            for name, reform in reforms.items()
+        }
+        for batcher in self.batchers.values():
+            batcher.start()
+
+    def calculate(
+        self,
+        situation: dict,
+        variables: Sequence[str],
+        period: Union[str, int] = None,
+        reform: str = BASELINE,
+    ) -> Dict[str, list]:
+        """
+        Calculate variables for a situation, batched with concurrent calls.
+
+        Args:
+            situation: A situation dict, without axes.
+            variables: Variables to calculate.
+            period: The period of inputs given without one, and of the
+                calculations.
+            reform: The name of the system to calculate with.
+
+        Returns:
+            Dict[str, list]: Each variable's values, one per entity of its
+            type, in the order the situation defines them.
+
+        Raises:
+            ValueError: If the request is invalid.
+            TimeoutError: If the result is not ready within ``TIMEOUT``.
+        """
+        batcher = self.batchers.get(reform)
+        if batcher is None:
+            raise ValueError(f"Unknown reform '{reform}'.")
+        if not isinstance(situation, dict):
+            raise ValueError("The situation must be an object.")
+        if isinstance(variables, str) or not variables:
+            raise ValueError("Give a list of variables to calculate.")
+        for variable in variables:
+            if not isinstance(variable, str):
+                raise ValueError("Variable names must be strings.")
+            if batcher.system.get_variable(variable) is None:
+                raise ValueError(f"Unknown variable '{variable}'.")
+        period = str(period or Simulation.default_input_period)
+        key = None
+        if self.cache is not None and reform in self.cacheable:
+            key = self.cache.key(situation, variables, period, self.cacheable[reform])
+            results = self.cache.get(key)
+            if results is not None:
+                return results
+        future = batcher.submit(situation, list(variables), period)
+        try:
+            results = future.result(TIMEOUT)
+        except FutureTimeoutError:
+            raise TimeoutError(f"No result within {TIMEOUT:.0f} seconds.") from None
+        if key is not None:
+            self.cache.put(key, results)
+        return results
+
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "reforms": list(self.batchers),
+            "requests": sum(batcher.requests for batcher in self.batchers.values()),
+            "batches": sum(batcher.batches for batcher in self.batchers.values()),
+            **({"cache": self.cache.stats()} if self.cache is not None else {}),
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, Nagle's
+    # algorithm holds the body back for the client's delayed ACK.
+    disable_nagle_algorithm = True
+    calculator: Calculator = None
+    quiet = True
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._respond(200, self.calculator.health())
+        else:
+            self._respond(404, {"error": f"No such endpoint: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/calculate":
+            self._respond(404, {"error": f"No such endpoint: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            period = request.get("period")
+            results = self.calculator.calculate(
+                request.get("situation"),
+                request.get("variables"),
+                period,
+                request.get("reform", BASELINE),
+            )
+        except (ValueError, AttributeError) as error:
+            self._respond(400, {"error": str(error)})
+            return
+        except TimeoutError as error:
+            self._respond(503, {"error": str(error)})
+            return
+        except Exception as error:
+            logging.exception("Calculation failed")
+            self._respond(500, {"error": f"Internal error: {error}"})
+            return
+        period = str(period or Simulation.default_input_period)
+        self._respond(200, {"period": period, "results": results})
+
+    def _respond(self, status: int, body: dict) -> None:
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Bursts of clients connecting at once overflow the default backlog of 5,
+    # and the connections beyond it are refused.
+    request_queue_size = 128
+
+
+def make_server(
+    calculator: Calculator,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    quiet: bool = True,
+) -> ThreadingHTTPServer:
+    """
+    Create (but do not start) an HTTP server for a calculator.
+
+    Args:
+        calculator: The calculator to serve.
+        host: Address to listen on.
+        port: Port to listen on (0 for any free port).
+        quiet: Whether to skip logging each request.
+
+    Returns:
+        ThreadingHTTPServer: The server; call ``serve_forever`` to start it.
+    """
+    handler = type("Handler", (_Handler,), {"calculator": calculator, "quiet": quiet})
+    return _Server((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--reform",
+        action="append",
+        default=[],
+        metavar="NAME=PATH",
+        help="Keep a system warm for the reform in this JSON file.",
+    )
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-delay-ms", type=float, default=1_000 * MAX_DELAY)
+    parser.add_argument(
+        "--cache-entries",
+        type=int,
+        default=MAX_ENTRIES,
+        help="Results cached in memory (0 to cache none).",
+    )
+    parser.add_argument("--cache-dir", help="Also cache results in this directory.")
+    parser.add_argument(
+        "--cache-max-mb", type=float, default=1_024, help="Size of the disk cache."
+    )
+    parser.add_argument("--verbose", action="store_true", help="Log each request.")
+    args = parser.parse_args()
+
+    reforms = {}
+    for option in args.reform:
+        name, _, path = option.partition("=")
+        with open(path) as file:
+            reforms[name] = json.load(file)
+    cache = None
+    if args.cache_entries > 0 or args.cache_dir:
+        cache = ResultCache(
+            args.cache_entries, args.cache_dir, int(args.cache_max_mb * 2**20)
+        )
+    calculator = Calculator(
+        reforms, args.max_batch, args.max_delay_ms / 1_000, cache=cache
+    )
+    server = make_server(calculator, args.host, args.port, quiet=not args.verbose)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Streaming microsimulation over populations larger than memory.
+
+``StreamingMicrosimulation`` reads a person-level Parquet or CSV file in
+chunks of rows, runs the model over each chunk and writes the requested
+outputs as it goes, keeping only running weighted totals in memory. Peak
+memory depends on the chunk size, not on the size of the population.
+
+The file uses the ``NewZealandDataset`` person table format, with group
+variables (such as ``household_weight``) given on each member's row. Rows of
+a household must be adjacent (for example, sorted by ``household_id`` or
+``person_household_id``), and families, tax units and benefit units must
+not span households: each chunk then ends on a household boundary, so every
+group is simulated whole. A household split within a chunk is an error; one
+split across chunks cannot be detected without holding every ID, so sort the
+file first.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Union
+
+import numpy as np
+import pandas as pd
+
+from policyengine_nz.data.dataset import (
+    ENTITY_KEYS,
+    PARQUET_SUFFIX,
+    PERSON,
+    NewZealandDataset,
+    _import_pyarrow,
+    _membership_column,
+)
+from policyengine_nz.system import Microsimulation, NewZealandTaxBenefitSystem
+
+CSV_SUFFIX = ".csv"
+OUTPUT_FORMATS = ("parquet", "csv")
+
+
+@dataclass
+class StreamingResult:
+    """
+    Weighted aggregates of a streamed microsimulation.
+
+    Attributes:
+        totals: Weighted total of each output variable.
+        population: Weighted number of each entity (``person``,
+            ``household``, ...).
+        people: Number of person records processed.
+        households: Number of household records processed.
+        chunks: Number of chunks simulated.
+    """
+
+    totals: Dict[str, float] = field(default_factory=dict)
+    population: Dict[str, float] = field(default_factory=dict)
+    people: int = 0
+    households: int = 0
+    chunks: int = 0
+
+    def mean(self, variable: str, entity: str) -> float:
+        """The weighted mean of a variable over an entity's population."""
+        return self.totals[variable] / self.population[entity]
+
+
+class StreamingMicrosimulation:
+    """
+    A microsimulation run chunk by chunk over a person-level file.
+
+    Args:
+        file_path: A Parquet or CSV person table.
+        time_period: The period inputs are set and outputs calculated for.
+            Defaults to ``Microsimulation.default_input_period``.
+        chunk_size: The number of person rows read at a time. A chunk is
+            extended to the end of its last household.
+        tax_benefit_system: System to calculate with. Defaults to a new
+            baseline system, or one with ``reform`` applied.
+        reform: Reform to apply if no system is given.
+    """
+
+    def __init__(
+        self,
+        file_path: Union[str, Path],
+        time_period: Union[str, int] = None,
+        chunk_size: int = 100_000,
+        tax_benefit_system: NewZealandTaxBenefitSystem = None,
+        reform=None,
+    ):
+        self.file_path = Path(file_path)
+        if self.file_path.suffix not in (PARQUET_SUFFIX, CSV_SUFFIX):
+            raise ValueError(
+                f"Unsupported file {self.file_path}: stream a Parquet or CSV file."
+            )
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive.")
+        self.time_period = str(time_period or Microsimulation.default_input_period)
+        self.chunk_size = chunk_size
+        if tax_benefit_system is None:
+            tax_benefit_system = NewZealandTaxBenefitSystem(reform=reform)
+        self.tax_benefit_system = tax_benefit_system
+
+    def _read(self) -> Iterator[pd.DataFrame]:
+        if self.file_path.suffix == CSV_SUFFIX:
+            yield from pd.read_csv(self.file_path, chunksize=self.chunk_size)
+            return
+        pa = _import_pyarrow()
+        import pyarrow.parquet
+
+        parquet_file = pa.parquet.ParquetFile(self.file_path)
+        for batch in parquet_file.iter_batches(batch_size=self.chunk_size):
+            yield batch.to_pandas()
+
+    def chunks(self) -> Iterator[NewZealandDataset]:
+        """
+        Read the file as datasets of whole households.
+
+        Yields:
+            NewZealandDataset: The person table of each chunk's households.
+        """
+        carried = None
+        first_person = 0
+        for rows in self._read():
+            if carried is not None:
+                rows = pd.concat([carried, rows], ignore_index=True)
+            household_column = _membership_column(rows, "household")
+            if household_column is None:
+                # Everyone is their own household, so any row ends one.
+                carried = None
+            else:
+                household_ids = rows[household_column].to_numpy()
+                last = len(rows) - 1
+                while last > 0 and household_ids[last - 1] == household_ids[-1]:
+                    last -= 1
+                # The last household may continue in the next rows.
+                carried = rows.iloc[last:]
+                rows = rows.iloc[:last]
+                if len(rows) == 0:
+                    continue
+            yield self._dataset(rows, first_person)
+            first_person += len(rows)
+        if carried is not None and len(carried) > 0:
+            yield self._dataset(carried, first_person)
+
+    def _dataset(self, rows: pd.DataFrame, first_person: int) -> NewZealandDataset:
+        rows = rows.reset_index(drop=True)
+        if "person_id" not in rows:
+            rows["person_id"] = np.arange(first_person, first_person + len(rows))
+        household_column = _membership_column(rows, "household")
+        if household_column is not None:
+            household_ids = rows[household_column].to_numpy()
+            runs = 1 + np.count_nonzero(household_ids[1:] != household_ids[:-1])
+            if len(np.unique(household_ids)) != runs:
+                raise ValueError(
+                    f"The rows of each household in {self.file_path} must be "
+                    f"adjacent. Sort the file by {household_column}."
+                )
+        return NewZealandDataset(
+            {PERSON: rows},
+            time_period=self.time_period,
+            name=self.file_path.stem,
+        )
+
+    def run(
+        self,
+        variables: List[str],
+        output_path: Union[str, Path] = None,
+        output_format: str = "parquet",
+    ) -> StreamingResult:
+        """
+        Simulate every chunk, writing outputs and accumulating totals.
+
+        Args:
+            variables: The variables to calculate, which must be numeric or
+                boolean so that they can be totalled.
+            output_path: A directory to write ``<entity>.parquet`` (or
+                ``.csv``) files to, with one row per entity and a column for
+                its ID and each of its requested variables. Nothing is
+                written if not given.
+            output_format: ``"parquet"`` or ``"csv"``.
+
+        Returns:
+            StreamingResult: Weighted totals of the variables.
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(
+                f"Unknown output format {output_format!r}. "
+                f"Use one of: {', '.join(OUTPUT_FORMATS)}."
+            )
+        system = self.tax_benefit_system
+        by_entity: Dict[str, List[str]] = {}
+        for variable in variables:
+            metadata = system.get_variable(variable, check_existence=True)
+            if metadata.value_type not in (float, int, bool):
+                raise ValueError(
+                    f"{variable} is not numeric, so cannot be streamed and totalled."
+                )
+            by_entity.setdefault(metadata.entity.key, []).append(variable)
+        writer = (
+            None if output_path is None else _OutputWriter(output_path, output_format)
+        )
+
+        result = StreamingResult(
+            totals={variable: 0.0 for variable in variables},
+            population={key: 0.0 for key in ENTITY_KEYS},
+        )
+        try:
+            for dataset in self.chunks():
+                simulation = Microsimulation(tax_benefit_system=system, dataset=dataset)
+                weights = {
+                    entity: np.asarray(
+                        simulation.get_weights(
+                            "household_weight", self.time_period, map_to=entity
+                        ),
+                        dtype=np.float64,
+                    )
+                    for entity in ENTITY_KEYS
+                }
+                for entity in ENTITY_KEYS:
+                    result.population[entity] += float(weights[entity].sum())
+                outputs = {}
+                for entity, entity_variables in by_entity.items():
+                    table = {f"{entity}_id": simulation.populations[entity].ids}
+                    for variable in entity_variables:
+                        values = simulation.calculate(
+                            variable, self.time_period, use_weights=False
+                        )
+                        result.totals[variable] += float(
+                            np.dot(values.astype(np.float64), weights[entity])
+                        )
+                        table[variable] = values
+                    outputs[entity] = pd.DataFrame(table)
+                if writer is not None:
+                    writer.write(outputs)
+                result.people += simulation.persons.count
+                result.households += simulation.populations["household"].count
+                result.chunks += 1
+        finally:
+            if writer is not None:
+                writer.close()
+        return result
+
+
+class _OutputWriter:
+    """Appends each chunk's output tables to one file per entity."""
+
+    def __init__(self, output_path: Union[str, Path], output_format: str):
+        self.output_path = Path(output_path)
+        self.output_path.mkdir(parents=True, exist_ok=True)
+        self.output_format = output_format
+        self.writers = {}
+
+    def write(self, outputs: Dict[str, pd.DataFrame]) -> None:
+        for entity, table in outputs.items():
+            file_path = self.output_path / f"{entity}.{self.output_format}"
+            if self.output_format == "csv":
+                table.to_csv(
+                    file_path,
+                    mode="a" if entity in self.writers else "w",
+                    header=entity not in self.writers,
+                    index=False,
+                )
+                self.writers[entity] = None
+                continue
+            pa = _import_pyarrow()
+            import pyarrow.parquet
+
+            arrow_table = pa.Table.from_pandas(table, preserve_index=False)
+            if entity not in self.writers:
+                self.writers[entity] = pa.parquet.ParquetWriter(
+                    file_path, arrow_table.schema
+                )
+            self.writers[entity].write_table(arrow_table)
+
+    def close(self) -> None:
+        for writer in self.writers.values():
+            if writer is not None:
+                writer.close()
@@ -6,8 +6,16 @@ parameters and variables for New Zealand's social and fiscal policies.
 """
 
 from policyengine_core.taxbenefitsystems import TaxBenefitSystem
+from policyengine_core.simulations import Simulation as CoreSimulation
+from policyengine_core.simulations import Microsimulation as CoreMicrosimulation
 from policyengine_nz.entities import entities
+from policyengine_nz.data import NewZealandDataset
+from policyengine_nz.artifact import add_variables_from_artifact
+from policyengine_nz.populations import NewZealandGroupPopulation
+from policyengine_nz.profiling import Profiler
+from policyengine_nz.export import export_outputs
 from pathlib import Path
+from typing import List, Union
 import os
 
 
@@ -42,21 +50,128 @@ class NewZealandTaxBenefitSystem(TaxBenefitSystem):
         "accommodation_costs",
     ]
 
-    def __init__(self, reform=None):
+    def __init__(self, reform=None, artifact=None):
         """
         Initialize the New Zealand tax-benefit system.
 
         Args:
             reform: Optional reform to apply to the baseline system
+            artifact: Optional prebuilt ``SystemArtifact`` to load parameters
+                and variables from, instead of the source files (see
+                ``policyengine_nz.artifact.load_system``)
         """
-        super().__init__(entities)
+        self._artifact = artifact
+        super().__init__(entities, reform=reform)
 
-        # Apply reform if provided
-        if reform is not None:
-            self.apply_reform(reform)
+    def load_parameters(self, path_to_yaml_dir):
+        if self._artifact is None:
+            return super().load_parameters(path_to_yaml_dir)
+        parameters = self._artifact.load_parameters()
+        if self.preprocess_parameters is not None:
+            parameters = self.preprocess_parameters(parameters)
+        self.parameters = parameters
+
+    def add_variables_from_directory(self, directory):
+        if self._artifact is None or Path(directory) != Path(self.variables_dir):
+            return super().add_variables_from_directory(directory)
+        add_variables_from_artifact(self, self._artifact)
+
+    def instantiate_entities(self) -> dict:
+        populations = super().instantiate_entities()
+        persons = populations[self.person_entity.key]
+        for entity in self.group_entities:
+            populations[entity.key] = NewZealandGroupPopulation(entity, persons)
+        return populations
 
     # Entity properties are handled by parent class
 
 
 # Alias for consistency with other PolicyEngine countries
 CountryTaxBenefitSystem = NewZealandTaxBenefitSystem
+
+
+class Simulation(CoreSimulation):
+    """
+    A New Zealand simulation.
+
+    In addition to situations and core datasets, this accepts a
+    ``NewZealandDataset`` or a path to one (an HDF5 file, a Parquet file or a
+    directory of Parquet files) as the ``dataset`` argument.
+
+    ``profile()`` returns a profiler recording the time each variable takes,
+    and ``export()`` writes outputs to partitioned Parquet or Arrow files.
+    """
+
+    default_tax_benefit_system = NewZealandTaxBenefitSystem
+    default_role = "member"
+    default_input_period = "2025"
+
+    def __init__(self, *args, dataset=None, **kwargs):
+        if isinstance(dataset, (str, Path)) and _is_table_dataset(Path(dataset)):
+            dataset = NewZealandDataset.from_file(
+                dataset, kwargs.get("default_input_period") or self.default_input_period
+            )
+        super().__init__(*args, dataset=dataset, **kwargs)
+
+    def build_from_dataset(self) -> None:
+        if not isinstance(self.dataset, NewZealandDataset):
+            return super().build_from_dataset()
+        if self.dataset.time_period is None:
+            self.dataset.time_period = self.default_input_period
+        self.dataset.build_populations(self)
+        self.default_calculation_period = self.dataset.time_period
+        self.tax_benefit_system.data_modified = False
+
+    def profile(self) -> "Profiler":
+        """
+        Profile this simulation's calculations.
+
+        Returns:
+            Profiler: A profiler to use as a context manager, recording each
+            variable's calls, cache hits, time and array sizes while active.
+        """
+        return Profiler(self)
+
+    def export(
+        self,
+        variables: List[str],
+        output_path: Union[str, Path],
+        periods: List[Union[str, int]] = None,
+        format: str = "parquet",
+    ) -> List[Path]:
+        """
+        Write outputs to files partitioned by entity and period.
+
+        Args:
+            variables: Variables to export, of any entities.
+            output_path: The directory to write to.
+            periods: Periods to export. Defaults to the default calculation
+                period.
+            format: ``"parquet"`` or ``"arrow"``.
+
+        Returns:
+            List[Path]: The files written.
+        """
+        return export_outputs(self, variables, output_path, periods, format)
+
+
+class Microsimulation(Simulation, CoreMicrosimulation):
+    """
+    A New Zealand simulation over weighted microdata.
+
+    Results are returned as ``MicroSeries`` weighted by ``household_weight``,
+    so aggregates such as ``sim.calculate("income_tax").sum()`` are
+    population totals.
+    """
+
+
+def _is_table_dataset(file_path: Path) -> bool:
+    """Whether a path holds entity tables rather than a core dataset."""
+    if file_path.is_dir() or file_path.suffix == ".parquet":
+        return True
+    if file_path.suffix in (".h5", ".hdf5", ".hdf") and file_path.exists():
+        import h5py
+
+        with h5py.File(file_path, "r") as f:
+            return "person" in f and isinstance(f["person"], h5py.Group)
+    return False
@@ -0,0 +1,68 @@
+"""Tests for Income Explorer-style budget constraints."""
+
+import numpy as np
+import pytest
+from policyengine_nz import NewZealandTaxBenefitSystem, Simulation
+from policyengine_nz.analysis import budget_constraint
+
+
+def _sole_parent(income=0):
+    return {
+        "people": {
+            "parent": {
+                "age": 35,
+                "employment_income": income,
+                "work_hours_per_week": 30,
+            },
+            "child1": {"age": 8},
+            "child2": {"age": 5},
+        },
+        "families": {
+            "family": {"parents": ["parent"], "children": ["child1", "child2"]}
+        },
+    }
+
+
+def test_matches_point_by_point_calculation():
+    earnings = [0, 30_000, 60_000, 90_000]
+    curve = budget_constraint(_sole_parent(), earnings, period=2025)
+    system = NewZealandTaxBenefitSystem()
+    for row, income in zip(curve.itertuples(), earnings):
+        # Separate simulations, independent of the batch machinery.
+        simulation = Simulation(
+            situation=_sole_parent(income), tax_benefit_system=system
+        )
+        assert row.income_tax == pytest.approx(
+            simulation.calculate("income_tax", 2025).sum()
+        )
+        assert row.family_tax_credit == pytest.approx(
+            simulation.calculate("family_tax_credit", 2025)[0]
+        )
+        assert row.household_net_income == pytest.approx(
+            simulation.calculate("household_net_income", 2025)[0]
+        )
+
+
+def test_varies_only_the_chosen_person():
+    situation = _sole_parent()
+    situation["people"]["child1"]["employment_income"] = 5_000
+    curve = budget_constraint(
+        situation, np.linspace(0, 20_000, 3), person="parent", period=2025
+    )
+    # The child's ACC levy on $5,000 is paid at every point.
+    assert curve.acc_earners_levy.iloc[0] == pytest.approx(5_000 * 0.0167)
+
+
+def test_marginal_tax_rate_includes_abatement():
+    curve = budget_constraint(
+        _sole_parent(), np.arange(50_000, 60_001, 1_000), period=2025
+    )
+    # 10.5%/17.5% tax, 1.67% ACC and 25% Family Tax Credit abatement
+    assert curve.marginal_tax_rate.iloc[-1] == pytest.approx(0.4417, abs=1e-3)
+
+
+def test_formula_overrides_apply_at_every_point():
+    situation = _sole_parent()
+    situation["families"]["family"]["family_tax_credit"] = 0
+    curve = budget_constraint(situation, [0, 30_000, 60_000], period=2025)
+    assert (curve.family_tax_credit == 0).all()
@@ -0,0 +1,74 @@
+"""Tests for the distributional impact engine."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from policyengine_nz import Microsimulation, NewZealandDataset
+from policyengine_nz.analysis import distributional_impact
+from policyengine_nz.analysis.households import weighted_quantile_groups
+from policyengine_nz.incremental import reform_simulation
+
+FTC_REFORM = {
+    "gov.ird.working_for_families.family_tax_credit_rates.rates.child_0_15": {
+        "2025-01-01": 10_000
+    }
+}
+
+
+def _make_dataset():
+    person = pd.DataFrame(
+        {
+            "person_id": [1, 2, 3, 4, 5, 6],
+            "household_id": [10, 10, 10, 20, 30, 40],
+            "family_id": [100, 100, 100, 200, 300, 400],
+            "age": [35, 33, 5, 40, 50, 30],
+            "employment_income": [30_000, 0, 0, 60_000, 250_000, 20_000],
+        }
+    )
+    household = pd.DataFrame(
+        {
+            "household_id": [10, 20, 30, 40],
+            "household_weight": [1_000.0, 2_000.0, 500.0, 1_500.0],
+        }
+    )
+    return NewZealandDataset(
+        {"person": person, "household": household}, time_period=2025
+    )
+
+
+def test_weighted_quantile_groups():
+    values = np.arange(20)[::-1]
+    assert list(weighted_quantile_groups(values, np.ones(20))) == list(
+        np.repeat(np.arange(10, 0, -1), 2)
+    )
+    # Records spanning several groups are placed by their middle.
+    groups = weighted_quantile_groups([1, 2, 3], [1, 7, 2], groups=10)
+    assert list(groups) == [1, 5, 10]
+    assert list(weighted_quantile_groups([], [])) == []
+
+
+def test_distributional_impact():
+    baseline = Microsimulation(dataset=_make_dataset())
+    reformed = reform_simulation(baseline, FTC_REFORM)
+    impact = distributional_impact(baseline, reformed)
+
+    change = (
+        reformed.calculate("household_net_income", 2025).sum()
+        - baseline.calculate("household_net_income", 2025).sum()
+    )
+    assert change > 0
+    assert impact.summary.total_change == pytest.approx(change)
+    assert impact.summary.people == 7_000
+    assert impact.deciles.people.sum() == pytest.approx(7_000)
+    assert impact.household_types.households.sum() == pytest.approx(5_000)
+    assert impact.components.family_tax_credit.mul(
+        impact.deciles.households
+    ).sum() == pytest.approx(change)
+    assert impact.components.income_tax.abs().sum() == 0
+
+    # Only the family with a child gains: 3,000 of 7,000 people.
+    assert impact.summary.winner_share == pytest.approx(3 / 7)
+    assert impact.summary.loser_share == 0
+    types = impact.household_types
+    assert types.loc["COUPLE_WITH_CHILDREN", "winner_share"] == 1
+    assert types.loc["SINGLE", "mean_change"] == 0
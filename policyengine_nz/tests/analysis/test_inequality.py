@@ -0,0 +1,108 @@
+"""Tests for poverty and inequality metrics."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from policyengine_nz import Microsimulation, NewZealandDataset
+from policyengine_nz.analysis import (
+    poverty_and_inequality,
+    poverty_and_inequality_impact,
+)
+from policyengine_nz.analysis.inequality import _metrics
+
+
+def _make_dataset():
+    # A sole parent household and four single adults, with net incomes set
+    # directly so that equivalised incomes are 10k, 20k, ..., 50k.
+    person = pd.DataFrame(
+        {
+            "person_id": [1, 2, 3, 4, 5, 6],
+            "household_id": [10, 10, 20, 30, 40, 50],
+            "age": [35, 5, 40, 40, 40, 40],
+        }
+    )
+    household = pd.DataFrame(
+        {
+            "household_id": [10, 20, 30, 40, 50],
+            "household_weight": [1.0, 1.0, 1.0, 1.0, 1.0],
+            "household_net_income": [13_000.0, 20_000, 30_000, 40_000, 50_000],
+            "rent": [0.0, 0, 0, 0, 20_000],
+        }
+    )
+    return NewZealandDataset(
+        {"person": person, "household": household}, time_period=2025
+    )
+
+
+def test_gini_matches_pairwise_definition():
+    rng = np.random.default_rng(0)
+    incomes = np.sort(rng.lognormal(10, 1, 200))
+    weights = rng.random(200)
+    gini = _metrics(incomes, {"all": weights[None, :]})["all"]["gini"][0]
+    differences = np.abs(incomes[:, None] - incomes[None, :])
+    expected = (weights[:, None] * weights[None, :] * differences).sum() / (
+        2 * weights.sum() ** 2 * np.average(incomes, weights=weights)
+    )
+    assert gini == pytest.approx(expected)
+
+
+def test_income_shares():
+    metrics = _metrics(np.arange(1.0, 101.0), {"all": np.ones((1, 100))})["all"]
+    assert metrics["bottom_40_share"][0] == pytest.approx(820 / 5_050)
+    assert metrics["top_10_share"][0] == pytest.approx(955 / 5_050)
+    assert metrics["top_1_share"][0] == pytest.approx(100 / 5_050)
+
+
+def test_population_medians():
+    incomes = np.arange(1.0, 11.0)
+    children = np.array([[1.0, 1, 1, 0, 0, 0, 0, 0, 0, 0]])
+    metrics = _metrics(incomes, {"all": np.ones((1, 10)), "children": children})
+    assert metrics["all"]["median"][0] == 5
+    assert metrics["children"]["median"][0] == 2
+    # Children's poverty line is 60% of everyone's median of 5, not theirs.
+    assert metrics["children"]["poverty_rate_60"][0] == pytest.approx(2 / 3)
+
+
+def test_poverty_and_inequality():
+    metrics = poverty_and_inequality(Microsimulation(dataset=_make_dataset()))
+    value = metrics["value"]
+
+    # Six people with incomes 10k, 10k, 20k, 30k, 40k and 50k.
+    assert value["bhc", "all", "median"] == 20_000
+    assert value["bhc", "all", "poverty_rate_50"] == 0
+    assert value["bhc", "all", "poverty_rate_60"] == pytest.approx(2 / 6)
+    assert value["bhc", "children", "poverty_rate_60"] == 1
+    # The one child's household has 10k.
+    assert value["bhc", "children", "median"] == 10_000
+    # Rent takes the richest household to 30k after housing costs.
+    assert value["ahc", "all", "median"] == 20_000
+    assert value["ahc", "all", "top_10_share"] < value["bhc", "all", "top_10_share"]
+    assert list(metrics.columns) == ["value"]
+
+
+@pytest.mark.filterwarnings("error::pandas.errors.PerformanceWarning")
+def test_partial_index_lookups():
+    metrics = poverty_and_inequality(Microsimulation(dataset=_make_dataset()))
+    assert metrics.index.is_monotonic_increasing
+    assert metrics.loc[("bhc", "all")].value["median"] == 20_000
+
+
+def test_bootstrap_intervals():
+    simulation = Microsimulation(dataset=_make_dataset())
+    metrics = poverty_and_inequality(simulation, bootstrap=200, seed=1)
+    assert (metrics.lower <= metrics.upper).all()
+    gini = metrics.loc["bhc", "all", "gini"]
+    assert gini.lower < gini.value < gini.upper
+    pd.testing.assert_frame_equal(
+        metrics, poverty_and_inequality(simulation, bootstrap=200, seed=1)
+    )
+
+
+def test_impact_of_identical_simulations_is_zero():
+    baseline = Microsimulation(dataset=_make_dataset())
+    impact = poverty_and_inequality_impact(
+        baseline, Microsimulation(dataset=_make_dataset()), bootstrap=50
+    )
+    assert list(impact.columns) == ["baseline", "reform", "change", "lower", "upper"]
+    assert (impact.change == 0).all()
+    assert (impact.lower == 0).all() and (impact.upper == 0).all()
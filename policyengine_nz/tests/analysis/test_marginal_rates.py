@@ -0,0 +1,71 @@
+"""Tests for effective marginal tax rates."""
+
+import numpy as np
+import pytest
+from policyengine_nz import Simulation
+from policyengine_nz.analysis import marginal_tax_rates
+from policyengine_nz.batch import SituationBatch
+
+
+def _single_person(income):
+    return {"people": {"person": {"employment_income": income, "age": 30}}}
+
+
+def _couple_with_children(income):
+    return {
+        "people": {
+            "parent": {"age": 35, "employment_income": income},
+            "partner": {"age": 35, "employment_income": 50_000},
+            "child1": {"age": 8},
+            "child2": {"age": 12},
+        },
+        "families": {
+            "family": {
+                "parents": ["parent", "partner"],
+                "children": ["child1", "child2"],
+            }
+        },
+    }
+
+
+def test_single_person_rates():
+    batch = SituationBatch(
+        [_single_person(income) for income in (10_000, 50_000, 100_000)],
+        period=2024,
+    )
+    rates = marginal_tax_rates(batch.simulation, 2024)
+    # Income tax bracket rate (none below $14,000) plus the 1.39% ACC levy
+    assert rates == pytest.approx([0.0139, 0.1889, 0.3139], abs=1e-4)
+
+
+def test_family_tax_credit_abatement_is_included():
+    batch = SituationBatch([_couple_with_children(20_000)], period=2024)
+    rates = marginal_tax_rates(batch.simulation, 2024)
+    # 10.5% tax, 1.39% ACC and 25% Family Tax Credit abatement for the
+    # parent; 17.5% tax instead of 10.5% for the partner.
+    assert rates[:2] == pytest.approx([0.3689, 0.4389], abs=1e-4)
+
+
+def test_investment_income_is_not_levied():
+    batch = SituationBatch([_single_person(50_000)], period=2024)
+    rates = marginal_tax_rates(
+        batch.simulation, 2024, income_variable="investment_income"
+    )
+    assert rates == pytest.approx([0.175], abs=1e-4)
+
+
+def test_matches_separate_simulations():
+    batch = SituationBatch(
+        [_couple_with_children(income) for income in (0, 40_000)], period=2025
+    )
+    rates = marginal_tax_rates(batch.simulation, 2025, delta=100)
+
+    # Raise the first parent's income by $100 in a simulation of its own.
+    for income, rate in zip((0, 40_000), rates[::4]):
+        net_income = [
+            Simulation(situation=_couple_with_children(amount)).calculate(
+                "household_net_income", 2025
+            )[0]
+            for amount in (income, income + 100)
+        ]
+        assert rate == pytest.approx(1 - (net_income[1] - net_income[0]) / 100)
@@ -0,0 +1,81 @@
+"""Tests for parallel reform scoring."""
+
+import multiprocessing
+
+import pandas as pd
+import pytest
+from policyengine_nz import Microsimulation, NewZealandDataset
+from policyengine_nz.analysis import score_reforms
+
+REFORMS = {
+    "levy": {"gov.ird.acc.earners_levy_rate": {"2025-01-01": 0.05}},
+    "top_rate": {"gov.ird.income_tax.rates.rates.bracket_5": {"2025-01-01": 0.45}},
+    "ftc": {
+        "gov.ird.working_for_families.family_tax_credit_rates.rates.child_0_15": {
+            "2025-01-01": 10_000
+        }
+    },
+}
+
+
+def _make_dataset():
+    person = pd.DataFrame(
+        {
+            "person_id": [1, 2, 3, 4, 5],
+            "household_id": [10, 10, 10, 20, 30],
+            "family_id": [100, 100, 100, 200, 300],
+            "age": [35, 33, 5, 40, 50],
+            "employment_income": [30_000, 0, 0, 60_000, 250_000],
+        }
+    )
+    household = pd.DataFrame(
+        {
+            "household_id": [10, 20, 30],
+            "household_weight": [1_000.0, 2_000.0, 500.0],
+        }
+    )
+    return NewZealandDataset(
+        {"person": person, "household": household}, time_period=2025
+    )
+
+
+def test_scores_match_separate_simulations():
+    scores = score_reforms(REFORMS, _make_dataset(), processes=1)
+    baseline = Microsimulation(dataset=_make_dataset())
+
+    assert list(scores.index) == list(REFORMS)
+    for name, reform in REFORMS.items():
+        reformed = Microsimulation(dataset=_make_dataset(), reform=reform)
+        change = (
+            reformed.calculate("household_net_income", 2025).sum()
+            - baseline.calculate("household_net_income", 2025).sum()
+        )
+        assert scores.loc[name, "net_income_change"] == pytest.approx(change)
+    # Raising the top rate changes tax, and GST through spending.
+    top_rate = scores.loc["top_rate"]
+    assert top_rate.tax_revenue_change > 0
+    assert top_rate.gst_revenue_change < 0
+    assert top_rate.benefit_spending_change == 0
+    assert top_rate.budgetary_impact == pytest.approx(
+        top_rate.gst_revenue_change - top_rate.net_income_change
+    )
+    assert top_rate.loser_share == pytest.approx(1 / 5_500 * 500)
+    assert scores.loc["ftc", "winner_share"] == pytest.approx(3_000 / 5_500)
+    assert scores.loc["ftc", "loser_share"] == 0
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="Requires forked worker processes.",
+)
+def test_parallel_scores_match_serial():
+    dataset = _make_dataset()
+    serial = score_reforms(REFORMS, dataset, processes=1)
+    parallel = score_reforms(REFORMS, dataset, processes=2)
+
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_requires_one_population():
+    with pytest.raises(ValueError, match="exactly one"):
+        score_reforms(REFORMS)
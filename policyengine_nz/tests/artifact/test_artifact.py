@@ -0,0 +1,103 @@
+import pytest
+from policyengine_core.reforms import Reform
+
+from policyengine_nz import NewZealandTaxBenefitSystem, Simulation, load_system
+from policyengine_nz import artifact as artifact_module
+from policyengine_nz.artifact import load_artifact
+
+
+SITUATION = {"people": {"you": {"employment_income": {"2025": 200_000}}}}
+
+
+def income_tax(system):
+    simulation = Simulation(situation=SITUATION, tax_benefit_system=system)
+    return simulation.calculate("income_tax", 2025)[0]
+
+
+@pytest.fixture
+def artifact_path(tmp_path):
+    return tmp_path / "system.pkl"
+
+
+def test_system_from_artifact_matches_source(artifact_path):
+    source = NewZealandTaxBenefitSystem()
+    system = load_system(path=artifact_path)
+
+    assert artifact_path.exists()
+    assert list(system.variables) == list(source.variables)
+    assert system.variable_module_metadata == source.variable_module_metadata
+    assert income_tax(system) == pytest.approx(income_tax(source))
+
+
+def test_artifact_reused_and_systems_independent(artifact_path):
+    first = load_system(path=artifact_path)
+    artifact = load_artifact(artifact_path)
+    second = load_system(path=artifact_path)
+
+    assert load_artifact(artifact_path) is artifact
+    assert first.parameters is not second.parameters
+    assert first.variables["income_tax"] is not second.variables["income_tax"]
+
+
+def test_reform_applied_to_artifact_system(artifact_path):
+    reform = Reform.from_dict(
+        {"gov.ird.income_tax.rates.rates.bracket_5": {"2025-01-01": 0.45}}
+    )
+    baseline = load_system(path=artifact_path)
+    reformed = load_system(reform=reform, path=artifact_path)
+
+    assert income_tax(reformed) > income_tax(baseline)
+    assert income_tax(reformed) == pytest.approx(
+        income_tax(NewZealandTaxBenefitSystem(reform=reform))
+    )
+
+
+def test_stale_artifact_rebuilt(artifact_path, monkeypatch):
+    load_system(path=artifact_path)
+    monkeypatch.setattr(artifact_module, "artifact_key", lambda: "changed sources")
+
+    assert load_artifact(artifact_path) is None
+    load_system(path=artifact_path)
+    assert load_artifact(artifact_path).key == "changed sources"
+
+
+def copy_package(directory):
+    package = directory / "policyengine_nz"
+    for file_path in artifact_module.COUNTRY_DIR.rglob("*"):
+        if file_path.is_file() and "__pycache__" not in file_path.parts:
+            copy = package / file_path.relative_to(artifact_module.COUNTRY_DIR)
+            copy.parent.mkdir(parents=True, exist_ok=True)
+            copy.write_bytes(file_path.read_bytes())
+    return package
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "utils/schedule.py",
+        "entities.py",
+        "parameters/gov/msd/accommodation_supplement/areas.yaml",
+    ],
+)
+def test_source_edits_change_key(tmp_path, monkeypatch, source):
+    package = copy_package(tmp_path)
+    monkeypatch.setattr(artifact_module, "COUNTRY_DIR", package)
+    key = artifact_module.artifact_key()
+
+    with open(package / source, "a") as f:
+        f.write("\n")
+    assert artifact_module.artifact_key() == key
+    artifact_module._source_key.cache_clear()
+    assert artifact_module.artifact_key() != key
+
+
+def test_key_ignores_install_path_and_tests(tmp_path, monkeypatch):
+    first = copy_package(tmp_path / "first")
+    second = copy_package(tmp_path / "second")
+    with open(second / "tests" / "conftest.py", "a") as f:
+        f.write("\n")
+
+    monkeypatch.setattr(artifact_module, "COUNTRY_DIR", first)
+    key = artifact_module.artifact_key()
+    monkeypatch.setattr(artifact_module, "COUNTRY_DIR", second)
+    assert artifact_module.artifact_key() == key
@@ -0,0 +1,112 @@
+"""Tests for packing many situations into one simulation."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from policyengine_core.simulations import Simulation
+from policyengine_nz import NewZealandTaxBenefitSystem
+from policyengine_nz.batch import SituationBatch, calculate_situations
+
+
+def _single_person(income):
+    return {"people": {"person": {"employment_income": income, "age": 30}}}
+
+
+def _sole_parent(income):
+    return {
+        "people": {
+            "parent": {"age": 35, "employment_income": income},
+            "child1": {"age": 8},
+            "child2": {"age": 17},
+        },
+        "families": {
+            "family": {"parents": ["parent"], "children": ["child1", "child2"]}
+        },
+    }
+
+
+def test_matches_individual_simulations():
+    situations = [_sole_parent(income) for income in (0, 40_000, 70_000)] + [
+        _single_person(income) for income in (10_000, 200_000)
+    ]
+    variables = ["income_tax", "family_income", "family_tax_credit"]
+    results = calculate_situations(situations, variables, period=2025)
+
+    system = NewZealandTaxBenefitSystem()
+    for situation, result in zip(situations, results):
+        simulation = Simulation(
+            tax_benefit_system=system,
+            situation=situation,
+            default_input_period="2025",
+        )
+        for variable in variables:
+            assert np.allclose(simulation.calculate(variable, 2025), result[variable])
+
+
+def test_splits_results_by_situation():
+    batch = SituationBatch([_sole_parent(30_000), _single_person(60_000)], period=2025)
+    income_tax = batch.calculate("income_tax")
+    assert len(batch) == 2
+    assert [len(values) for values in income_tax] == [3, 1]
+    assert income_tax[1][0] == pytest.approx(5_117)
+
+
+def test_dataframe_of_households():
+    people = pd.DataFrame(
+        {
+            "household_id": [1, 1, 2],
+            "age": [30, 3, 40],
+            "employment_income": [30_000, 0, 60_000],
+        }
+    )
+    income_tax = SituationBatch(people, period=2025).calculate("income_tax")
+    assert np.allclose(income_tax[0], [1_512, 0])
+    assert np.allclose(income_tax[1], [5_117])
+
+
+def test_rejects_unknown_members():
+    situation = _sole_parent(30_000)
+    situation["families"]["family"]["children"].append("child3")
+    with pytest.raises(ValueError, match="unknown person child3"):
+        SituationBatch([situation], period=2025)
+
+
+def test_formula_overrides_do_not_leak_between_situations():
+    overridden = _single_person(60_000)
+    overridden["people"]["person"]["taxable_income"] = 20_000
+    batch = SituationBatch(
+        [_single_person(60_000), overridden, _sole_parent(30_000)], period=2025
+    )
+    assert batch.simulation is None
+    income_tax = batch.calculate("income_tax")
+    assert income_tax[0][0] == pytest.approx(5_117)
+    # 10.5% of the $4,400 above $15,600.
+    assert income_tax[1][0] == pytest.approx(462)
+    assert len(income_tax[2]) == 3
+
+
+def test_formula_variable_set_in_one_situation_only():
+    overridden = _single_person(60_000)
+    overridden["people"]["person"]["income_tax"] = 1_000
+    income_tax = SituationBatch(
+        [overridden, _single_person(60_000)], period=2025
+    ).calculate("income_tax")
+    assert income_tax[0][0] == 1_000
+    assert income_tax[1][0] == pytest.approx(5_117)
+
+
+def test_copies_of_situations_overriding_different_formulas():
+    overridden = _single_person(60_000)
+    overridden["people"]["person"]["taxable_income"] = 20_000
+    batch = SituationBatch(
+        [_single_person(60_000), overridden, _sole_parent(30_000)],
+        period=2025,
+        copies=2,
+    )
+    income_tax = batch.calculate("income_tax")
+    totals = batch.calculate_totals("income_tax")
+    for copy in range(2):
+        assert income_tax[3 * copy][0] == pytest.approx(5_117)
+        assert income_tax[3 * copy + 1][0] == pytest.approx(462)
+        assert len(income_tax[3 * copy + 2]) == 3
+        assert totals[3 * copy + 1] == pytest.approx(462)
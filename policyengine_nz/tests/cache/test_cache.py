@@ -0,0 +1,134 @@
+"""Tests for the content-addressed result cache."""
+
+import os
+
+import pytest
+from policyengine_nz import cache as cache_module
+from policyengine_nz.cache import ResultCache, reform_identity
+
+
+SITUATION = {
+    "people": {
+        "parent": {"age": 35, "employment_income": 40_000},
+        "child": {"age": 8},
+    },
+    "families": {"family": {"parents": ["parent"], "children": ["child"]}},
+}
+
+
+@pytest.fixture(autouse=True)
+def source_key(monkeypatch):
+    # Hashing the sources is slow; tests change the key to simulate edits.
+    monkeypatch.setattr(cache_module, "artifact_key", lambda: "source-1")
+
+
+def test_key_is_canonical():
+    cache = ResultCache()
+    key = cache.key(SITUATION, ["income_tax", "gst"], 2025)
+    reordered = {
+        "families": SITUATION["families"],
+        "people": {
+            "parent": {"employment_income": 40_000, "age": 35},
+            "child": {"age": 8},
+        },
+    }
+    assert cache.key(reordered, ["gst", "income_tax"], "2025") == key
+
+    # The order of people determines the order of results.
+    swapped = dict(SITUATION, people=dict(reversed(SITUATION["people"].items())))
+    assert cache.key(swapped, ["income_tax", "gst"], 2025) != key
+    assert cache.key(SITUATION, ["income_tax", "gst"], 2026) != key
+    assert cache.key(SITUATION, ["income_tax"], 2025) != key
+    reform = {"gov.ird.acc.earners_levy_rate": {"2025-01-01": 0.05}}
+    assert cache.key(SITUATION, ["income_tax", "gst"], 2025, reform) != key
+
+
+def test_reform_identity():
+    assert reform_identity({"a": 1, "b": 2}) == reform_identity({"b": 2, "a": 1})
+    assert reform_identity(None) != reform_identity({})
+    with pytest.raises(TypeError):
+        reform_identity(object())
+
+
+def test_memory_layer_is_lru():
+    cache = ResultCache(max_entries=2)
+    for name in "abc":
+        if name == "c":
+            cache.get("a")
+        cache.put(name, {"value": name})
+
+    assert cache.get("a") == {"value": "a"}
+    assert cache.get("b") is None
+    assert cache.get("c") == {"value": "c"}
+    assert cache.stats() == {
+        "hits": 3,
+        "memory_hits": 3,
+        "disk_hits": 0,
+        "misses": 1,
+        "entries": 2,
+        "disk_bytes": 0,
+    }
+
+
+def test_disk_layer_is_shared_and_bounded(tmp_path):
+    writer = ResultCache(max_entries=0, directory=tmp_path, max_bytes=2_000)
+    for index in range(10):
+        writer.put(f"key{index}", list(range(100)))
+    assert writer.stats()["disk_bytes"] <= 2_000
+
+    reader = ResultCache(directory=tmp_path)
+    assert reader.get("key9") == list(range(100))
+    assert reader.get("key0") is None
+    assert reader.stats()["disk_hits"] == 1
+    # Now in memory.
+    assert reader.get("key9") == list(range(100))
+    assert reader.stats()["memory_hits"] == 1
+
+
+def test_source_changes_invalidate(tmp_path, monkeypatch):
+    before = ResultCache(directory=tmp_path)
+    key = before.key(SITUATION, ["income_tax"], 2025)
+    before.put(key, {"income_tax": [1.0, 0.0]})
+
+    monkeypatch.setattr(cache_module, "artifact_key", lambda: "source-2")
+    after = ResultCache(directory=tmp_path)
+    assert after.key(SITUATION, ["income_tax"], 2025) != key
+    assert after.get(key) is None
+    # Processes still running the old sources keep their entries.
+    assert before.get(key) == {"income_tax": [1.0, 0.0]}
+
+
+def test_stale_sources_are_removed(tmp_path, monkeypatch):
+    ResultCache(directory=tmp_path).put("key", [1.0])
+    monkeypatch.setattr(cache_module, "artifact_key", lambda: "source-2")
+    ResultCache(directory=tmp_path)
+    assert (tmp_path / "source-1" / "key.json").exists()
+
+    stale = cache_module.time.time() - cache_module.STALE_AGE - 1
+    for path in [tmp_path / "source-1", *(tmp_path / "source-1").iterdir()]:
+        os.utime(path, (stale, stale))
+    ResultCache(directory=tmp_path)
+    assert not (tmp_path / "source-1").exists()
+    assert (tmp_path / "source-2").exists()
+
+
+def test_overwriting_an_entry_counts_it_once(tmp_path):
+    cache = ResultCache(directory=tmp_path)
+    cache.put("key", list(range(100)))
+    size = cache.stats()["disk_bytes"]
+    cache.put("key", list(range(100)))
+    assert cache.stats()["disk_bytes"] == size
+    assert ResultCache(directory=tmp_path).stats()["disk_bytes"] == size
+
+
+def test_failed_writes_keep_the_entry_in_memory(tmp_path, monkeypatch, caplog):
+    def dump(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    cache = ResultCache(directory=tmp_path)
+    monkeypatch.setattr(cache_module.json, "dump", dump)
+    cache.put("key", [1.0])
+    assert "No space left on device" in caplog.text
+    assert cache.get("key") == [1.0]
+    assert cache.stats()["disk_bytes"] == 0
+    assert list((tmp_path / "source-1").iterdir()) == []
@@ -1,11 +1,18 @@
 import pytest
 from policyengine_nz.system import NewZealandTaxBenefitSystem
+from policyengine_nz.policy_tests import BatchedYamlPlugin
 from policyengine_core.tools.test_runner import OpenFiscaPlugin
 
 
 def pytest_configure(config):
+    # ``policy_tests.run_tests`` registers its own plugin.
+    if any(
+        isinstance(plugin, OpenFiscaPlugin)
+        for plugin in config.pluginmanager.get_plugins()
+    ):
+        return
     tax_benefit_system = NewZealandTaxBenefitSystem()
     config.pluginmanager.register(
-        OpenFiscaPlugin(tax_benefit_system, options={}),
+        BatchedYamlPlugin(tax_benefit_system, options={}),
         name="openfisca",
     )
@@ -0,0 +1,121 @@
+"""Tests for reading variable dependencies from formulas."""
+
+import pytest
+
+from policyengine_nz import NewZealandTaxBenefitSystem
+from policyengine_nz.dependencies import (
+    dependency_graph,
+    dependent_variables,
+    parameter_paths_overlap,
+    variable_dependencies,
+)
+from policyengine_nz.model_api import YEAR, Person, Variable
+
+
+# Named outside the formula, so that reading its source does not find it.
+INCOME_TAX = "income_tax"
+
+
+class income_tax_via_simulation(Variable):
+    value_type = float
+    entity = Person
+    definition_period = YEAR
+    label = "Income tax, read from the simulation"
+
+    def formula(person, period, parameters):
+        return person.simulation.calculate(INCOME_TAX, period)
+
+
+@pytest.fixture(scope="module")
+def system():
+    # With a variable whose formula reads the simulation directly.
+    system = NewZealandTaxBenefitSystem()
+    system.add_variable(income_tax_via_simulation)
+    return system
+
+
+def dependencies(system, name):
+    return variable_dependencies(system.variables[name], system.variables)
+
+
+def test_parameters_read_through_local_names(system):
+    ftc = dependencies(system, "family_tax_credit")
+    assert ftc.variables == {"age", "family_income", "is_child", "num_children"}
+    assert "gov.ird.working_for_families.family_tax_credit_rates.rates.child_0_15" in (
+        ftc.parameters
+    )
+    assert not ftc.opaque
+
+
+def test_adds_and_subtracts(system):
+    net_income = dependencies(system, "household_net_income")
+    assert net_income.variables == {
+        "household_market_income",
+        "household_benefits",
+        "household_tax",
+    }
+    assert net_income.parameters == set()
+
+
+def test_formula_reading_the_simulation_is_opaque(system):
+    assert dependencies(system, "income_tax_via_simulation").opaque
+
+
+def test_parameter_paths_overlap():
+    assert parameter_paths_overlap("gov.ird", "gov.ird.acc.earners_levy_rate")
+    assert parameter_paths_overlap("", "gov.ird")
+    assert not parameter_paths_overlap("gov.ird.acc", "gov.ird.acc_other")
+
+
+def test_dependent_variables(system):
+    affected = dependent_variables(system, variables=["taxable_income"])
+    assert {"income_tax", "family_income", "family_tax_credit"} <= affected
+    assert "acc_earners_levy" not in affected
+
+
+def test_graph_queries(system):
+    graph = dependency_graph(system)
+    assert graph is dependency_graph(system)
+    assert graph.upstream("family_tax_credit") >= {
+        "family_income",
+        "taxable_income",
+        "employment_income",
+        "age",
+    }
+    assert "income_tax" not in graph.upstream("family_tax_credit")
+    assert graph.upstream_parameters("income_tax") >= {
+        "gov.ird.income_tax.rates.rates.bracket_1",
+        "gov.ird.income_tax.thresholds.thresholds.tax_free_threshold",
+    }
+    assert graph.downstream("taxable_income") >= {
+        "income_tax",
+        "family_income",
+        "household_net_income",
+    }
+    assert graph.affected_by(parameters=["gov.ird.working_for_families"]) >= {
+        "family_tax_credit",
+        "in_work_tax_credit",
+        "best_start",
+        "household_benefits",
+    }
+    assert "income_tax" not in graph.affected_by(
+        parameters=["gov.ird.working_for_families"]
+    )
+    assert ("taxable_income", "income_tax") in graph.edges()
+
+
+def test_traced_graph_sees_through_opaque_formulas(system):
+    static = dependency_graph(system)
+    traced = dependency_graph(system, trace=True)
+    assert static.upstream("income_tax_via_simulation") == set()
+    assert {"income_tax", "taxable_income"} <= traced.upstream(
+        "income_tax_via_simulation"
+    )
+    assert traced.opaque == static.opaque == {"income_tax_via_simulation"}
+
+
+def test_graph_rebuilt_when_variables_replaced():
+    system = NewZealandTaxBenefitSystem()
+    graph = dependency_graph(system)
+    system.neutralize_variable("family_tax_credit")
+    assert dependency_graph(system) is not graph
@@ -0,0 +1,111 @@
+"""Tests for columnar export of simulation outputs."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from policyengine_nz import Microsimulation, NewZealandDataset, Simulation
+from policyengine_nz.export import export_outputs
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.dataset  # noqa: E402
+import pyarrow.ipc  # noqa: E402
+import pyarrow.parquet  # noqa: E402
+
+VARIABLES = [
+    "income_tax",
+    "acc_earners_levy",
+    "family_tax_credit",
+    "best_start",
+    "household_net_income",
+    "household_type",
+]
+
+
+def _make_dataset():
+    person = pd.DataFrame(
+        {
+            "person_id": [1, 2, 3, 4],
+            "household_id": [10, 10, 10, 20],
+            "family_id": [100, 100, 100, 200],
+            "age": [35, 33, 1, 40],
+            "employment_income": [30_000, 0, 0, 60_000],
+        }
+    )
+    household = pd.DataFrame(
+        {"household_id": [10, 20], "household_weight": [1_000.0, 2_000.0]}
+    )
+    return NewZealandDataset(
+        {"person": person, "household": household}, time_period=2025
+    )
+
+
+def test_export_parquet(tmp_path):
+    simulation = Microsimulation(dataset=_make_dataset())
+    written = simulation.export(VARIABLES, tmp_path, periods=[2025, 2026])
+
+    assert len(written) == 6
+    person = pa.parquet.read_table(tmp_path / "person" / "period=2025")
+    assert person.column_names[:3] == ["person_id", "tax_unit_id", "tax_unit_role"]
+    assert person["family_id"].to_pylist() == [100, 100, 100, 200]
+    assert person["family_role"].to_pylist() == ["parent", "parent", "child", "parent"]
+    assert person["income_tax"].to_pylist() == pytest.approx(
+        list(simulation.calculate("income_tax", 2025, use_weights=False))
+    )
+
+    family = pa.parquet.read_table(tmp_path / "family" / "period=2025")
+    assert family.column_names == [
+        "family_id",
+        "family_tax_credit",
+        "best_start",
+    ]
+    household = pa.dataset.dataset(
+        tmp_path / "household", partitioning="hive"
+    ).to_table()
+    assert household.num_rows == 4
+    assert sorted(household["period"].to_pylist()) == [2025, 2025, 2026, 2026]
+    assert set(household["household_type"].to_pylist()) == {
+        "COUPLE_WITH_CHILDREN",
+        "SINGLE",
+    }
+
+
+def test_export_arrow(tmp_path):
+    simulation = Simulation(
+        situation={"people": {"you": {"age": 30, "employment_income": 50_000}}}
+    )
+    (file_path,) = export_outputs(simulation, ["income_tax"], tmp_path, format="arrow")
+
+    assert file_path == tmp_path / "person" / "period=2025" / "part-0.arrow"
+    with pa.ipc.open_file(str(file_path)) as reader:
+        table = reader.read_all()
+    assert table["income_tax"].to_pylist() == pytest.approx(
+        list(simulation.calculate("income_tax", 2025))
+    )
+    assert table["household_role"].to_pylist() == ["member"]
+
+
+def test_export_rejects_unknown_inputs(tmp_path):
+    simulation = Simulation(situation={"people": {"you": {"age": 30}}})
+    with pytest.raises(ValueError, match="format"):
+        export_outputs(simulation, ["income_tax"], tmp_path, format="csv")
+    with pytest.raises(Exception, match="not_a_variable"):
+        export_outputs(simulation, ["not_a_variable"], tmp_path)
+    assert not any(tmp_path.iterdir())
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_export_in_batches(tmp_path, format):
+    simulation = Microsimulation(dataset=_make_dataset())
+    (file_path,) = export_outputs(
+        simulation, ["income_tax"], tmp_path, format=format, row_group_size=3
+    )
+    expected = list(simulation.calculate("income_tax", 2025, use_weights=False))
+    if format == "parquet":
+        batches = pa.parquet.ParquetFile(file_path).num_row_groups
+        table = pa.parquet.read_table(file_path)
+    else:
+        with pa.ipc.open_file(str(file_path)) as reader:
+            batches = reader.num_record_batches
+            table = reader.read_all()
+    assert batches == 2
+    assert table["income_tax"].to_pylist() == pytest.approx(expected)
@@ -0,0 +1,98 @@
+"""Tests for reform simulations reusing baseline results."""
+
+import pandas as pd
+import pytest
+from policyengine_core.reforms import Reform
+
+from policyengine_nz import Microsimulation, NewZealandDataset
+from policyengine_nz import NewZealandTaxBenefitSystem
+from policyengine_nz.incremental import affected_variables, reform_simulation
+
+LEVY_REFORM = Reform.from_dict({"gov.ird.acc.earners_levy_rate": {"2025-01-01": 0.05}})
+FTC_REFORM = Reform.from_dict(
+    {
+        "gov.ird.working_for_families.family_tax_credit_rates.rates.child_0_15": {
+            "2025-01-01": 10_000
+        }
+    }
+)
+
+
+class neutralize_ftc(Reform):
+    def apply(self):
+        self.neutralize_variable("family_tax_credit")
+
+
+def _make_dataset():
+    person = pd.DataFrame(
+        {
+            "person_id": [1, 2, 3, 4],
+            "household_id": [10, 10, 10, 20],
+            "family_id": [100, 100, 100, 200],
+            "age": [35, 33, 5, 40],
+            "employment_income": [30_000, 0, 0, 60_000],
+        }
+    )
+    household = pd.DataFrame(
+        {"household_id": [10, 20], "household_weight": [1_000.0, 2_000.0]}
+    )
+    return NewZealandDataset(
+        {"person": person, "household": household}, time_period=2025
+    )
+
+
+def test_affected_variables():
+    baseline = NewZealandTaxBenefitSystem()
+    levy = affected_variables(baseline, NewZealandTaxBenefitSystem(reform=LEVY_REFORM))
+    ftc = affected_variables(
+        baseline, NewZealandTaxBenefitSystem(reform=neutralize_ftc)
+    )
+    assert levy == {
+        "acc_earners_levy",
+        "household_tax",
+        "household_net_income",
+        "take_home_pay",
+        "gst_liable_expenditure",
+        "gst",
+        "equivalised_household_net_income",
+        "household_net_income_ahc",
+        "equivalised_household_net_income_ahc",
+    }
+    assert {"family_tax_credit", "household_benefits"} <= ftc
+    assert "income_tax" not in ftc and "family_income" not in ftc
+    assert affected_variables(baseline, NewZealandTaxBenefitSystem()) == set()
+
+
+@pytest.mark.parametrize("reform", [LEVY_REFORM, FTC_REFORM, neutralize_ftc])
+def test_matches_full_reform_simulation(reform):
+    baseline = Microsimulation(dataset=_make_dataset())
+    baseline.calculate("household_net_income", 2025)
+    simulation = reform_simulation(baseline, reform)
+    full = Microsimulation(dataset=_make_dataset(), reform=reform)
+
+    for variable in ("household_net_income", "family_tax_credit", "income_tax"):
+        assert list(simulation.calculate(variable, 2025, use_weights=False)) == (
+            pytest.approx(list(full.calculate(variable, 2025, use_weights=False)))
+        )
+    assert simulation.calculate("household_net_income", 2025).sum() == (
+        pytest.approx(full.calculate("household_net_income", 2025).sum())
+    )
+    assert simulation.baseline is baseline
+
+
+def test_unaffected_arrays_are_shared():
+    baseline = Microsimulation(dataset=_make_dataset())
+    baseline.calculate("household_net_income", 2025)
+    simulation = reform_simulation(baseline, LEVY_REFORM)
+
+    for variable in ("taxable_income", "family_income", "employment_income"):
+        assert simulation.get_holder(variable).get_array(2025) is (
+            baseline.get_holder(variable).get_array(2025)
+        )
+    assert simulation.get_holder("acc_earners_levy").get_array(2025) is None
+
+
+def test_requires_one_reform():
+    baseline = Microsimulation(dataset=_make_dataset())
+    with pytest.raises(ValueError, match="exactly one"):
+        reform_simulation(baseline)
@@ -0,0 +1,84 @@
+"""Tests for weighted microsimulation over entity tables."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from policyengine_nz import (
+    Microsimulation,
+    NewZealandDataset,
+    NewZealandTaxBenefitSystem,
+)
+
+
+def _make_dataset():
+    person = pd.DataFrame(
+        {
+            "person_id": [1, 2, 3, 4],
+            "household_id": [10, 10, 10, 20],
+            "family_id": [100, 100, 100, 200],
+            "age": [35, 33, 5, 40],
+            "employment_income": [30_000, 0, 0, 60_000],
+        }
+    )
+    household = pd.DataFrame(
+        {"household_id": [10, 20], "household_weight": [1_000.0, 2_000.0]}
+    )
+    return NewZealandDataset(
+        {"person": person, "household": household}, time_period=2025
+    )
+
+
+def test_weighted_totals():
+    simulation = Microsimulation(dataset=_make_dataset())
+    income_tax = simulation.calculate("income_tax")
+    # $1,512 for 1,000 people and $5,117 for 2,000 people
+    assert income_tax.sum() == pytest.approx(1_512 * 1_000 + 5_117 * 2_000)
+
+
+def test_group_results_are_weighted_by_household():
+    simulation = Microsimulation(dataset=_make_dataset())
+    children = simulation.calculate("num_children")
+    assert list(simulation.calculate("num_children", use_weights=False)) == [1, 0]
+    assert children.sum() == 1_000
+
+
+@pytest.mark.parametrize(
+    "file_name,format",
+    [("survey.h5", None), ("survey", None), ("survey", "npy"), ("survey", "arrow")],
+)
+def test_round_trip_through_files(tmp_path, file_name, format):
+    if not file_name.endswith(".h5") and format != "npy":
+        pytest.importorskip("pyarrow")
+    path = tmp_path / file_name
+    _make_dataset().save(path, format=format)
+    simulation = Microsimulation(dataset=str(path))
+    assert simulation.calculate("income_tax", 2025).sum() == pytest.approx(
+        1_512 * 1_000 + 5_117 * 2_000
+    )
+
+
+def test_npy_inputs_are_memory_mapped(tmp_path):
+    _make_dataset().save(
+        tmp_path / "survey",
+        format="npy",
+        tax_benefit_system=NewZealandTaxBenefitSystem(),
+    )
+    simulation = Microsimulation(dataset=str(tmp_path / "survey"))
+    assert simulation.default_calculation_period == "2025"
+
+    employment_income = simulation.get_holder("employment_income").get_array(2025)
+    base = employment_income
+    while base is not None and not isinstance(base, np.memmap):
+        base = base.base
+    assert isinstance(base, np.memmap)
+    assert not employment_income.flags.writeable
+    assert simulation.calculate("income_tax").sum() == pytest.approx(
+        1_512 * 1_000 + 5_117 * 2_000
+    )
+
+
+def test_missing_group_ids_are_rejected():
+    dataset = _make_dataset()
+    dataset.tables["household"] = dataset.tables["household"].iloc[:1]
+    with pytest.raises(ValueError, match="missing from the household table"):
+        Microsimulation(dataset=dataset)
@@ -0,0 +1,99 @@
+"""Tests for batched, parallel running of YAML policy tests."""
+
+import pytest
+import yaml
+from policyengine_nz import NewZealandTaxBenefitSystem
+from policyengine_nz.policy_tests import BatchedYamlPlugin, group_key
+
+
+@pytest.fixture(scope="module")
+def system():
+    return NewZealandTaxBenefitSystem()
+
+
+def _case(name, income, expected, period=2025, **extra):
+    return {
+        "name": name,
+        "period": period,
+        "input": {
+            "people": {"person": {"age": 30, "employment_income": income}},
+            **extra,
+        },
+        "output": {"income_tax": expected},
+    }
+
+
+CASES = [
+    _case("low income", 30_000, 1_512),
+    _case("middle income", 60_000, 5_117),
+    _case("wrong", 60_000, 1),
+    _case("next year", 30_000, 1_512, period=2026),
+    {
+        "name": "sole parent",
+        "period": 2025,
+        "input": {
+            "people": {
+                "parent": {"age": 35, "employment_income": 30_000},
+                "child": {"age": 8},
+            },
+            "families": {"family": {"parents": ["parent"], "children": ["child"]}},
+        },
+        "output": {"people": {"parent": {"income_tax": 1_512}}},
+    },
+    {
+        "name": "across incomes",
+        "period": 2025,
+        "input": {
+            "people": {"person": {"age": 30}},
+            "axes": [
+                [{"name": "employment_income", "min": 0, "max": 30_000, "count": 2}]
+            ],
+        },
+        "output": {"income_tax": [0, 1_512]},
+    },
+]
+
+
+class _Recorder:
+    def __init__(self):
+        self.outcomes = []
+
+    def pytest_runtest_logreport(self, report):
+        if report.when == "call":
+            self.outcomes.append(report.outcome)
+
+
+def test_group_key(system):
+    keys = [group_key(system, case) for case in CASES]
+    # The three single-person 2025 cases and the family share a group.
+    assert keys[0] == keys[1] == keys[2] == keys[4]
+    assert keys[3] != keys[0]
+    # Axes cannot be batched.
+    assert keys[5] is None
+    # Nor can cases overriding a formula with others that do not.
+    overriding = _case("override", 30_000, 1_512)
+    overriding["input"]["people"]["person"]["taxable_income"] = 30_000
+    assert group_key(system, overriding) not in keys
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_reports_each_case(system, tmp_path, processes):
+    path = tmp_path / "test_cases.yaml"
+    path.write_text(yaml.safe_dump(CASES))
+    plugin = BatchedYamlPlugin(system, {}, processes=processes)
+    recorder = _Recorder()
+    exit_code = pytest.main(
+        ["-q", "-p", "no:cacheprovider", "--rootdir", str(tmp_path), str(path)],
+        plugins=[plugin, recorder],
+    )
+    assert exit_code == pytest.ExitCode.TESTS_FAILED
+    assert recorder.outcomes == [
+        "passed",
+        "passed",
+        "failed",
+        "passed",
+        "passed",
+        "passed",
+    ]
+    # One batch for each period.
+    assert sorted(len(items) for items in plugin.groups.values()) == [1, 4]
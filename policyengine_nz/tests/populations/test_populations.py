@@ -0,0 +1,84 @@
+"""Tests for indexed group populations."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from policyengine_core.populations import GroupPopulation
+
+from policyengine_nz import Microsimulation, NewZealandDataset
+from policyengine_nz.populations import NewZealandGroupPopulation
+
+
+@pytest.fixture(scope="module")
+def simulation():
+    rng = np.random.default_rng(0)
+    family = rng.integers(0, 40, 150)
+    person = pd.DataFrame(
+        {
+            "person_id": np.arange(150),
+            # People are not sorted by family, and some families are empty.
+            "family_id": family * 2,
+            "household_id": family,
+            "tax_unit_id": family,
+            "age": rng.integers(0, 90, 150),
+        }
+    )
+    family_table = pd.DataFrame({"family_id": np.arange(0, 160, 2)})
+    return Microsimulation(
+        dataset=NewZealandDataset(
+            {"person": person, "family": family_table}, time_period=2025
+        )
+    )
+
+
+def core_population(population):
+    core = GroupPopulation(population.entity, population.members)
+    core.simulation = population.simulation
+    core.count = population.count
+    core.members_entity_id = population.members_entity_id
+    core.members_role = population.members_role
+    return core
+
+
+@pytest.mark.parametrize("method", ["sum", "max", "min", "any", "all"])
+@pytest.mark.parametrize("role", [None, "parent", "child"])
+def test_reductions_match_core(simulation, method, role):
+    family = simulation.populations["family"]
+    core = core_population(family)
+    age = np.asarray(simulation.calculate("age", 2025, use_weights=False))
+    values = age > 30 if method in ("any", "all") else age
+    role = None if role is None else family.get_role(role)
+
+    assert isinstance(family, NewZealandGroupPopulation)
+    np.testing.assert_array_equal(
+        getattr(family, method)(values, role=role),
+        getattr(core, method)(values, role=role),
+    )
+
+
+def test_positions_and_projections_match_core(simulation):
+    family = simulation.populations["family"]
+    core = core_population(family)
+    age = np.asarray(simulation.calculate("age", 2025, use_weights=False))
+    parent = family.get_role("parent")
+
+    np.testing.assert_array_equal(
+        family.members_position, GroupPopulation.members_position.fget(core)
+    )
+    np.testing.assert_array_equal(family.nb_persons(), core.nb_persons())
+    np.testing.assert_array_equal(family.nb_persons(parent), core.nb_persons(parent))
+    for n in range(4):
+        np.testing.assert_array_equal(
+            family.value_nth_person(n, age), core.value_nth_person(n, age)
+        )
+    np.testing.assert_array_equal(
+        family.project(family.sum(age), parent), core.project(core.sum(age), parent)
+    )
+
+
+def test_branches_share_the_index(simulation):
+    family = simulation.populations["family"]
+    index = family.index
+    branch = simulation.get_branch("index_test")
+
+    assert branch.populations["family"].index is index
@@ -0,0 +1,57 @@
+"""Tests for per-variable profiling."""
+
+from policyengine_core.populations import GroupPopulation
+from policyengine_core.tracers import SimpleTracer
+
+from policyengine_nz import Simulation
+from policyengine_nz.analysis import marginal_tax_rates
+
+SITUATION = {
+    "people": {
+        "parent": {"age": 35, "employment_income": 55_000},
+        "partner": {"age": 33},
+        "child": {"age": 4},
+    },
+    "families": {"family": {"parents": ["parent", "partner"], "children": ["child"]}},
+}
+
+
+def test_records_calls_cache_hits_and_projections():
+    simulation = Simulation(situation=SITUATION)
+    with simulation.profile() as profiler:
+        net_income = simulation.calculate("household_net_income", 2025)
+        simulation.calculate("household_net_income", 2025)
+    table = profiler.table().set_index("variable")
+
+    assert net_income == Simulation(situation=SITUATION).calculate(
+        "household_net_income", 2025
+    )
+    assert table.loc["household_net_income", "calls"] == 2
+    assert table.loc["household_net_income", "cache_hits"] == 1
+    assert table.loc["income_tax", "size"] == 3
+    assert table.loc["income_tax", "bytes"] == 12
+    assert table.loc["family.sum", "kind"] == "projection"
+    assert (table.total_ms >= table.self_ms).all()
+
+
+def test_folded_stacks_nest_calculations():
+    simulation = Simulation(situation=SITUATION)
+    with simulation.profile() as profiler:
+        simulation.calculate("family_tax_credit", 2025)
+    stacks = [line.rsplit(" ", 1) for line in profiler.folded_stacks().splitlines()]
+
+    assert all(stack.startswith("family_tax_credit") for stack, _ in stacks)
+    assert all(int(microseconds) > 0 for _, microseconds in stacks)
+    assert any(stack.endswith(";family.sum") for stack, _ in stacks)
+
+
+def test_profiling_is_removed_when_stopped():
+    simulation = Simulation(situation=SITUATION)
+    original_sum = GroupPopulation.sum
+    with simulation.profile():
+        assert GroupPopulation.sum is not original_sum
+        marginal_tax_rates(simulation, 2025)
+
+    assert GroupPopulation.sum is original_sum
+    assert type(simulation.tracer) is SimpleTracer
+    assert not simulation.trace
@@ -0,0 +1,180 @@
+"""Tests for the household calculation service."""
+
+import http.client
+import json
+import threading
+
+import pytest
+from policyengine_nz import Simulation
+from policyengine_nz.cache import ResultCache
+from policyengine_nz.serve import Calculator, make_server
+
+
+LEVY_REFORM = {"gov.ird.acc.earners_levy_rate": {"2025-01-01": 0.05}}
+
+SOLE_PARENT = {
+    "people": {
+        "parent": {"age": 35, "employment_income": 40_000},
+        "child": {"age": 8},
+    },
+    "families": {"family": {"parents": ["parent"], "children": ["child"]}},
+}
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("POLICYENGINE_NZ_CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
+        calculator = Calculator(
+            {"levy": LEVY_REFORM}, max_delay=0.05, cache=ResultCache()
+        )
+    server = make_server(calculator, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _request(server, method, path, body=None):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    try:
+        connection.request(method, path, json.dumps(body) if body is not None else None)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_calculate_matches_simulation(server):
+    variables = ["income_tax", "household_net_income", "household_type"]
+    status, body = _request(
+        server,
+        "POST",
+        "/calculate",
+        {"situation": SOLE_PARENT, "variables": variables, "period": 2025},
+    )
+    assert status == 200
+    simulation = Simulation(situation=SOLE_PARENT)
+    results = body["results"]
+    assert results["income_tax"] == pytest.approx(
+        simulation.calculate("income_tax", 2025).tolist()
+    )
+    assert results["household_net_income"] == pytest.approx(
+        simulation.calculate("household_net_income", 2025).tolist()
+    )
+    assert results["household_type"] == ["SOLE_PARENT"]
+
+
+def test_concurrent_requests(server):
+    incomes = [10_000 * index for index in range(20)]
+    responses = [None] * len(incomes)
+
+    def send(index):
+        responses[index] = _request(
+            server,
+            "POST",
+            "/calculate",
+            {
+                "situation": {
+                    "people": {"you": {"age": 30, "employment_income": incomes[index]}}
+                },
+                "variables": ["income_tax"],
+                "reform": "levy" if index % 2 else "baseline",
+            },
+        )
+
+    threads = [threading.Thread(target=send, args=(index,)) for index in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for income, (status, body) in zip(incomes, responses):
+        simulation = Simulation(
+            situation={"people": {"you": {"age": 30, "employment_income": income}}}
+        )
+        assert status == 200
+        assert body["results"]["income_tax"] == pytest.approx(
+            simulation.calculate("income_tax", 2025).tolist()
+        )
+
+
+def test_waiting_requests_are_batched(server):
+    batcher = server.RequestHandlerClass.calculator.batchers["baseline"]
+    before = _request(server, "GET", "/health")[1]
+    futures = [
+        batcher.submit(
+            {"people": {"you": {"age": 30, "employment_income": 1_000 * index}}},
+            ["income_tax"],
+            "2025",
+        )
+        for index in range(50)
+    ]
+    results = [future.result(10)["income_tax"][0] for future in futures]
+    after = _request(server, "GET", "/health")[1]
+
+    assert after["requests"] - before["requests"] == 50
+    assert after["batches"] - before["batches"] < 10
+    assert results[20] == pytest.approx(0.105 * (20_000 - 15_600))
+
+
+def test_repeated_requests_are_cached(server):
+    body = {
+        "situation": {"people": {"you": {"employment_income": 123_456}}},
+        "variables": ["income_tax"],
+        "reform": "levy",
+    }
+    before = _request(server, "GET", "/health")[1]
+    first = _request(server, "POST", "/calculate", body)
+    second = _request(server, "POST", "/calculate", body)
+    after = _request(server, "GET", "/health")[1]
+
+    assert first == second
+    assert after["requests"] - before["requests"] == 1
+    assert after["cache"]["hits"] - before["cache"]["hits"] == 1
+
+
+def test_reform(server):
+    body = {
+        "situation": {"people": {"you": {"employment_income": 50_000}}},
+        "variables": ["acc_earners_levy"],
+    }
+    baseline = _request(server, "POST", "/calculate", body)[1]
+    reformed = _request(server, "POST", "/calculate", {**body, "reform": "levy"})[1]
+    assert reformed["results"]["acc_earners_levy"] == pytest.approx([2_500])
+    assert baseline["results"] != reformed["results"]
+
+
+@pytest.mark.parametrize(
+    "body, message",
+    [
+        ({"situation": SOLE_PARENT, "variables": ["nope"]}, "Unknown variable"),
+        (
+            {"situation": SOLE_PARENT, "variables": ["income_tax"], "reform": "x"},
+            "reform",
+        ),
+        ({"situation": {"people": {}}, "variables": ["income_tax"]}, "no people"),
+        ({"situation": SOLE_PARENT, "variables": [["income_tax"]]}, "strings"),
+    ],
+)
+def test_invalid_requests(server, body, message):
+    status, response = _request(server, "POST", "/calculate", body)
+    assert status == 400
+    assert message in response["error"]
+
+
+@pytest.mark.parametrize(
+    "error, status",
+    [(TimeoutError("No result within 30 seconds."), 503), (KeyError("x"), 500)],
+)
+def test_failures(server, monkeypatch, error, status):
+    def calculate(*args):
+        raise error
+
+    monkeypatch.setattr(server.RequestHandlerClass.calculator, "calculate", calculate)
+    response_status, response = _request(
+        server, "POST", "/calculate", {"situation": SOLE_PARENT, "variables": ["gst"]}
+    )
+    assert response_status == status
+    assert response["error"]
@@ -0,0 +1,101 @@
+"""Tests for chunked streaming microsimulation."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from policyengine_nz import (
+    Microsimulation,
+    NewZealandDataset,
+    StreamingMicrosimulation,
+)
+
+VARIABLES = ["income_tax", "family_tax_credit", "nz_superannuation"]
+
+
+def _write_people(path, households=25):
+    rng = np.random.default_rng(0)
+    rows = []
+    for household in range(households):
+        size = 1 + household % 4
+        for member in range(size):
+            rows.append(
+                {
+                    "household_id": household,
+                    "family_id": household,
+                    "age": [40, 38, 70, 9][member]
+                    if size < 4
+                    else [35, 33, 6, 2][member],
+                    "employment_income": float(rng.integers(0, 120_000))
+                    if member < 2
+                    else 0.0,
+                    "household_weight": 100.0 + household,
+                }
+            )
+    people = pd.DataFrame(rows)
+    if path.suffix == ".csv":
+        people.to_csv(path, index=False)
+    else:
+        people.to_parquet(path)
+    return people
+
+
+@pytest.mark.parametrize("file_name", ["people.csv", "people.parquet"])
+def test_streamed_totals_match_microsimulation(tmp_path, file_name):
+    if file_name.endswith(".parquet"):
+        pytest.importorskip("pyarrow")
+    people = _write_people(tmp_path / file_name)
+    simulation = Microsimulation(
+        dataset=NewZealandDataset({"person": people}, time_period=2025)
+    )
+
+    streaming = StreamingMicrosimulation(tmp_path / file_name, 2025, chunk_size=7)
+    result = streaming.run(VARIABLES)
+
+    assert result.chunks > 1
+    assert result.people == len(people)
+    assert result.households == people.household_id.nunique()
+    for variable in VARIABLES:
+        assert result.totals[variable] == pytest.approx(
+            simulation.calculate(variable, 2025).sum()
+        )
+    assert result.population["household"] == pytest.approx((100 + np.arange(25)).sum())
+
+
+def test_outputs_written_per_entity(tmp_path):
+    _write_people(tmp_path / "people.csv")
+    streaming = StreamingMicrosimulation(tmp_path / "people.csv", 2025, chunk_size=5)
+    result = streaming.run(VARIABLES, output_path=tmp_path / "out", output_format="csv")
+
+    person = pd.read_csv(tmp_path / "out" / "person.csv")
+    family = pd.read_csv(tmp_path / "out" / "family.csv")
+    assert list(person.columns) == ["person_id", "income_tax", "nz_superannuation"]
+    assert list(family.columns) == ["family_id", "family_tax_credit"]
+    assert len(person) == result.people
+    assert person.person_id.is_unique
+
+
+def test_households_must_be_adjacent(tmp_path):
+    people = pd.DataFrame({"household_id": [1, 2, 1, 3], "age": [30, 30, 30, 30]})
+    people.to_csv(tmp_path / "people.csv", index=False)
+    streaming = StreamingMicrosimulation(tmp_path / "people.csv", 2025)
+    with pytest.raises(ValueError, match="adjacent"):
+        streaming.run(["income_tax"])
+
+
+def test_person_household_id_column(tmp_path):
+    people = _write_people(tmp_path / "people.csv")
+    renamed = people.rename(columns={"household_id": "person_household_id"})
+    renamed.to_csv(tmp_path / "renamed.csv", index=False)
+
+    expected = StreamingMicrosimulation(tmp_path / "people.csv", 2025, chunk_size=7)
+    streaming = StreamingMicrosimulation(tmp_path / "renamed.csv", 2025, chunk_size=7)
+    result = streaming.run(VARIABLES)
+    assert result.households == people.household_id.nunique()
+    assert result.totals == pytest.approx(expected.run(VARIABLES).totals)
+
+
+def test_non_numeric_variables_rejected(tmp_path):
+    _write_people(tmp_path / "people.csv")
+    streaming = StreamingMicrosimulation(tmp_path / "people.csv", 2025)
+    with pytest.raises(ValueError, match="household_type is not numeric"):
+        streaming.run(["income_tax", "household_type"])
@@ -0,0 +1,43 @@
+"""Tests for caching structures compiled from parameters."""
+
+import pytest
+from policyengine_core.reforms import Reform
+from policyengine_nz import NewZealandTaxBenefitSystem
+from policyengine_nz.utils import bracket_schedule
+
+
+def _income_tax_schedule(system):
+    p = system.parameters("2025-01-01").gov.ird.income_tax
+    return bracket_schedule(p.thresholds.thresholds, p.rates.rates)
+
+
+def test_schedule_is_compiled_once_per_system_and_instant():
+    system = NewZealandTaxBenefitSystem()
+    assert _income_tax_schedule(system) is _income_tax_schedule(system)
+
+
+def test_compiled_arrays_are_read_only():
+    thresholds, _ = _income_tax_schedule(NewZealandTaxBenefitSystem())
+    with pytest.raises(ValueError):
+        thresholds[0] = 1
+
+
+def test_reform_recompiles_schedule():
+    reform = Reform.from_dict(
+        {"gov.ird.income_tax.thresholds.thresholds.bracket_2": {"2024-01-01": 20_000}}
+    )
+    baseline = NewZealandTaxBenefitSystem()
+    reformed = NewZealandTaxBenefitSystem(reform=reform)
+    assert _income_tax_schedule(baseline)[0][1] == 15_600
+    assert _income_tax_schedule(reformed)[0][1] == 20_000
+
+
+def test_parameter_update_recompiles_schedule():
+    system = NewZealandTaxBenefitSystem()
+    before = _income_tax_schedule(system)
+    system.parameters.gov.ird.income_tax.thresholds.thresholds.bracket_2.update(
+        period="year:2025:1", value=20_000
+    )
+    after = _income_tax_schedule(system)
+    assert before[0][1] == 15_600
+    assert after[0][1] == 20_000
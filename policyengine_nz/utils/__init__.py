@@ -0,0 +1,4 @@
+"""Utilities shared by PolicyEngine New Zealand formulas and tools."""
+
+from .schedule import bracket_rate, bracket_schedule, marginal_rate_schedule
+from .parameters import compiled_parameters
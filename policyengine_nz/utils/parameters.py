@@ -0,0 +1,58 @@
+"""
+Caching of structures compiled from parameters.
+
+Core already caches the parameter tree at each instant, per system: every
+``parameters(period)`` call in every simulation sharing a system returns the
+same node objects, and a reform or parameter update replaces the nodes it
+affects. Formulas that turn parameters into arrays (bracket schedules, rate
+tables) can therefore cache the result against the node objects themselves.
+The compiled value is then built once per system and instant, shared by all
+simulations, and rebuilt automatically once a reform changes the nodes.
+"""
+
+import functools
+import weakref
+from typing import Callable
+
+import numpy as np
+
+
+def _freeze(value):
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, tuple):
+        for item in value:
+            _freeze(item)
+    return value
+
+
+def compiled_parameters(function: Callable) -> Callable:
+    """
+    Cache a function of parameter nodes for as long as the nodes exist.
+
+    The decorated function must take only parameter nodes (at an instant) as
+    positional arguments. Arrays in the result are made read-only, since the
+    result is shared between every formula call using the same nodes.
+
+    Args:
+        function: The function to cache.
+
+    Returns:
+        Callable: The cached function.
+    """
+    cache = weakref.WeakKeyDictionary()
+
+    @functools.wraps(function)
+    def cached(*nodes):
+        level = cache
+        for node in nodes[:-1]:
+            level = level.setdefault(node, weakref.WeakKeyDictionary())
+        try:
+            return level[nodes[-1]]
+        except KeyError:
+            result = _freeze(function(*nodes))
+            level[nodes[-1]] = result
+            return result
+
+    cached.cache_clear = cache.clear
+    return cached
@@ -0,0 +1,128 @@
+"""
+Array-native evaluation of marginal-rate schedules.
+
+New Zealand income tax (and any other progressive schedule) is a
+piecewise-linear function of income. Rather than looping over brackets,
+the schedule is compiled into sorted thresholds, rates and the cumulative
+amount due at each threshold, so a whole population is evaluated with a
+single ``searchsorted`` and one multiply-add.
+"""
+
+import re
+from typing import Optional, Tuple
+
+import numpy as np
+
+from policyengine_nz.typing import ArrayLike
+from policyengine_nz.utils.parameters import compiled_parameters
+
+
+BRACKET_KEY = re.compile(r"^bracket_(\d+)$")
+
+# The start of the first bracket is named after what it represents rather
+# than its position in the schedule.
+FIRST_BRACKET_KEYS = ("tax_free_threshold",)
+
+
+def _bracket_index(key: str) -> Optional[int]:
+    if key in FIRST_BRACKET_KEYS:
+        return 1
+    match = BRACKET_KEY.match(key)
+    return int(match.group(1)) if match is not None else None
+
+
+@compiled_parameters
+def bracket_schedule(thresholds, rates) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pair bracket thresholds with bracket rates by bracket number.
+
+    Both arguments are parameter nodes (at an instant) whose children are
+    named ``bracket_<n>``; the first threshold may instead be called
+    ``tax_free_threshold``. Each threshold is the start of the bracket with
+    the same number, so adding a bracket to both files extends the schedule
+    without any code changes. Rates without a matching threshold (and
+    children with other names, such as composite rates) are ignored.
+
+    The schedule is built once per pair of nodes and shared by every call.
+
+    Args:
+        thresholds: Parameter node of bracket start points.
+        rates: Parameter node of marginal rates.
+
+    Returns:
+        Tuple of (thresholds, rates) arrays sorted by threshold.
+    """
+    rates_by_bracket = {}
+    for key in rates:
+        index = _bracket_index(key)
+        if index is not None:
+            rates_by_bracket[index] = rates[key]
+
+    starts = []
+    marginal_rates = []
+    for key in thresholds:
+        index = _bracket_index(key)
+        if index is None or index not in rates_by_bracket:
+            continue
+        starts.append(thresholds[key])
+        marginal_rates.append(rates_by_bracket[index])
+
+    starts = np.array(starts, dtype=float)
+    marginal_rates = np.array(marginal_rates, dtype=float)
+    order = np.argsort(starts, kind="stable")
+    return starts[order], marginal_rates[order]
+
+
+def marginal_rate_schedule(
+    amount: ArrayLike, thresholds: ArrayLike, rates: ArrayLike
+) -> np.ndarray:
+    """
+    Evaluate a marginal-rate schedule for every element of ``amount``.
+
+    Args:
+        amount: Income (or other base) for each entity.
+        thresholds: Sorted start point of each bracket.
+        rates: Marginal rate applying from each threshold to the next.
+
+    Returns:
+        Amount due under the schedule for each entity. Amounts below the
+        first threshold are charged nothing.
+    """
+    amount = np.asarray(amount, dtype=float)
+    thresholds = np.asarray(thresholds, dtype=float)
+    rates = np.asarray(rates, dtype=float)
+    if thresholds.size == 0:
+        return np.zeros_like(amount)
+
+    # Amount due on reaching each threshold.
+    bracket_widths = np.diff(thresholds)
+    due_at_threshold = np.concatenate(([0.0], np.cumsum(bracket_widths * rates[:-1])))
+
+    bracket = np.searchsorted(thresholds, amount, side="right") - 1
+    in_schedule = bracket >= 0
+    bracket = np.maximum(bracket, 0)
+    due = due_at_threshold[bracket] + rates[bracket] * (amount - thresholds[bracket])
+    return np.where(in_schedule, due, 0.0)
+
+
+def bracket_rate(
+    amount: ArrayLike, thresholds: ArrayLike, rates: ArrayLike
+) -> np.ndarray:
+    """
+    Find the rate of the bracket each element of ``amount`` falls in.
+
+    Some rates (such as ESCT) apply to a whole amount at the rate of the
+    bracket some other income falls in, rather than marginally.
+
+    Args:
+        amount: Income (or other base) for each entity.
+        thresholds: Sorted start point of each bracket.
+        rates: Rate applying from each threshold to the next.
+
+    Returns:
+        Rate for each entity. Amounts below the first threshold have a rate
+        of zero.
+    """
+    amount = np.asarray(amount, dtype=float)
+    rates = np.concatenate(([0.0], np.asarray(rates, dtype=float)))
+    return rates[np.searchsorted(thresholds, amount, side="right")]
@@ -0,0 +1,17 @@
+"""Goods and Services Tax paid by households."""
+
+from policyengine_nz.model_api import *
+
+
+class gst(Variable):
+    value_type = float
+    entity = Household
+    definition_period = YEAR
+    label = "GST"
+    documentation = "GST paid on the household's imputed expenditure, assuming it is passed on in full to consumers"
+    reference = "https://www.ird.govt.nz/gst"
+    unit = NZD
+
+    def formula(household, period, parameters):
+        expenditure = household("gst_liable_expenditure", period)
+        return expenditure * parameters(period).gov.ird.gst.rate
@@ -0,0 +1,58 @@
+"""Imputed household expenditure liable for GST."""
+
+from policyengine_nz.model_api import *
+from policyengine_nz.utils import compiled_parameters
+
+
+@compiled_parameters
+def _expenditure_table(income_deciles, expenditure_shares):
+    """
+    Tabulate expenditure shares by household type and income decile.
+
+    Returns:
+        Tuple of (household type names, sorted decile thresholds, table),
+        the table's rows following the household types and its columns the
+        deciles.
+    """
+    thresholds = np.sort([income_deciles[key] for key in income_deciles])
+    types = tuple(expenditure_shares)
+    table = np.array(
+        [
+            [
+                expenditure_shares[name][f"decile_{decile}"]
+                for decile in range(1, len(thresholds) + 2)
+            ]
+            for name in types
+        ],
+        dtype=float,
+    )
+    return types, thresholds, table
+
+
+class gst_liable_expenditure(Variable):
+    value_type = float
+    entity = Household
+    definition_period = YEAR
+    label = "GST-liable expenditure"
+    documentation = "Imputed annual household spending on goods and services liable for GST, excluding GST"
+    reference = "https://www.stats.govt.nz/information-releases/?filters=Household%20expenditure%20statistics"
+    unit = NZD
+
+    def formula(household, period, parameters):
+        income = max_(0, household("household_net_income", period))
+        household_type = household("household_type", period)
+        p = parameters(period).gov.ird.gst
+        types, thresholds, table = _expenditure_table(
+            p.income_deciles, p.expenditure_shares
+        )
+
+        # Each household's share is one lookup by type and income decile.
+        row = np.array(
+            [
+                types.index(value.name.lower())
+                for value in household_type.possible_values
+            ]
+        )
+        decile = np.searchsorted(thresholds, income, side="right")
+        share = table[row[np.asarray(household_type)], decile]
+        return share * income
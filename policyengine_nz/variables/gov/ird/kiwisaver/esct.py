@@ -0,0 +1,24 @@
+"""Employer superannuation contribution tax."""
+
+from policyengine_nz.model_api import *
+
+
+class esct(Variable):
+    value_type = float
+    entity = Person
+    definition_period = YEAR
+    label = "Employer superannuation contribution tax"
+    documentation = "ESCT deducted from employer KiwiSaver contributions, at the rate for the employee's earnings plus the contributions"
+    reference = "https://www.ird.govt.nz/roles/employers/employer-superannuation-contribution-tax"
+    unit = NZD
+
+    def formula(person, period, parameters):
+        contributions = person("kiwisaver_employer_contributions", period)
+        employment_income = person("employment_income", period)
+        p = parameters(period).gov.ird.kiwisaver.esct
+
+        # The whole contribution is taxed at the rate of the bracket the
+        # ESCT rate threshold amount falls in.
+        thresholds, rates = bracket_schedule(p.thresholds.thresholds, p.rates.rates)
+        rate = bracket_rate(employment_income + contributions, thresholds, rates)
+        return rate * contributions
@@ -0,0 +1,25 @@
+"""KiwiSaver contribution rate election."""
+
+from policyengine_nz.model_api import *
+
+
+class KiwiSaverContributionRate(Enum):
+    NOT_A_MEMBER = "Not a member"
+    MINIMUM = "Minimum rate"
+    RATE_4 = "4%"
+    RATE_6 = "6%"
+    RATE_8 = "8%"
+    RATE_10 = "10%"
+
+
+class kiwisaver_contribution_rate(Variable):
+    value_type = Enum
+    possible_values = KiwiSaverContributionRate
+    default_value = KiwiSaverContributionRate.NOT_A_MEMBER
+    entity = Person
+    definition_period = YEAR
+    label = "KiwiSaver contribution rate"
+    documentation = "Contribution rate a KiwiSaver member has elected, if a member"
+    reference = (
+        "https://www.ird.govt.nz/kiwisaver/kiwisaver-individuals/making-contributions"
+    )
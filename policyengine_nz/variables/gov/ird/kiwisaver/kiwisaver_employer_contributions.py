@@ -0,0 +1,30 @@
+"""KiwiSaver compulsory employer contributions."""
+
+from policyengine_nz.model_api import *
+
+
+class kiwisaver_employer_contributions(Variable):
+    value_type = float
+    entity = Person
+    definition_period = YEAR
+    label = "KiwiSaver employer contributions"
+    documentation = "Annual compulsory employer contributions to a member's KiwiSaver scheme, before ESCT"
+    reference = "https://www.ird.govt.nz/kiwisaver/kiwisaver-employers/making-employer-contributions"
+    unit = NZD
+
+    def formula(person, period, parameters):
+        election = person("kiwisaver_contribution_rate", period)
+        age = person("age", period)
+        employment_income = person("employment_income", period)
+        p = parameters(period).gov
+        rate = p.ird.kiwisaver.contribution_rates.rates.employer_minimum
+        superannuation_age = (
+            p.msd.superannuation.payment_rates.eligibility.age_threshold
+        )
+
+        # Employers need not contribute once members reach the age of
+        # eligibility for New Zealand Superannuation.
+        eligible = (election != election.possible_values.NOT_A_MEMBER) & (
+            age < superannuation_age
+        )
+        return where(eligible, rate * max_(0, employment_income), 0)
@@ -0,0 +1,36 @@
+"""KiwiSaver government contribution."""
+
+from policyengine_nz.model_api import *
+
+
+class kiwisaver_government_contribution(Variable):
+    value_type = float
+    entity = Person
+    definition_period = YEAR
+    label = "KiwiSaver government contribution"
+    documentation = "Annual government contribution (formerly the Member Tax Credit) matching a share of member contributions"
+    reference = "https://www.ird.govt.nz/kiwisaver/kiwisaver-individuals/kiwisaver-government-contribution"
+    unit = NZD
+
+    def formula(person, period, parameters):
+        contributions = person("kiwisaver_member_contributions", period) + person(
+            "kiwisaver_voluntary_contributions", period
+        )
+        age = person("age", period)
+        taxable_income = person("taxable_income", period)
+        p = parameters(period).gov
+        rates = p.ird.kiwisaver.contribution_rates.rates
+        superannuation_age = (
+            p.msd.superannuation.payment_rates.eligibility.age_threshold
+        )
+
+        eligible = (
+            (age >= rates.government_contribution_minimum_age)
+            & (age < superannuation_age)
+            & (taxable_income <= rates.government_contribution_income_limit)
+        )
+        amount = min_(
+            rates.government_contribution,
+            rates.government_contribution_rate * contributions,
+        )
+        return where(eligible, amount, 0)
@@ -0,0 +1,44 @@
+"""KiwiSaver member contributions."""
+
+from policyengine_nz.model_api import *
+from policyengine_nz.utils import compiled_parameters
+
+
+@compiled_parameters
+def _election_rates(rates):
+    """
+    Tabulate the contribution rate of each election.
+
+    Returns:
+        Tuple of (election names, rates).
+    """
+    elections = {"NOT_A_MEMBER": 0, "MINIMUM": rates.employee_minimum}
+    for key in rates.employee_options:
+        elections[f"RATE_{key.split('_')[0]}"] = rates.employee_options[key]
+    return tuple(elections), np.array(list(elections.values()), dtype=float)
+
+
+class kiwisaver_member_contributions(Variable):
+    value_type = float
+    entity = Person
+    definition_period = YEAR
+    label = "KiwiSaver member contributions"
+    documentation = (
+        "Annual KiwiSaver contributions deducted from pay at the member's elected rate"
+    )
+    reference = "https://www.ird.govt.nz/kiwisaver/kiwisaver-deductions/kiwisaver-deduction-rates"
+    unit = NZD
+
+    def formula(person, period, parameters):
+        election = person("kiwisaver_contribution_rate", period)
+        p = parameters(period).gov.ird.kiwisaver.contribution_rates.rates
+
+        # Resolve each election's rate with one lookup.
+        names, rates = _election_rates(p)
+        lookup = rates[[names.index(value.name) for value in election.possible_values]]
+        rate = lookup[np.asarray(election)]
+
+        # Only salary and wages are deducted at the elected rate; other
+        # contributions are kiwisaver_voluntary_contributions.
+        employment_income = person("employment_income", period)
+        return rate * max_(0, employment_income)
@@ -0,0 +1,13 @@
+"""KiwiSaver voluntary contributions."""
+
+from policyengine_nz.model_api import *
+
+
+class kiwisaver_voluntary_contributions(Variable):
+    value_type = float
+    entity = Person
+    definition_period = YEAR
+    label = "KiwiSaver voluntary contributions"
+    documentation = "Annual contributions a KiwiSaver member pays to their scheme directly rather than through pay, as self-employed members do"
+    reference = "https://www.ird.govt.nz/kiwisaver/kiwisaver-individuals/making-contributions/voluntary-contributions"
+    unit = NZD
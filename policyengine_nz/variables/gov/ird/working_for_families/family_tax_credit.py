@@ -28,12 +28,9 @@ class family_tax_credit(Variable):
         )
 
         # Get parameters
-        p = parameters(
-            period
-        ).gov.ird.working_for_families.family_tax_credit_rates.rates
-        income_test = parameters(
-            period
-        ).gov.ird.working_for_families.family_tax_credit_income_test.thresholds
+        wff = parameters(period).gov.ird.working_for_families
+        p = wff.family_tax_credit_rates.rates
+        income_test = wff.family_tax_credit_income_test.thresholds
 
         # Calculate base FTC entitlement
         ftc_base = children_0_15 * p.child_0_15 + children_16_18 * p.child_16_18
@@ -0,0 +1,110 @@
+"""Accommodation Supplement payment calculation."""
+
+from policyengine_nz.model_api import *
+from policyengine_nz.utils import compiled_parameters
+
+
+# Columns of the maximum rate table, in order of family type.
+FAMILY_TYPES = ("single", "couple", "family_1_child", "family_2_plus_children")
+
+
+@compiled_parameters
+def _maximum_rates(rates, areas):
+    """
+    Tabulate the maximum weekly rate by region and family type.
+
+    Returns:
+        Tuple of (region names, table), the table's rows following the
+        region names.
+    """
+    regions = tuple(areas)
+    table = np.array(
+        [
+            [rates[f"area_{int(areas[region])}"][family] for family in FAMILY_TYPES]
+            for region in regions
+        ],
+        dtype=float,
+    )
+    return regions, table
+
+
+class accommodation_supplement(Variable):
+    value_type = float
+    entity = BenefitUnit
+    definition_period = YEAR
+    label = "Accommodation Supplement"
+    documentation = (
+        "Annual Accommodation Supplement towards rent, board or mortgage costs"
+    )
+    reference = "https://www.workandincome.govt.nz/products/a-z-benefits/accommodation-supplement.html"
+    unit = NZD
+
+    def formula(benefit_unit, period, parameters):
+        person = benefit_unit.members
+        p = parameters(period).gov.msd.accommodation_supplement
+        income_test = p.income_test.thresholds
+
+        adult = not_(person("is_child", period))
+        adults = benefit_unit.sum(adult)
+        children = benefit_unit.sum(person("is_child", period))
+
+        # Household costs are shared between the household's adults.
+        household_adults = person.household.sum(adult)
+        costs = benefit_unit.sum(
+            where(
+                adult,
+                person.household("accommodation_costs", period)
+                / max_(household_adults, 1),
+                0,
+            )
+        )
+        weekly_costs = costs / WEEKS_IN_YEAR
+
+        # Maximum rate, resolved from the region and family type table.
+        regions, table = _maximum_rates(p.payment_rates.rates, p.areas)
+        region = benefit_unit.value_from_first_person(
+            person.household("region", period)
+        )
+        row = np.array([regions.index(value.name) for value in region.possible_values])
+        family_type = where(children > 0, 1 + min_(children, 2), adults > 1).astype(int)
+        maximum = table[row[np.asarray(region)], family_type]
+
+        # The supplement meets a share of costs above the entry threshold.
+        entitlement = min_(
+            maximum,
+            (1 - income_test.contribution_rate)
+            * max_(0, weekly_costs - income_test.minimum_accommodation_cost),
+        )
+
+        # Income test.
+        weekly_income = (
+            benefit_unit.sum(person("taxable_income", period)) / WEEKS_IN_YEAR
+        )
+        income_threshold = select(
+            [children > 0, adults > 1],
+            [
+                where(
+                    adults > 1,
+                    income_test.income_threshold_couple,
+                    income_test.income_threshold_sole_parent,
+                ),
+                income_test.income_threshold_couple,
+            ],
+            default=income_test.income_threshold_single,
+        )
+        reduction = income_test.abatement_rate * max_(
+            0, weekly_income - income_threshold
+        )
+
+        # Cash asset test: single people have a lower limit than everyone else.
+        cash_assets = benefit_unit.sum(person("cash_assets", period))
+        asset_limit = where(
+            (adults > 1) | (children > 0),
+            income_test.cash_assets_limit_couple,
+            income_test.cash_assets_limit_single,
+        )
+
+        weekly_amount = where(
+            cash_assets <= asset_limit, max_(0, entitlement - reduction), 0
+        )
+        return weekly_amount * WEEKS_IN_YEAR
@@ -0,0 +1,41 @@
+"""Household composition type."""
+
+from policyengine_nz.model_api import *
+
+
+class HouseholdType(Enum):
+    SINGLE = "Single adult"
+    COUPLE = "Two adults"
+    SOLE_PARENT = "Single adult with children"
+    COUPLE_WITH_CHILDREN = "Two adults with children"
+    OTHER = "Three or more adults"
+
+
+class household_type(Variable):
+    value_type = Enum
+    possible_values = HouseholdType
+    default_value = HouseholdType.SINGLE
+    entity = Household
+    definition_period = YEAR
+    label = "Household type"
+    documentation = "Household composition, by its numbers of adults and children"
+
+    def formula(household, period, parameters):
+        is_child = household.members("is_child", period)
+        adults = household.sum(not_(is_child))
+        has_children = household.any(is_child)
+        return select(
+            [
+                (adults <= 1) & not_(has_children),
+                (adults <= 1) & has_children,
+                (adults == 2) & not_(has_children),
+                (adults == 2) & has_children,
+            ],
+            [
+                HouseholdType.SINGLE,
+                HouseholdType.SOLE_PARENT,
+                HouseholdType.COUPLE,
+                HouseholdType.COUPLE_WITH_CHILDREN,
+            ],
+            default=HouseholdType.OTHER,
+        )
@@ -0,0 +1,12 @@
+"""Survey weight for households."""
+
+from policyengine_nz.model_api import *
+
+
+class household_weight(Variable):
+    value_type = float
+    entity = Household
+    definition_period = YEAR
+    label = "Household weight"
+    documentation = "Number of New Zealand households this household represents"
+    default_value = 1
@@ -0,0 +1,30 @@
+"""Household equivalisation factor."""
+
+from policyengine_nz.model_api import *
+
+
+# Modified OECD scale weights, as used in Stats NZ household income statistics.
+FIRST_ADULT = 1.0
+OTHER_ADULT = 0.5
+CHILD = 0.3
+CHILD_AGE_LIMIT = 14
+
+
+class equivalisation_factor(Variable):
+    value_type = float
+    entity = Household
+    definition_period = YEAR
+    label = "Equivalisation factor"
+    documentation = "Household size adjustment on the modified OECD scale: 1 for the first adult, 0.5 for each other person aged 14 or over and 0.3 for each child under 14"
+    reference = "https://www.stats.govt.nz/methods/measuring-child-poverty-concepts-and-definitions/"
+
+    def formula(household, period, parameters):
+        young = household.sum(household.members("age", period) < CHILD_AGE_LIMIT)
+        older = household.nb_persons() - young
+        # In a household of children alone, the first child counts as the
+        # first adult.
+        return (
+            FIRST_ADULT
+            + OTHER_ADULT * max_(older - 1, 0)
+            + CHILD * max_(young - (older == 0), 0)
+        )
@@ -0,0 +1,19 @@
+"""Equivalised household net income."""
+
+from policyengine_nz.model_api import *
+
+
+class equivalised_household_net_income(Variable):
+    value_type = float
+    entity = Household
+    definition_period = YEAR
+    label = "Equivalised household net income"
+    documentation = (
+        "Household net income divided by the household's equivalisation factor"
+    )
+    unit = NZD
+
+    def formula(household, period, parameters):
+        net_income = household("household_net_income", period)
+        factor = household("equivalisation_factor", period)
+        return net_income / factor
@@ -0,0 +1,18 @@
+"""Equivalised household net income after housing costs."""
+
+from policyengine_nz.model_api import *
+
+
+class equivalised_household_net_income_ahc(Variable):
+    value_type = float
+    entity = Household
+    definition_period = YEAR
+    label = "Equivalised household net income after housing costs"
+    documentation = "Household net income after housing costs divided by the household's equivalisation factor"
+    reference = "https://www.stats.govt.nz/methods/measuring-child-poverty-concepts-and-definitions/"
+    unit = NZD
+
+    def formula(household, period, parameters):
+        net_income = household("household_net_income_ahc", period)
+        factor = household("equivalisation_factor", period)
+        return net_income / factor
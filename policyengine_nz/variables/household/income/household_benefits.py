@@ -0,0 +1,20 @@
+"""Household benefits and tax credits."""
+
+from policyengine_nz.model_api import *
+
+
+class household_benefits(Variable):
+    value_type = float
+    entity = Household
+    definition_period = YEAR
+    label = "Household benefits"
+    documentation = "Working for Families tax credits and Work and Income payments received by household members"
+    unit = NZD
+    adds = [
+        "family_tax_credit",
+        "in_work_tax_credit",
+        "best_start",
+        "jobseeker_support",
+        "nz_superannuation",
+        "accommodation_supplement",
+    ]
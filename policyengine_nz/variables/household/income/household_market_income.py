@@ -0,0 +1,17 @@
+"""Household market income."""
+
+from policyengine_nz.model_api import *
+
+
+class household_market_income(Variable):
+    value_type = float
+    entity = Household
+    definition_period = YEAR
+    label = "Household market income"
+    documentation = "Combined employment, self-employment and investment income of household members"
+    unit = NZD
+    adds = [
+        "employment_income",
+        "self_employment_income",
+        "investment_income",
+    ]
@@ -0,0 +1,15 @@
+"""Household net income after housing costs."""
+
+from policyengine_nz.model_api import *
+
+
+class household_net_income_ahc(Variable):
+    value_type = float
+    entity = Household
+    definition_period = YEAR
+    label = "Household net income after housing costs"
+    documentation = "Household net income less rent, board and mortgage payments"
+    reference = "https://www.stats.govt.nz/methods/measuring-child-poverty-concepts-and-definitions/"
+    unit = NZD
+    adds = ["household_net_income"]
+    subtracts = ["accommodation_costs"]
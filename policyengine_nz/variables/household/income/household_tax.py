@@ -0,0 +1,16 @@
+"""Household direct taxes."""
+
+from policyengine_nz.model_api import *
+
+
+class household_tax(Variable):
+    value_type = float
+    entity = Household
+    definition_period = YEAR
+    label = "Household tax"
+    documentation = "Income tax and ACC Earner's Levy paid by household members"
+    unit = NZD
+    adds = [
+        "income_tax",
+        "acc_earners_levy",
+    ]
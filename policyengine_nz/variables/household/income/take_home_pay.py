@@ -0,0 +1,23 @@
+"""Take-home pay."""
+
+from policyengine_nz.model_api import *
+
+
+class take_home_pay(Variable):
+    value_type = float
+    entity = Person
+    definition_period = YEAR
+    label = "Take-home pay"
+    documentation = (
+        "Earnings less income tax, ACC Earner's Levy and KiwiSaver member contributions"
+    )
+    unit = NZD
+    adds = [
+        "employment_income",
+        "self_employment_income",
+    ]
+    subtracts = [
+        "income_tax",
+        "acc_earners_levy",
+        "kiwisaver_member_contributions",
+    ]
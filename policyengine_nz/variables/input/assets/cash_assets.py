@@ -0,0 +1,13 @@
+"""Cash assets for benefit asset tests."""
+
+from policyengine_nz.model_api import *
+
+
+class cash_assets(Variable):
+    value_type = float
+    entity = Person
+    definition_period = YEAR
+    label = "Cash assets"
+    documentation = "Cash, savings and other readily realisable assets"
+    reference = "https://www.workandincome.govt.nz/products/a-z-benefits/accommodation-supplement.html"
+    unit = NZD
@@ -0,0 +1,16 @@
+"""Accommodation costs of the household."""
+
+from policyengine_nz.model_api import *
+
+
+class accommodation_costs(Variable):
+    value_type = float
+    entity = Household
+    definition_period = YEAR
+    label = "Accommodation costs"
+    documentation = "Annual rent, board or mortgage payments for the household's home (rent alone if not given)"
+    reference = "https://www.workandincome.govt.nz/products/a-z-benefits/accommodation-supplement.html"
+    unit = NZD
+
+    def formula(household, period, parameters):
+        return household("rent", period)
@@ -0,0 +1,33 @@
+"""Region of residence."""
+
+from policyengine_nz.model_api import *
+
+
+class Region(Enum):
+    NORTHLAND = "Northland"
+    AUCKLAND = "Auckland"
+    WAIKATO = "Waikato"
+    BAY_OF_PLENTY = "Bay of Plenty"
+    GISBORNE = "Gisborne"
+    HAWKES_BAY = "Hawke's Bay"
+    TARANAKI = "Taranaki"
+    MANAWATU_WHANGANUI = "Manawatū-Whanganui"
+    WELLINGTON = "Wellington"
+    TASMAN = "Tasman"
+    NELSON = "Nelson"
+    MARLBOROUGH = "Marlborough"
+    WEST_COAST = "West Coast"
+    CANTERBURY = "Canterbury"
+    OTAGO = "Otago"
+    SOUTHLAND = "Southland"
+
+
+class region(Variable):
+    value_type = Enum
+    possible_values = Region
+    default_value = Region.AUCKLAND
+    entity = Household
+    definition_period = YEAR
+    label = "Region"
+    documentation = "Regional council area the household lives in"
+    reference = "https://www.stats.govt.nz/topics/population-estimates-and-projections"
@@ -0,0 +1,12 @@
+"""Rent paid by the household."""
+
+from policyengine_nz.model_api import *
+
+
+class rent(Variable):
+    value_type = float
+    entity = Household
+    definition_period = YEAR
+    label = "Rent"
+    documentation = "Annual rent paid for the household's home"
+    unit = NZD